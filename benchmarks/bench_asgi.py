@@ -0,0 +1,214 @@
+"""
+Нагрузочный тест: пропускная способность под WSGI и под ASGI.
+
+    python -m benchmarks.bench_asgi [клиентов] [запросов_на_клиента] [задержка_мс] [потоков_wsgi]
+
+Запросы отправляются прямо в обработчики Django (WSGIHandler и ASGIHandler)
+без сетевого сервера, поэтому сравнивается именно путь запроса в Django.
+Клиенты медленные, как мобильные: тело POST приходит чанками по CHUNK_SIZE
+байт с задержкой между чанками.
+
+- WSGI: пул из N потоков (как gunicorn --threads N); пока тело читается,
+  поток занят.
+- ASGI + синхронные представления DRF (/submitData/): тело читается
+  асинхронно, обработчик занимает отдельный поток на время запроса.
+- ASGI + async-представления (/async/submitData/): поток нужен только на
+  время запросов к базе и записи файлов.
+
+Смесь запросов: список по email, запись по id и создание перевала с
+изображением в base64.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.common import report, setup_django, test_database, wsgi_environ
+
+CHUNK_SIZE = 16 * 1024
+EMAIL = "load@example.com"
+
+
+def make_image(rng, size=256):
+    """Уникальное изображение в base64: одинаковые файлы хранилище не записывает повторно"""
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.frombytes('RGB', (size, size), rng.randbytes(size * size * 3)).save(buffer, format='JPEG', quality=90)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+def make_requests(prefix, count, pereval_ids, rng):
+    """Смесь запросов (метод, путь, query string, тело) в равных долях"""
+    requests = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            requests.append(('GET', f'{prefix}submitData/', f'user__email={EMAIL}&limit=20', b''))
+        elif kind == 1:
+            requests.append(('GET', f'{prefix}submitData/{rng.choice(pereval_ids)}/', '', b''))
+        else:
+            body = json.dumps({
+                "beauty_title": "пер.", "title": f"Нагрузка {i}",
+                "user": {"email": EMAIL, "fam": "Нагрузка", "name": "Тест", "phone": "+70000000000"},
+                "coords": {"latitude": 43.3, "longitude": 42.5, "height": 3000},
+                "level": {"summer": "1А"},
+                "images": [{"image": make_image(rng), "title": "Вид"}],
+            }).encode('utf-8')
+            requests.append(('POST', f'{prefix}submitData/', '', body))
+    return requests
+
+
+class SlowInput:
+    """wsgi.input, который отдает тело чанками с задержкой (медленный клиент)"""
+
+    def __init__(self, body, delay):
+        self.stream = BytesIO(body)
+        self.delay = delay
+
+    def read(self, size=-1):
+        # Как и сервер WSGI, возвращаем запрошенный объем целиком; задержка - на каждый чанк
+        data = self.stream.read(None if size is None or size < 0 else size)
+        time.sleep(self.delay * -(-len(data) // CHUNK_SIZE))
+        return data
+
+    def readline(self, size=-1):
+        return self.stream.readline(size)
+
+
+def run_wsgi(requests, threads, delay):
+    """Время обработки requests пулом из threads потоков WSGI"""
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    statuses = []
+
+    def call(request):
+        method, path, query, body = request
+        environ = wsgi_environ(method, path, query, body, stream=SlowInput(body, delay))
+        response = handler(environ, lambda status, headers, exc_info=None: statuses.append(int(status[:3])))
+        b''.join(response)
+        response.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, requests))
+    return time.perf_counter() - start, statuses
+
+
+def run_asgi(requests, delay):
+    """Время обработки requests обработчиком ASGI, все клиенты одновременно"""
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    statuses = []
+
+    async def call(request):
+        method, path, query, body = request
+        chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)] or [b'']
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+            'headers': [(b'host', b'localhost'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())],
+        }
+        sent = 0
+
+        async def receive():
+            nonlocal sent
+            if sent < len(chunks):
+                if body:
+                    await asyncio.sleep(delay)
+                sent += 1
+                return {'type': 'http.request', 'body': chunks[sent - 1], 'more_body': sent < len(chunks)}
+            # Клиент не отключается: ждем, пока обработчик не отменит ожидание
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await handler(scope, receive, send)
+
+    async def main():
+        await asyncio.gather(*(call(request) for request in requests))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start, statuses
+
+
+def populate(count=50):
+    from pereval_app.models import Coords, Level, Pereval, User
+
+    user = User.objects.create(email=EMAIL, fam="Нагрузка", name="Тест", phone="+70000000000")
+    return [
+        Pereval.objects.create(
+            beauty_title="пер.", title=f"Перевал {i}", user=user, level=Level.objects.create(summer="1А"),
+            coords=Coords.objects.create(latitude=43.3, longitude=42.5, height=3000)
+        ).id
+        for i in range(count)
+    ]
+
+
+def main(clients=32, per_client=3, delay_ms=20, wsgi_threads=8):
+    os.environ.setdefault('FSTR_IMAGE_PROCESSING', 'off')
+    setup_django()
+    from django.conf import settings
+
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='bench_asgi_')
+    settings.DEBUG = False
+    settings.PEREVAL_IMAGE_PROCESSING = 'off'
+    delay = delay_ms / 1000
+    count = clients * per_client
+    rng = random.Random(42)
+
+    from django.db import connection
+    if connection.vendor == 'sqlite':
+        # Тестовая база SQLite по умолчанию - общая память с блокировкой таблиц; для параллельной записи нужен файл
+        connection.settings_dict['TEST']['NAME'] = os.path.join(settings.MEDIA_ROOT, 'test.sqlite3')
+        # BEGIN IMMEDIATE: параллельные записи ждут блокировку, а не падают с "database is locked"
+        connection.settings_dict['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+        connection.settings_dict['OPTIONS']['timeout'] = 30
+
+    with test_database():
+        ids = populate()
+        # Одинаковое число одновременных клиентов во всех режимах: ASGI-вариантам - волнами по clients
+        wsgi = make_requests('/', count, ids, rng)
+        asgi_sync = make_requests('/', count, ids, rng)
+        asgi_async = make_requests('/async/', count, ids, rng)
+
+        def waves(requests):
+            total, statuses = 0.0, []
+            for start in range(0, len(requests), clients):
+                seconds, wave_statuses = run_asgi(requests[start:start + clients], delay)
+                total += seconds
+                statuses += wave_statuses
+            return total, statuses
+
+        results = [
+            (f"WSGI, {wsgi_threads} потоков", *run_wsgi(wsgi, wsgi_threads, delay)),
+            ("ASGI, синхронные представления", *waves(asgi_sync)),
+            ("ASGI, async-представления", *waves(asgi_async)),
+        ]
+        for name, _, statuses in results:
+            errors = [code for code in statuses if code >= 400]
+            if errors:
+                print(f"{name}: {len(errors)} ошибок, коды {sorted(set(errors))}")
+        report(
+            f"{count} запросов, {clients} одновременных клиентов, задержка чанка {delay_ms} мс",
+            [(name, seconds) for name, seconds, _ in results]
+        )
+        for name, seconds, _ in results:
+            print(f"  {name:<40} {count / seconds:10.1f} запросов/с")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""
+Бенчмарк поиска по координатам на синтетических точках.
+
+    python -m benchmarks.bench_geo [количество_точек] [радиус_км]
+
+По умолчанию - 1 000 000 точек, равномерно распределенных по району
+Кавказа и Альп (плотные участки) и по всему миру, радиус 20 км.
+Сравниваются:
+    - полный перебор с гаверсинусами в Python;
+    - фильтр по широте/долготе без индекса;
+    - диапазоны tile по индексу + гаверсинусы (как в GET /perevals/nearby/).
+"""
+import random
+import sys
+
+from benchmarks.common import bench, report, setup_django, test_database
+
+BATCH_SIZE = 10_000
+LIMIT = 100
+# Районы с высокой плотностью точек: (широта, долгота, разброс в градусах)
+CLUSTERS = [(43.3, 42.5, 2.0), (46.0, 8.0, 2.0)]
+
+
+def random_point(rng):
+    if rng.random() < 0.5:
+        lat, lon, spread = rng.choice(CLUSTERS)
+        return lat + rng.uniform(-spread, spread), lon + rng.uniform(-spread, spread)
+    return rng.uniform(-85, 85), rng.uniform(-180, 180)
+
+
+def populate(count):
+    """count перевалов со случайными координатами"""
+    from pereval_app.models import User, Coords, Level, Pereval
+
+    rng = random.Random(42)
+    user = User.objects.create(email="geo@example.com", fam="Бенч", name="Марк", phone="+70000000000")
+    level = Level.objects.create(winter="1A", summer="1Б")
+    for offset in range(0, count, BATCH_SIZE):
+        size = min(BATCH_SIZE, count - offset)
+        # tile заполняется в pre_save поля и при bulk_create
+        coords = Coords.objects.bulk_create(
+            Coords(latitude=round(lat, 6), longitude=round(lon, 6), height=3000)
+            for lat, lon in (random_point(rng) for _ in range(size))
+        )
+        Pereval.objects.bulk_create(
+            Pereval(beauty_title="пер.", title="Перевал", user=user, coords=c, level=level) for c in coords
+        )
+
+
+def main(count=1_000_000, radius=20):
+    setup_django()
+    from django.db import connection
+    from django.db.models import Q
+    from pereval_app.geo import bbox_q, nearest, radius_bbox
+    from pereval_app.models import Pereval
+
+    with test_database():
+        populate(count)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        lat, lon = CLUSTERS[0][:2]
+        south, west, north, east = radius_bbox(lat, lon, radius)
+        fields = ('id', 'coords__latitude', 'coords__longitude')
+
+        def full_scan():
+            return nearest(Pereval.objects.order_by().values_list(*fields).iterator(), lat, lon, radius, LIMIT)
+
+        def no_index():
+            candidates = Pereval.objects.filter(
+                Q(coords__latitude__range=(south, north)) & Q(coords__longitude__range=(west, east))
+            ).order_by().values_list(*fields)
+            return nearest(candidates, lat, lon, radius, LIMIT)
+
+        def tiles():
+            candidates = Pereval.objects.filter(
+                bbox_q(south, west, north, east, prefix='coords__')
+            ).order_by().values_list(*fields)
+            return nearest(candidates, lat, lon, radius, LIMIT)
+
+        expected = tiles()
+        assert no_index() == expected
+        print(Pereval.objects.filter(bbox_q(south, west, north, east, prefix='coords__')).explain())
+        report(f"Поиск в радиусе {radius} км среди {count} точек (найдено {len(expected)})", [
+            ("полный перебор", bench(full_scan, repeat=1)),
+            ("bbox без индекса", bench(no_index)),
+            ("tile по индексу + гаверсинусы", bench(tiles)),
+        ])
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,83 @@
+"""
+Бенчмарк индексов перевала: первая страница списка по email и очередь
+модерации по статусу с индексами из миграции 0008 и без них.
+
+    python -m benchmarks.bench_indexes [количество_записей] [количество_пользователей]
+
+По умолчанию - 1 000 000 перевалов у 1000 пользователей. Печатает план
+запроса (EXPLAIN) и время выборки страницы.
+"""
+import sys
+
+from benchmarks.common import bench, report, setup_django, test_database
+
+BATCH_SIZE = 10_000
+PAGE_SIZE = 100
+
+
+def populate(count, users_count):
+    """count перевалов у users_count пользователей; каждый десятый - в статусе new"""
+    from pereval_app.models import User, Coords, Level, Pereval
+
+    users = User.objects.bulk_create(
+        User(email=f"user{i}@example.com", fam="Бенч", name="Марк", phone="+70000000000")
+        for i in range(users_count)
+    )
+    # Координаты и уровень общие: в запросах списка участвуют только join'ы по PK
+    coords = Coords.objects.create(latitude=43, longitude=42, height=3000)
+    level = Level.objects.create(winter="1A", summer="1Б")
+    statuses = ['accepted'] * 7 + ['rejected', 'pending', 'new']
+    for offset in range(0, count, BATCH_SIZE):
+        perevals = [
+            Pereval(beauty_title="пер.", title=f"Перевал {i}", user=users[i % users_count],
+                    coords=coords, level=level, status=statuses[i % len(statuses)])
+            for i in range(offset, min(offset + BATCH_SIZE, count))
+        ]
+        # add_time (auto_now_add) заполняется при вставке - у каждой записи свое время
+        Pereval.objects.bulk_create(perevals)
+    return users[0].email
+
+
+def main(count=1_000_000, users_count=1000):
+    setup_django()
+    from django.db import connection
+    from pereval_app.models import Pereval
+    from pereval_app.fast_serializers import pereval_rows
+
+    with test_database():
+        email = populate(count, users_count)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        def user_page():
+            return list(pereval_rows(Pereval.objects.filter(user__email=email))[:PAGE_SIZE])
+
+        def moderation_page():
+            return list(Pereval.objects.filter(status='new').values_list('id', flat=True)[:PAGE_SIZE])
+
+        print(pereval_rows(Pereval.objects.filter(user__email=email))[:PAGE_SIZE].explain())
+        print(Pereval.objects.filter(status='new').values_list('id')[:PAGE_SIZE].explain())
+        with_indexes = [bench(user_page), bench(moderation_page)]
+
+        indexes = Pereval._meta.indexes
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.remove_index(Pereval, index)
+        without_indexes = [bench(user_page), bench(moderation_page)]
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Pereval, index)
+
+        report(f"Страница по email ({count} перевалов, {users_count} пользователей)", [
+            ("без индексов", without_indexes[0]),
+            ("pereval_user_time_idx", with_indexes[0]),
+        ])
+        report("Очередь модерации (status='new')", [
+            ("без индексов", without_indexes[1]),
+            ("pereval_status_time_idx / new_time_idx", with_indexes[1]),
+        ])
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+Бенчмарк записи ошибок в лог из обработчика запроса.
+
+    python -m benchmarks.bench_logging [записей] [потоков]
+
+Потоки-"запросы" одновременно пишут ошибки валидации (словарь, как
+serializer.errors). Время - сколько вызовы logger.error заняли в потоках
+запросов, то есть на сколько лог задержал ответы. Сравниваются:
+    - прежняя схема: FileHandler, f-строка, формат в потоке запроса;
+    - QueueHandler: ленивый %s, JSON и ротация в потоке слушателя;
+    - QueueHandler с RateLimitFilter: повторы одного сообщения отбрасываются сразу.
+
+Для QueueHandler отдельно показано время, за которое слушатель дописал очередь.
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from benchmarks.common import report, setup_django
+
+ERRORS = {'title': ['Обязательное поле.'], 'coords': {'latitude': ['Требуется корректное число.']}}
+
+
+def file_logger(path):
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('{levelname} {asctime} {module} {message}', style='{'))
+    return handler, lambda logger: logger.error(f"Validation errors: {ERRORS}")
+
+
+def queue_logger(path, rate_limit=False):
+    from pereval_project.logs import JsonFormatter, QueueHandler, RateLimitFilter
+
+    target = RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8')
+    target.setFormatter(JsonFormatter())
+    target.set_name(f'bench_file_{rate_limit}')
+    handler = QueueHandler([target.name], maxsize=1_000_000)
+    if rate_limit:
+        handler.addFilter(RateLimitFilter(rate=10, period=60))
+    return handler, lambda logger: logger.error("Validation errors: %s", ERRORS)
+
+
+def run(handler, log, count, threads):
+    """Суммарное время вызовов в потоках запросов, в секундах"""
+    logger = logging.getLogger(f'bench.logging.{id(handler)}')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    spent = []
+
+    def worker():
+        start = time.perf_counter()
+        for _ in range(count // threads):
+            log(logger)
+        spent.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    logger.removeHandler(handler)
+    return sum(spent)
+
+
+def main(count=100_000, threads=8):
+    setup_django()
+    directory = tempfile.mkdtemp(prefix='bench_logging_')
+
+    results = []
+    flushes = []
+    for name, factory in [
+        ("FileHandler, f-строка", file_logger),
+        ("QueueHandler, JSON", queue_logger),
+        ("QueueHandler + RateLimitFilter", lambda path: queue_logger(path, rate_limit=True)),
+    ]:
+        handler, log = factory(os.path.join(directory, f'{len(results)}.log'))
+        results.append((name, run(handler, log, count, threads)))
+        start = time.perf_counter()
+        if hasattr(handler, 'stop'):
+            handler.stop()
+            flushes.append((name, time.perf_counter() - start))
+        handler.close()
+
+    report(f"Время logger.error в потоках запросов ({count} записей, {threads} потоков)", results)
+    report("Запись очереди слушателем после нагрузки", flushes)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,102 @@
+"""
+Бенчмарк накладных расходов метрик запросов (FSTR_METRICS).
+
+    python -m benchmarks.bench_metrics [запросов]
+
+Запросы отправляются по одному, поочередно в два WSGIHandler: без
+метрик и с ними (MetricsMiddleware решает, участвовать ли в цепочке, при
+загрузке middleware). Сравнивается медианное время:
+    - GET /submitData/?user__email=... (страница из 20 записей);
+    - POST /submitData/ с изображением PNG;
+без метрик и с метриками (Server-Timing и гистограммы).
+"""
+import base64
+import json
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from benchmarks.common import setup_django, test_database, wsgi_environ
+
+EMAIL = "metrics@example.com"
+
+
+def populate(count=20):
+    from pereval_app.models import Coords, Level, Pereval, User
+
+    user = User.objects.create(email=EMAIL, fam="Метрики", name="Бенчмарк", phone="+70000000000")
+    for i in range(count):
+        Pereval.objects.create(
+            beauty_title="пер.", title=f"Перевал {i}", user=user, level=Level.objects.create(summer="1А"),
+            coords=Coords.objects.create(latitude=43.3, longitude=42.5, height=3000)
+        )
+
+
+def submit_body():
+    from PIL import Image as PILImage
+
+    buffer = BytesIO()
+    PILImage.new('RGB', (256, 256), color='green').save(buffer, format='PNG')
+    image = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+    return json.dumps({
+        "beauty_title": "пер.", "title": "Замер",
+        "user": {"email": EMAIL, "fam": "Метрики", "name": "Бенчмарк", "phone": "+70000000000"},
+        "coords": {"latitude": 43.3, "longitude": 42.5, "height": 3000},
+        "level": {"summer": "1А"},
+        "images": [{"image": image, "title": "Вершина"}],
+    }).encode('utf-8')
+
+
+def latency(handler, method, query, body):
+    """Время одного запроса, в секундах"""
+    environ = wsgi_environ(method, '/submitData/', query, body)
+    start = time.perf_counter()
+    response = handler(environ, lambda status, headers, exc_info=None: None)
+    b''.join(response)
+    response.close()
+    return time.perf_counter() - start
+
+
+def build_handler(settings, enabled):
+    """WSGIHandler с метриками или без: MetricsMiddleware читает настройку при загрузке цепочки"""
+    from django.core.handlers.wsgi import WSGIHandler
+
+    settings.PEREVAL_METRICS = enabled
+    return WSGIHandler()
+
+
+def main(count=1000):
+    setup_django()
+    from django.conf import settings
+
+    settings.DEBUG = False
+    settings.PEREVAL_IMAGE_PROCESSING = 'off'
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='bench_metrics_')
+    body = submit_body()
+    requests = [
+        ("GET /submitData/ (20 записей)", 'GET', f'user__email={EMAIL}&limit=20', b''),
+        ("POST /submitData/ (PNG 256x256)", 'POST', '', body),
+    ]
+
+    with test_database():
+        populate()
+        handlers = {enabled: build_handler(settings, enabled) for enabled in (False, True)}
+        settings.PEREVAL_METRICS = False
+        print(f"Накладные расходы метрик ({count} запросов на режим, медиана)")
+        for name, method, query, payload in requests:
+            times = {False: [], True: []}
+            for i in range(count + 20):
+                # Режимы чередуются по запросам: рост таблиц при POST и дрейф машины влияют на оба одинаково
+                for enabled in (False, True) if i % 2 else (True, False):
+                    elapsed = latency(handlers[enabled], method, query, payload)
+                    if i >= 20:  # прогрев
+                        times[enabled].append(elapsed)
+            off, on = statistics.median(times[False]), statistics.median(times[True])
+            print(f"  {name:<36} без: {off * 1000:8.3f} ms  с метриками: {on * 1000:8.3f} ms  "
+                  f"{(on - off) / off * 100:+.2f}%")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,103 @@
+"""
+Бенчмарк задержки запроса с пулом соединений и без него.
+
+    python -m benchmarks.bench_pool [запросов]
+
+Запросы GET /submitData/?user__email=... отправляются в WSGIHandler по
+одному, как от сервера: после каждого запроса Django закрывает или
+оставляет соединение по настройкам (сигналы request_started/finished).
+Сравниваются:
+    - CONN_MAX_AGE=0 - новое соединение на каждый запрос (прежнее поведение);
+    - постоянные соединения (CONN_MAX_AGE) без проверки и с CONN_HEALTH_CHECKS;
+    - пул psycopg 3 (только PostgreSQL с установленным psycopg[pool]).
+
+Показательны результаты на PostgreSQL: там установка соединения
+(TCP, аутентификация, запуск backend-процесса) занимает миллисекунды.
+В SQLite соединение - открытие файла.
+"""
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.common import report, setup_django, test_database, wsgi_environ
+
+EMAIL = "pool@example.com"
+
+
+def populate(count=20):
+    from pereval_app.models import Coords, Level, Pereval, User
+
+    user = User.objects.create(email=EMAIL, fam="Пул", name="Соединений", phone="+70000000000")
+    for i in range(count):
+        Pereval.objects.create(
+            beauty_title="пер.", title=f"Перевал {i}", user=user, level=Level.objects.create(summer="1А"),
+            coords=Coords.objects.create(latitude=43.3, longitude=42.5, height=3000)
+        )
+
+
+def configure(connection, conn_max_age, health_checks, pool=None):
+    """Новые настройки соединения; текущее соединение и пул закрываются"""
+    connection.close()
+    if hasattr(connection, 'close_pool'):
+        connection.close_pool()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+    connection.settings_dict['OPTIONS'].pop('pool', None)
+    if pool:
+        connection.settings_dict['OPTIONS']['pool'] = pool
+
+
+def latencies(handler, count):
+    """Время каждого из count запросов, в секундах"""
+    environ = wsgi_environ('GET', '/submitData/', f'user__email={EMAIL}&limit=20')
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = handler(dict(environ), lambda status, headers, exc_info=None: None)
+        b''.join(response)
+        # close() отправляет request_finished - здесь Django закрывает или сохраняет соединение
+        response.close()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main(count=500):
+    setup_django()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+
+    settings.DEBUG = False
+    if connection.vendor == 'sqlite':
+        # Тестовая база SQLite в памяти не закрывается между запросами - нужен файл
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench_pool_'), 'test.sqlite3')
+
+    modes = [
+        ("CONN_MAX_AGE=0 (соединение на запрос)", 0, False, None),
+        ("CONN_MAX_AGE=60", 60, False, None),
+        ("CONN_MAX_AGE=60 + CONN_HEALTH_CHECKS", 60, True, None),
+    ]
+    if connection.vendor == 'postgresql' and importlib.util.find_spec('psycopg_pool'):
+        modes.append(("пул psycopg 3 (2-10)", 0, False, {'min_size': 2, 'max_size': 10}))
+
+    with test_database():
+        populate()
+        handler = WSGIHandler()
+        results = []
+        for name, conn_max_age, health_checks, pool in modes:
+            configure(connection, conn_max_age, health_checks, pool)
+            latencies(handler, 20)  # прогрев
+            times = sorted(latencies(handler, count))
+            results.append((name, statistics.median(times), times[int(len(times) * 0.95) - 1]))
+        configure(connection, 0, False)
+
+        report(f"Задержка запроса, p50 ({count} запросов, {connection.vendor})",
+               [(name, p50) for name, p50, _ in results])
+        report("Задержка запроса, p95", [(name, p95) for name, _, p95 in results])
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
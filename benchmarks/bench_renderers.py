@@ -0,0 +1,64 @@
+"""
+Сравнение JSON-рендереров на типичном ответе GET /submitData/?user__email=.
+
+    python -m benchmarks.bench_renderers [количество_записей]
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import bench, report, setup_django
+
+
+def make_payload(count):
+    """Ответ списка перевалов: datetime, float-координаты, вложенные словари и изображения"""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    data = []
+    for i in range(count):
+        data.append({
+            "id": i,
+            "beauty_title": "пер. ",
+            "title": f"Перевал Турист {i}",
+            "other_titles": "Турист",
+            "connect": "Долина Адыл-Су и долина Шхельды",
+            "add_time": start + timedelta(minutes=i, microseconds=i),
+            "status": "new",
+            "user": {
+                "email": "test@example.com",
+                "fam": "Иванов",
+                "name": "Иван",
+                "otc": "Иванович",
+                "phone": "+79991234567"
+            },
+            "coords": {
+                "latitude": 43.123456 + i / 1e6,
+                "longitude": 42.654321 - i / 1e6,
+                "height": 3000 + i % 1000
+            },
+            "level": {"winter": "1Б", "summer": "1А", "autumn": "1А", "spring": ""},
+            "images": [
+                {"image_url": f"http://127.0.0.1:8000/media/pereval_images/2025/01/01/{i}_{j}.jpg", "title": "Вид"}
+                for j in range(3)
+            ]
+        })
+    return {"status": 200, "message": f"Найдено {count} перевалов", "data": data, "next_cursor": None}
+
+
+def main(count=1000):
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from pereval_app import renderers
+    from pereval_app.renderers import FastJSONRenderer
+
+    if renderers.orjson is None:
+        print("orjson не установлен: FastJSONRenderer использует стандартный json")
+
+    payload = make_payload(count)
+    drf, fast = JSONRenderer(), FastJSONRenderer()
+    report(f"Рендеринг ответа из {count} перевалов", [
+        ("rest_framework JSONRenderer", bench(lambda: drf.render(payload), repeat=20)),
+        ("FastJSONRenderer", bench(lambda: fast.render(payload), repeat=20)),
+    ])
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
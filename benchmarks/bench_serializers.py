@@ -0,0 +1,101 @@
+"""
+Сравнение сериализации списка перевалов:
+модели + select_related/prefetch_related против values_list() и serialize_rows.
+
+    python -m benchmarks.bench_serializers [количество_записей]
+"""
+import sys
+
+from benchmarks.common import bench, report, setup_django, test_database
+
+
+def model_serialize(pereval, request):
+    """Прежний путь: сериализация экземпляра модели с обращением к атрибутам"""
+    images_data = []
+    for img in pereval.images.all():
+        if img.image:
+            images_data.append({
+                "id": img.id,
+                "image_url": request.build_absolute_uri(img.image.url),
+                "title": img.title,
+                "thumbnail_url": request.build_absolute_uri(img.thumbnail.url) if img.thumbnail else None,
+                "web_url": request.build_absolute_uri(img.web.url) if img.web else None
+            })
+    return {
+        "id": pereval.id,
+        "beauty_title": pereval.beauty_title,
+        "title": pereval.title,
+        "other_titles": pereval.other_titles,
+        "connect": pereval.connect,
+        "add_time": pereval.add_time,
+        "status": pereval.status,
+        "user": {
+            "email": pereval.user.email,
+            "fam": pereval.user.fam,
+            "name": pereval.user.name,
+            "otc": pereval.user.otc,
+            "phone": pereval.user.phone
+        },
+        "coords": {
+            "latitude": float(pereval.coords.latitude),
+            "longitude": float(pereval.coords.longitude),
+            "height": pereval.coords.height
+        },
+        "level": {
+            "winter": pereval.level.winter,
+            "summer": pereval.level.summer,
+            "autumn": pereval.level.autumn,
+            "spring": pereval.level.spring
+        },
+        "images": images_data
+    }
+
+
+def populate(count):
+    """Один пользователь, count перевалов, по одному изображению на перевал"""
+    from pereval_app.models import User, Coords, Level, Pereval, Image
+
+    user = User.objects.create(email="bench@example.com", fam="Бенч", name="Марк", phone="+70000000000")
+    coords = Coords.objects.bulk_create(
+        Coords(latitude=43 + i / count, longitude=42 + i / count, height=3000 + i % 1000) for i in range(count)
+    )
+    levels = Level.objects.bulk_create(Level(winter="1A", summer="1Б") for _ in range(count))
+    perevals = Pereval.objects.bulk_create(
+        Pereval(beauty_title="пер.", title=f"Перевал {i}", other_titles="", connect="",
+                user=user, coords=coords[i], level=levels[i])
+        for i in range(count)
+    )
+    Image.objects.bulk_create(
+        Image(pereval=p, image=f"pereval_images/2025/01/01/{p.id}.jpg", title="Вид") for p in perevals
+    )
+    return user.email
+
+
+def main(count=10_000):
+    setup_django()
+    from django.test import RequestFactory
+    from pereval_app.models import Pereval
+    from pereval_app.fast_serializers import pereval_rows, serialize_rows
+
+    with test_database():
+        email = populate(count)
+        request = RequestFactory().get('/submitData/', {'user__email': email})
+
+        def models_path():
+            perevals = Pereval.objects.filter(user__email=email).select_related(
+                'user', 'coords', 'level'
+            ).prefetch_related('images')
+            return [model_serialize(p, request) for p in perevals]
+
+        def rows_path():
+            return serialize_rows(list(pereval_rows(Pereval.objects.filter(user__email=email))), request)
+
+        assert models_path() == rows_path()
+        report(f"Сериализация {count} перевалов (запрос + сериализация)", [
+            ("модели + prefetch_related", bench(models_path)),
+            ("values_list + serialize_rows", bench(rows_path)),
+        ])
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
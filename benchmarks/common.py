@@ -0,0 +1,79 @@
+"""
+Общие утилиты для бенчмарков.
+
+Бенчмарки запускаются как модули из корня проекта:
+    python -m benchmarks.bench_serializers
+
+Данные создаются во временной тестовой базе (test_<NAME>), которая
+удаляется после прогона, поэтому рабочая база не затрагивается.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Инициализация Django с настройками проекта"""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(BASE_DIR / '.env')
+    except ImportError:
+        pass
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pereval_project.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Временная тестовая база с применёнными миграциями"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def wsgi_environ(method, path, query='', body=b'', stream=None):
+    """Окружение WSGI-запроса для вызова WSGIHandler без сетевого сервера"""
+    from io import BytesIO
+
+    return {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': stream or BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        'wsgi.version': (1, 0),
+    }
+
+
+def bench(func, repeat=5):
+    """Лучшее время выполнения func за repeat прогонов, в секундах"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(title, results):
+    """Печать таблицы результатов: [(название, секунды), ...] относительно первой строки"""
+    print(title)
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"  {name:<40} {seconds * 1000:10.2f} ms  x{baseline / seconds:5.2f}")
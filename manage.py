@@ -8,7 +8,9 @@ from dotenv import load_dotenv
 def main():
     """Run administrative tasks."""
     load_dotenv()
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pereval_project.settings')
+    # Тесты - со своими настройками (pereval_project/test_settings.py)
+    default_settings = 'pereval_project.test_settings' if sys.argv[1:2] == ['test'] else 'pereval_project.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
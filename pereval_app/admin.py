@@ -1,3 +1,179 @@
+"""
+Админка перевалов, рассчитанная на таблицы с миллионами строк.
+
+- Связанные записи списка выбираются одним JOIN (list_select_related), а
+  миниатюра первого изображения - подзапросом, без запроса на строку.
+- Количество строк для пагинатора на PostgreSQL оценивается по статистике
+  (pg_class.reltuples или план EXPLAIN для отфильтрованного списка); точный
+  COUNT(*) выполняется, только если строк меньше PEREVAL_ADMIN_EXACT_COUNT_LIMIT.
+- Внешние ключи редактируются полем id (raw_id_fields) вместо выпадающих
+  списков на всю таблицу.
+- Миниатюры загружаются браузером лениво (loading="lazy").
+- Поиск идет по полнотекстовому индексу (search.py), а не LIKE по таблице.
+- Смена статуса массовыми действиями - один UPDATE (moderation.set_status).
+"""
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import OuterRef, Subquery
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+
+from .models import Coords, Image, Level, Pereval, PerevalAreas, SprActivitiesTypes, User
+from .moderation import set_status
+from .search import MIN_QUERY_LENGTH, search
+from .storage import content_storage
+
+# Ниже этой оценки количество строк считается точно
+DEFAULT_EXACT_COUNT_LIMIT = 10_000
+# Сколько результатов полнотекстового поиска показывать в списке
+SEARCH_LIMIT = 1000
+PREVIEW_SIZE = 80
+
+
+def estimated_count(queryset):
+    """Оценка количества строк queryset по статистике PostgreSQL; None, если оценки нет"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # -1 - таблица еще ни разу не анализировалась
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с оценкой количества строк вместо COUNT(*) для больших таблиц"""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < getattr(settings, 'PEREVAL_ADMIN_EXACT_COUNT_LIMIT',
+                                                  DEFAULT_EXACT_COUNT_LIMIT):
+            return super().count
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Общие настройки списков больших таблиц"""
+    paginator = EstimatedCountPaginator
+    # Без второго COUNT(*) по всей таблице для "N из M"
+    show_full_result_count = False
+    list_per_page = 50
+
+
+def preview(name, size=PREVIEW_SIZE):
+    """Миниатюра с ленивой загрузкой"""
+    if not name:
+        return "—"
+    return format_html(
+        '<img src="{}" loading="lazy" decoding="async" style="max-width:{}px;max-height:{}px">',
+        content_storage.url(name), size, size
+    )
+
+
+class ImageInline(admin.TabularInline):
+    model = Image
+    extra = 0
+    fields = ('thumbnail_preview', 'image', 'title', 'width', 'height', 'size', 'processed_at')
+    readonly_fields = ('thumbnail_preview', 'width', 'height', 'size', 'processed_at')
+
+    @admin.display(description="Миниатюра")
+    def thumbnail_preview(self, obj):
+        return preview(obj.thumbnail.name)
+
+
+@admin.register(Pereval)
+class PerevalAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'status', 'user', 'coords', 'level', 'add_time', 'moderator', 'thumbnail')
+    list_select_related = ('user', 'coords', 'level')
+    # Фильтр по полю с choices не выполняет запросов, в отличие от фильтров по внешним ключам
+    list_filter = ('status',)
+    search_fields = ('title',)
+    search_help_text = "Полнотекстовый поиск по названиям и описанию"
+    raw_id_fields = ('user', 'coords', 'level', 'area', 'activity_type')
+    readonly_fields = ('add_time', 'updated_at', 'moderator', 'claimed_at')
+    inlines = (ImageInline,)
+    actions = ('mark_accepted', 'mark_rejected', 'mark_new')
+
+    def get_queryset(self, request):
+        first_thumbnail = Image.objects.filter(pereval=OuterRef('pk')).order_by('id').values('thumbnail')[:1]
+        return super().get_queryset(request).annotate(first_thumbnail=Subquery(first_thumbnail))
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if len(term) < MIN_QUERY_LENGTH:
+            return queryset, False
+        ids = [pk for pk, _ in search(term, SEARCH_LIMIT)]
+        return queryset.filter(id__in=ids), False
+
+    @admin.display(description="Миниатюра")
+    def thumbnail(self, obj):
+        return preview(obj.first_thumbnail)
+
+    def change_status(self, request, queryset, new_status):
+        count = set_status(queryset, new_status)
+        self.message_user(request, f"Статус \"{dict(Pereval.STATUS_CHOICES)[new_status]}\": {count}")
+
+    @admin.action(description="Принять выбранные перевалы")
+    def mark_accepted(self, request, queryset):
+        self.change_status(request, queryset, 'accepted')
+
+    @admin.action(description="Отклонить выбранные перевалы")
+    def mark_rejected(self, request, queryset):
+        self.change_status(request, queryset, 'rejected')
+
+    @admin.action(description="Вернуть выбранные перевалы в очередь модерации")
+    def mark_new(self, request, queryset):
+        self.change_status(request, queryset, 'new')
+
+
+@admin.register(Image)
+class ImageAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'pereval', 'thumbnail_preview', 'width', 'height', 'size', 'processed_at')
+    list_select_related = ('pereval',)
+    raw_id_fields = ('pereval',)
+    readonly_fields = ('thumbnail_preview', 'thumbnail', 'web', 'width', 'height', 'size', 'processed_at')
+
+    @admin.display(description="Миниатюра")
+    def thumbnail_preview(self, obj):
+        return preview(obj.thumbnail.name)
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin):
+    list_display = ('id', 'email', 'fam', 'name', 'phone')
+    # Точное совпадение email - поиск по уникальному индексу
+    search_fields = ('=email',)
+
+
+@admin.register(Coords)
+class CoordsAdmin(LargeTableAdmin):
+    list_display = ('id', 'latitude', 'longitude', 'height')
+
+
+@admin.register(Level)
+class LevelAdmin(LargeTableAdmin):
+    list_display = ('id', 'winter', 'summer', 'autumn', 'spring')
+
+
+@admin.register(PerevalAreas)
+class PerevalAreasAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'id_parent')
+    search_fields = ('title',)
+
 
-# Register your models here.
+@admin.register(SprActivitiesTypes)
+class SprActivitiesTypesAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title')
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PerevalAppConfig(AppConfig):
     name = 'pereval_app'
+
+    def ready(self):
+        # Подключаем обработчики сигналов (сброс кэша)
+        from . import signals  # noqa: F401
@@ -0,0 +1,220 @@
+"""
+Асинхронные версии основных эндпоинтов для запуска под ASGI (asgi.py).
+
+Представления DRF синхронные: под ASGI каждый запрос к ним выполняется
+через sync_to_async и занимает поток на все время обработки, включая
+декодирование base64 и запись файлов. Здесь обработчики - нативные
+async-views Django с тем же форматом ответов, что у /submitData/:
+
+- чтение списка и записи по id - асинхронный ORM (async for, aget) и
+  асинхронный кэш (DetailCache.aget);
+- base64-изображения декодируются, проверяются Pillow и записываются в
+  хранилище параллельно в пуле потоков (thread_sensitive=False), не занимая
+  поток запросов к базе, поэтому один процесс одновременно принимает много
+  медленных загрузок; токены загрузок проверяются заранее одним запросом;
+- вставка записей - короткая транзакция bulk.create_perevals через
+  sync_to_async: асинхронный ORM транзакции не поддерживает.
+
+Под WSGI эти представления тоже работают, но каждое выполняется в
+отдельном цикле событий и выигрыша не дает.
+"""
+import asyncio
+import logging
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import ParseError
+
+from .bulk import create_perevals
+from .cache import detail_cache
+from .conditional import detail_validators, list_validators, not_modified, set_validators
+from .fast_serializers import (
+    STATUS_INDEX, afetch_image_rows, aserialize_rows, build_images, pereval_rows, row_position, row_version,
+    serialize_row
+)
+from .models import Image, Pereval
+from .pagination import apaginate, parse_page_size
+from .renderers import FastJSONParser, dumps
+from .serializers import PerevalSerializer
+from .uploads import UploadClaimError, resolve_uploads, upload_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(payload, status=200):
+    return HttpResponse(dumps(payload), status=status, content_type='application/json')
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def submit_data(request):
+    """GET /async/submitData/?user__email=<email> - список; POST /async/submitData/ - создание"""
+    if request.method == 'POST':
+        return await create_pereval(request)
+    return await list_perevals(request)
+
+
+async def list_perevals(request):
+    """Перевалы пользователя по email (keyset-пагинация, как GET /submitData/)"""
+    try:
+        email = request.GET.get('user__email')
+        if not email:
+            return json_response({
+                "status": 400,
+                "message": "Не указан email пользователя",
+                "data": []
+            }, status=400)
+
+        cursor = request.GET.get('cursor')
+        try:
+            page_size = parse_page_size(request.GET.get('limit'))
+            rows, next_cursor = await apaginate(
+                pereval_rows(Pereval.objects.filter(user__email=email)), cursor, page_size, position=row_position
+            )
+        except ValueError as e:
+            return json_response({
+                "status": 400,
+                "message": str(e),
+                "data": []
+            }, status=400)
+
+        if not rows and not cursor:
+            return json_response({
+                "status": 200,
+                "message": f"Для пользователя с email {email} перевалы не найдены",
+                "data": [],
+                "next_cursor": None
+            })
+
+        validators = list_validators([row_version(row) for row in rows], next_cursor)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+
+        result = await aserialize_rows(rows, request)
+        return set_validators(json_response({
+            "status": 200,
+            "message": f"Найдено {len(result)} перевалов",
+            "data": result,
+            "next_cursor": next_cursor
+        }), *validators)
+
+    except Exception as e:
+        logger.error("Error getting perevals by email (async): %s", e)
+        return json_response({
+            "status": 500,
+            "message": "Internal server error",
+            "data": []
+        }, status=500)
+
+
+@require_GET
+async def pereval_detail(request, id):
+    """GET /async/submitData/<id>/ - запись по id (кэш и ETag, как GET /submitData/<id>/)"""
+    try:
+        cached = await detail_cache.aget(id)
+        if cached is None:
+            try:
+                row = await pereval_rows(Pereval.objects.all()).aget(id=id)
+            except Pereval.DoesNotExist:
+                return json_response({
+                    "status": 404,
+                    "message": f"Перевал с ID {id} не найден",
+                    "id": None
+                }, status=404)
+            image_rows = (await afetch_image_rows([id])).get(id, [])
+            await detail_cache.aset(id, row[STATUS_INDEX], row, image_rows)
+        else:
+            row, image_rows = cached
+
+        validators = detail_validators(*row_version(row))
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+
+        return set_validators(json_response({
+            "status": 200,
+            "message": "Найдено",
+            "data": serialize_row(row, build_images({id: image_rows}, request))
+        }), *validators)
+
+    except Exception as e:
+        logger.error("Error getting pereval %s (async): %s", id, e)
+        return json_response({
+            "status": 500,
+            "message": "Internal server error",
+            "id": None
+        }, status=500)
+
+
+async def store_images(images_data):
+    """
+    Запись декодированных base64-изображений в хранилище параллельно, вне потока запросов к базе.
+    В images_data файлы заменяются именами в хранилище; возвращает эти имена.
+    """
+    field = Image._meta.get_field('image')
+    save = sync_to_async(field.storage.save, thread_sensitive=False)
+    # Загрузки по токену (UploadRef) уже лежат в хранилище
+    pending = [img for img in images_data if not isinstance(img['image'], str)]
+    names = await asyncio.gather(*(
+        save(field.generate_filename(None, img['image'].name), img['image']) for img in pending
+    ))
+    for img, name in zip(pending, names):
+        img['image'] = name
+    return names
+
+
+async def create_pereval(request):
+    """
+    Создание перевала (формат POST /submitData/). Файлы, записанные до ошибки
+    вставки, здесь не удаляются: по хэшу их мог получить параллельный запрос,
+    поэтому их удаляет purge_image_files после grace-периода.
+    """
+    try:
+        try:
+            data = FastJSONParser().parse(BytesIO(request.body))
+        except ParseError as e:
+            return json_response({
+                "status": 400,
+                "message": str(e.detail),
+                "id": None
+            }, status=400)
+
+        # Токены загрузок проверяются одним запросом в потоке запросов к базе, а декодирование
+        # base64 и проверка Pillow - в пуле потоков, параллельно с другими запросами
+        images = data.get('images') if isinstance(data, dict) else None
+        uploads = await sync_to_async(resolve_uploads)(upload_tokens(images))
+        serializer = PerevalSerializer(data=data, context={'uploads': uploads})
+        if not await sync_to_async(serializer.is_valid, thread_sensitive=False)():
+            logger.error("Validation errors: %s", serializer.errors)
+            return json_response({
+                "status": 400,
+                "message": "Bad Request",
+                "id": None,
+                "errors": serializer.errors
+            }, status=400)
+
+        await store_images(serializer.validated_data['images'])
+        ids = await sync_to_async(create_perevals)([serializer.validated_data])
+        return json_response({
+            "status": 200,
+            "message": "Отправлено успешно",
+            "id": ids[0]
+        })
+
+    except UploadClaimError as e:
+        return json_response({
+            "status": 400,
+            "message": str(e),
+            "id": None
+        }, status=400)
+    except Exception as e:
+        logger.error("Unexpected error (async create): %s", e)
+        return json_response({
+            "status": 500,
+            "message": "Internal server error",
+            "id": None
+        }, status=500)
@@ -0,0 +1,118 @@
+"""
+Пакетное создание перевалов (POST /submitData/bulk/).
+
+Все записи пакета вставляются фиксированным числом запросов независимо
+от размера пакета: пользователи выбираются одним запросом по email, а
+координаты, уровни, перевалы и изображения создаются через bulk_create.
+bulk_create не отправляет сигналы - для новых записей сбрасывать кэш
+и версию не нужно, а обработка изображений, сброс кластеров тайлов
+карты и поисковый индекс обновляются явно.
+"""
+from django.db import transaction
+
+from .cache import cluster_cache
+from .models import User, Coords, Level, Pereval, Image
+from .processing import schedule_processing
+from .search import schedule_index
+from .uploads import UploadClaimError, UploadRef, claim_uploads
+
+# Максимальное количество перевалов в одном пакете
+MAX_BATCH_SIZE = 100
+
+
+def resolve_users(users_data):
+    """
+    Пользователи по email одним запросом (+ вставка и повторная выборка для новых).
+    Как и get_or_create в одиночном POST, существующие пользователи не изменяются,
+    а новый создается по данным из первого элемента пакета с его email.
+    """
+    emails = {data['email'] for data in users_data}
+    users = User.objects.filter(email__in=emails).in_bulk(field_name='email')
+
+    new_users = {}
+    for data in users_data:
+        email = data['email']
+        if email not in users and email not in new_users:
+            new_users[email] = User(
+                email=email,
+                fam=data['fam'],
+                name=data['name'],
+                otc=data.get('otc', ''),
+                phone=data['phone']
+            )
+    if new_users:
+        # ignore_conflicts: параллельный запрос мог уже создать пользователя с таким email
+        User.objects.bulk_create(new_users.values(), ignore_conflicts=True)
+        users = User.objects.filter(email__in=emails).in_bulk(field_name='email')
+    return users
+
+
+def insert_perevals(items):
+    """Вставка перевалов и изображений пакета; загрузки должны быть уже забраны"""
+    users = resolve_users([item['user'] for item in items])
+    coords = Coords.objects.bulk_create([Coords(**item['coords']) for item in items])
+    levels = Level.objects.bulk_create([Level(**item['level']) for item in items])
+    cluster_cache.invalidate_points((c.latitude, c.longitude) for c in coords)
+
+    perevals = []
+    for item, item_coords, item_level in zip(items, coords, levels):
+        fields = {
+            key: value for key, value in item.items()
+            if key not in ('user', 'coords', 'level', 'images')
+        }
+        perevals.append(Pereval(
+            user=users[item['user']['email']],
+            coords=item_coords,
+            level=item_level,
+            **fields,
+            status='new'
+        ))
+    perevals = Pereval.objects.bulk_create(perevals)
+    schedule_index(pereval.id for pereval in perevals)
+
+    # base64-файлы сохраняются в хранилище в pre_save поля при вставке
+    images = Image.objects.bulk_create([
+        Image(pereval=pereval, **img_data)
+        for item, pereval in zip(items, perevals)
+        for img_data in item['images']
+    ])
+    schedule_processing(image.pk for image in images if image.image)
+    return [pereval.id for pereval in perevals]
+
+
+@transaction.atomic
+def create_perevals(items):
+    """
+    Создание перевалов из validated_data сериализаторов PerevalSerializer.
+    Возвращает список id в порядке items. Загруженные отдельно изображения
+    забираются одним запросом на весь пакет: неверный токен отменяет пакет
+    целиком (UploadClaimError).
+    """
+    claim_uploads([img_data for item in items for img_data in item['images']])
+    return insert_perevals(items)
+
+
+@transaction.atomic
+def create_perevals_partial(items):
+    """
+    Создание перевалов в режиме частичного успеха: загрузки забираются
+    отдельно для каждой записи в ее точке сохранения, и запись с неверным
+    токеном пропускается, не отменяя остальные. Возвращает пары (id, ошибка)
+    в порядке items.
+    """
+    errors = {}
+    for position, item in enumerate(items):
+        if not any(isinstance(img_data['image'], UploadRef) for img_data in item['images']):
+            continue
+        try:
+            with transaction.atomic():
+                claim_uploads(item['images'])
+        except UploadClaimError as e:
+            errors[position] = str(e)
+
+    claimed = [item for position, item in enumerate(items) if position not in errors]
+    ids = iter(insert_perevals(claimed) if claimed else ())
+    return [
+        (None, errors[position]) if position in errors else (next(ids), None)
+        for position in range(len(items))
+    ]
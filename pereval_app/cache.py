@@ -0,0 +1,166 @@
+"""
+Кэши ответов API: GET /submitData/<id>/ и кластеры тайлов карты.
+
+Для GET /submitData/<id>/ в кэше лежит результат запросов для одного перевала: строка
+values_list(*PEREVAL_FIELDS) и список изображений (имя файла, название).
+Абсолютные URL изображений строятся при каждом ответе, поэтому запись
+не зависит от хоста запроса. Время жизни записи зависит от статуса:
+принятые и отклоненные перевалы больше не меняются и хранятся долго.
+
+Сброс выполняется сигналами (signals.py) при сохранении/удалении
+Pereval и Image, а для массовых QuerySet.update() - явным вызовом
+detail_cache.invalidate().
+
+С репликами (routers.py) запрос, привязанный к основной базе после своей
+записи, кэш не читает, а берет запись из основной базы и обновляет кэш.
+invalidate() помечает перевал как недавно измененный на время привязки:
+пока метка жива, данные, прочитанные с реплики, в кэш не кладутся - там
+может быть версия до записи.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .geo import point_tiles
+from .routers import pinned_to_primary, reading_from_replica, replicas, sticky_seconds
+
+# Время жизни записи (секунды) в зависимости от статуса перевала
+DEFAULT_TIMEOUTS = {
+    'new': 60,
+    'pending': 60,
+    'accepted': 24 * 60 * 60,
+    'rejected': 24 * 60 * 60,
+}
+
+
+class DetailCache:
+    """Кэш детальной информации о перевале со счетчиками попаданий/промахов"""
+
+    key_prefix = 'pereval:detail'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'PEREVAL_DETAIL_CACHE_ALIAS', 'default')]
+
+    def key(self, pk):
+        return f"{self.key_prefix}:{pk}"
+
+    def written_key(self, pk):
+        return f"{self.key_prefix}:written:{pk}"
+
+    def timeout(self, status):
+        timeouts = getattr(settings, 'PEREVAL_DETAIL_CACHE_TIMEOUTS', DEFAULT_TIMEOUTS)
+        return timeouts.get(status, DEFAULT_TIMEOUTS['new'])
+
+    def get(self, pk):
+        """(row, image_rows) из кэша или None; запрос, привязанный к основной базе, кэш не читает"""
+        if pinned_to_primary():
+            return None
+        entry = self.cache.get(self.key(pk))
+        self.count(entry is not None)
+        return entry
+
+    def set(self, pk, status, row, image_rows):
+        if reading_from_replica() and self.cache.get(self.written_key(pk)) is not None:
+            return
+        self.cache.set(self.key(pk), (row, image_rows), self.timeout(status))
+
+    async def aget(self, pk):
+        """get() для асинхронных представлений"""
+        if pinned_to_primary():
+            return None
+        entry = await self.cache.aget(self.key(pk))
+        self.count(entry is not None)
+        return entry
+
+    async def aset(self, pk, status, row, image_rows):
+        if reading_from_replica() and await self.cache.aget(self.written_key(pk)) is not None:
+            return
+        await self.cache.aset(self.key(pk), (row, image_rows), self.timeout(status))
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def invalidate(self, *pks):
+        """
+        Сброс записей. Повторяется после коммита текущей транзакции,
+        чтобы параллельный запрос не успел положить в кэш старые данные.
+        """
+        if not pks:
+            return
+        keys = [self.key(pk) for pk in pks]
+        self.cache.delete_many(keys)
+        transaction.on_commit(lambda: self.cache.delete_many(keys))
+        if replicas():
+            # Пока реплика может отставать, ее данные об этих перевалах в кэш не попадают
+            written = dict.fromkeys((self.written_key(pk) for pk in pks), True)
+            self.cache.set_many(written, sticky_seconds())
+            transaction.on_commit(lambda: self.cache.set_many(written, sticky_seconds()))
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class ClusterCache:
+    """
+    Кэш кластеров тайла карты (GET /perevals/clusters/<zoom>/<x>/<y>/).
+    При создании или изменении координат перевала сбрасываются все тайлы,
+    содержащие точку (по одному на масштаб), - сигналом на Coords или явно
+    при bulk_create.
+    """
+
+    key_prefix = 'pereval:clusters'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'PEREVAL_DETAIL_CACHE_ALIAS', 'default')]
+
+    def key(self, zoom, x, y):
+        return f"{self.key_prefix}:{zoom}:{x}:{y}"
+
+    def get(self, zoom, x, y):
+        return self.cache.get(self.key(zoom, x, y))
+
+    def set(self, zoom, x, y, clusters):
+        self.cache.set(self.key(zoom, x, y), clusters, getattr(settings, 'PEREVAL_CLUSTER_CACHE_TIMEOUT', 300))
+
+    def invalidate_points(self, points):
+        """Сброс тайлов для точек [(широта, долгота), ...]; повторяется после коммита"""
+        keys = {
+            self.key(*tile)
+            for latitude, longitude in points
+            if latitude is not None and longitude is not None
+            for tile in point_tiles(latitude, longitude)
+        }
+        if not keys:
+            return
+        keys = list(keys)
+        self.cache.delete_many(keys)
+        transaction.on_commit(lambda: self.cache.delete_many(keys))
+
+
+detail_cache = DetailCache()
+cluster_cache = ClusterCache()
@@ -0,0 +1,78 @@
+"""
+Кластеризация перевалов для тайлов карты.
+
+Координаты тайла загружаются одним запросом values_list() прямо в массив
+NumPy. Тайл делится на сетку CLUSTER_GRID x CLUSTER_GRID ячеек в проекции
+Web Mercator, точки раскладываются по ячейкам векторно, а количество и
+центроиды считаются через np.bincount - без цикла Python по точкам.
+Результат кэшируется по тайлу (cache.cluster_cache).
+"""
+import numpy as np
+from django.conf import settings
+
+from .cache import cluster_cache
+from .geo import MERCATOR_MAX_LATITUDE, bbox_q, tile_bounds
+from .models import Pereval
+
+# Ячеек сетки по каждой стороне тайла
+DEFAULT_CLUSTER_GRID = 8
+
+
+def load_tile_points(zoom, x, y):
+    """Массив (n, 3): широта, долгота, высота перевалов тайла"""
+    rows = Pereval.objects.filter(
+        bbox_q(*tile_bounds(zoom, x, y), prefix='coords__')
+    ).order_by().values_list('coords__latitude', 'coords__longitude', 'coords__height')
+    return np.array(list(rows), dtype=np.float64).reshape(-1, 3)
+
+
+def cluster_points(points, zoom, x, y, grid):
+    """Кластеры точек тайла по ячейкам сетки grid x grid: [{"latitude", "longitude", "height", "count"}]"""
+    latitude, longitude, height = points[:, 0], points[:, 1], points[:, 2]
+    n = 2 ** zoom
+    # Положение точек внутри тайла в долях [0, 1) по проекции Web Mercator
+    lat_rad = np.radians(np.clip(latitude, -MERCATOR_MAX_LATITUDE, MERCATOR_MAX_LATITUDE))
+    px = (longitude + 180) / 360 * n - x
+    py = (1 - np.log(np.tan(lat_rad) + 1 / np.cos(lat_rad)) / np.pi) / 2 * n - y
+    # Точки на общей границе соседних тайлов относятся только к одному из них
+    inside = (px >= 0) & (px < 1) & (py >= 0) & (py < 1)
+    px, py = px[inside], py[inside]
+    latitude, longitude, height = latitude[inside], longitude[inside], height[inside]
+
+    rows = np.minimum((py * grid).astype(np.intp), grid - 1)
+    cols = np.minimum((px * grid).astype(np.intp), grid - 1)
+    cells = rows * grid + cols
+    size = grid * grid
+    counts = np.bincount(cells, minlength=size)
+    occupied = np.flatnonzero(counts)
+    occupied_counts = counts[occupied]
+    centroid_lat = np.bincount(cells, weights=latitude, minlength=size)[occupied] / occupied_counts
+    centroid_lon = np.bincount(cells, weights=longitude, minlength=size)[occupied] / occupied_counts
+    mean_height = np.bincount(cells, weights=height, minlength=size)[occupied] / occupied_counts
+
+    return [
+        {
+            "latitude": round(float(lat), 6),
+            "longitude": round(float(lon), 6),
+            "height": int(round(h)),
+            "count": int(count)
+        }
+        for lat, lon, h, count in zip(centroid_lat, centroid_lon, mean_height, occupied_counts)
+    ]
+
+
+def tile_clusters(zoom, x, y):
+    """Кластеры тайла из кэша или с расчетом: {"zoom", "x", "y", "count", "clusters"}"""
+    result = cluster_cache.get(zoom, x, y)
+    if result is None:
+        grid = getattr(settings, 'PEREVAL_CLUSTER_GRID', DEFAULT_CLUSTER_GRID)
+        clusters = cluster_points(load_tile_points(zoom, x, y), zoom, x, y, grid)
+        result = {
+            "zoom": zoom,
+            "x": x,
+            "y": y,
+            "count": sum(cluster["count"] for cluster in clusters),
+            "clusters": clusters
+        }
+        cluster_cache.set(zoom, x, y, result)
+    return result
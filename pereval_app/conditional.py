@@ -0,0 +1,64 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для ресурсов перевалов.
+
+Валидаторы строятся только из (id, updated_at), поэтому проверку
+If-None-Match / If-Modified-Since можно выполнить легким запросом без
+join'ов и выборки изображений, а при совпадении ответить 304.
+"""
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .pagination import paginate
+
+# Поля для легкой проверки страницы списка: позиция курсора + версия записи
+VALIDATOR_FIELDS = ('add_time', 'id', 'updated_at')
+
+
+def has_conditional_headers(request):
+    """Есть ли в запросе заголовки условного GET"""
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def detail_validators(pk, updated_at):
+    """(ETag, Last-Modified timestamp) одного перевала"""
+    return f'"{pk}-{int(updated_at.timestamp() * 1_000_000)}"', int(updated_at.timestamp())
+
+
+def list_validators(entries, next_cursor):
+    """
+    (ETag, Last-Modified timestamp) страницы списка.
+    entries - пары (id, updated_at) записей страницы в порядке выдачи.
+    """
+    digest = hashlib.sha1()
+    for pk, updated_at in entries:
+        digest.update(f"{pk}:{updated_at.timestamp()};".encode('ascii'))
+    digest.update((next_cursor or '').encode('ascii'))
+    last_modified = max((updated_at for _, updated_at in entries), default=None)
+    return f'"{digest.hexdigest()}"', int(last_modified.timestamp()) if last_modified else None
+
+
+def page_validators(queryset, cursor, page_size):
+    """Валидаторы страницы списка одним запросом по (add_time, id, updated_at)"""
+    rows, next_cursor = paginate(
+        queryset.values_list(*VALIDATOR_FIELDS), cursor, page_size, position=lambda row: (row[0], row[1])
+    )
+    return list_validators([(pk, updated_at) for _, pk, updated_at in rows], next_cursor)
+
+
+def not_modified(request, etag, last_modified):
+    """HttpResponseNotModified, если у клиента актуальная версия, иначе None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if isinstance(response, HttpResponseNotModified):
+        return response
+    return None
+
+
+def set_validators(response, etag, last_modified):
+    """Заголовки ETag и Last-Modified в ответе"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,128 @@
+"""
+Потоковое декодирование base64-изображений из JSON.
+
+Строка data:image/<ext>;base64,<данные> декодируется кусками фиксированного
+размера, без копии через split() и без полного bytes-объекта в памяти.
+Сигнатура файла проверяется по первым байтам, размер - до начала
+декодирования. Небольшие файлы остаются в памяти, а при превышении
+FILE_UPLOAD_MAX_MEMORY_SIZE данные переносятся во временный файл на
+диске (как это делают upload handlers Django). У временного файла есть
+temporary_file_path(): Pillow проверяет его по пути, а FileSystemStorage
+перемещает его на место без копирования.
+"""
+import binascii
+import re
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+
+# Размер куска base64 в символах (кратен 4)
+CHUNK_CHARS = 64 * 1024
+
+BASE64_MARKER = ';base64,'
+
+# Поддерживаемые форматы - общий список для base64 и POST /uploads/:
+# формат Pillow -> расширение сохраненного файла
+IMAGE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+IMAGE_FORMATS_TEXT = ", ".join(IMAGE_FORMATS)
+# Формат по <ext> из data:image/<ext>;base64 (image/jpeg и image/jpg - JPEG)
+DATA_URI_FORMATS = {
+    **{ext: image_format for image_format, ext in IMAGE_FORMATS.items()},
+    **{image_format.lower(): image_format for image_format in IMAGE_FORMATS},
+}
+# Сигнатуры (magic bytes) форматов
+SIGNATURES = {
+    'JPEG': re.compile(b'\xff\xd8\xff'),
+    'PNG': re.compile(b'\x89PNG\r\n\x1a\n'),
+    'WEBP': re.compile(b'RIFF.{4}WEBP', re.DOTALL),
+    'GIF': re.compile(b'GIF8[79]a'),
+}
+SIGNATURE_SIZE = 12
+
+
+def _check_signature(head, signature, ext):
+    if not signature.match(head):
+        raise ValueError(f"Данные не являются изображением {ext}")
+
+
+def parse_data_uri(data):
+    """(расширение, смещение начала base64-данных) для строки data:image/<ext>;base64,..."""
+    marker = data.find(BASE64_MARKER)
+    if marker == -1:
+        raise ValueError("ожидается формат data:image/<формат>;base64,<данные>")
+    return data[:marker].split('/')[-1].lower(), marker + len(BASE64_MARKER)
+
+
+def _chunks(data, start, chunk_chars):
+    """Куски base64 с длиной, кратной 4; пробелы и переводы строк отбрасываются"""
+    carry = ''
+    for pos in range(start, len(data), chunk_chars):
+        chunk = carry + ''.join(data[pos:pos + chunk_chars].split())
+        usable = len(chunk) - len(chunk) % 4
+        carry = chunk[usable:]
+        if usable:
+            yield chunk[:usable]
+    if carry:
+        # Неполная последняя группа - a2b_base64 сообщит о неверном выравнивании
+        yield carry
+
+
+def decode_base64_image(data, max_size, chunk_chars=CHUNK_CHARS, memory_size=None):
+    """
+    Декодирует data:image/<ext>;base64,... в UploadedFile.
+    Бросает ValueError, если формат не поддерживается, данные повреждены,
+    сигнатура не совпадает с заявленным форматом или файл слишком большой.
+    """
+    ext, start = parse_data_uri(data)
+    if ext not in DATA_URI_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат изображения: {ext} (поддерживаются {IMAGE_FORMATS_TEXT})")
+    image_format = DATA_URI_FORMATS[ext]
+    # Верхняя оценка размера без декодирования
+    if (len(data) - start) * 3 // 4 > max_size:
+        raise ValueError(f"Максимальный размер изображения - {max_size // (1024 * 1024)} МБ")
+    if memory_size is None:
+        memory_size = settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+
+    name = f"{uuid.uuid4().hex[:10]}.{IMAGE_FORMATS[image_format]}"
+    content_type = f"image/{image_format.lower()}"
+    signature = SIGNATURES[image_format]
+    buffer = BytesIO()
+    on_disk = None
+    head = b''
+    size = 0
+    try:
+        for chunk in _chunks(data, start, chunk_chars):
+            try:
+                decoded = binascii.a2b_base64(chunk)
+            except binascii.Error as e:
+                raise ValueError(str(e))
+            if head is not None:
+                # Сигнатура проверяется, как только набралось достаточно байт
+                head += decoded[:SIGNATURE_SIZE]
+                if len(head) >= SIGNATURE_SIZE:
+                    _check_signature(head, signature, ext)
+                    head = None
+            size += len(decoded)
+            if on_disk is None and size > memory_size:
+                # Переносим уже декодированное во временный файл и дальше пишем туда
+                on_disk = TemporaryUploadedFile(name, content_type, 0, None)
+                on_disk.write(buffer.getvalue())
+                buffer = None
+            (buffer if on_disk is None else on_disk).write(decoded)
+        if size == 0:
+            raise ValueError("Пустое изображение")
+        if head is not None:
+            _check_signature(head, signature, ext)
+    except Exception:
+        if on_disk is not None:
+            on_disk.close()
+        raise
+
+    if on_disk is not None:
+        on_disk.size = size
+        on_disk.seek(0)
+        return on_disk
+    buffer.seek(0)
+    return InMemoryUploadedFile(buffer, None, name, content_type, size, None)
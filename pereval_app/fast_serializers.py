@@ -0,0 +1,176 @@
+"""
+Быстрая сериализация перевалов для ответов API.
+
+Записи читаются через values_list() одним запросом с join'ами на user,
+coords и level, изображения - вторым запросом по списку id. Модели не
+создаются: каждая строка - кортеж с фиксированным порядком полей,
+который распаковывается прямо в итоговый словарь.
+"""
+from .models import Image
+
+# Порядок полей строки; serialize_row распаковывает кортеж в этом же порядке
+PEREVAL_FIELDS = (
+    'id', 'beauty_title', 'title', 'other_titles', 'connect', 'add_time', 'status',
+    'user__email', 'user__fam', 'user__name', 'user__otc', 'user__phone',
+    'coords__latitude', 'coords__longitude', 'coords__height',
+    'level__winter', 'level__summer', 'level__autumn', 'level__spring',
+    'updated_at',
+)
+ID_INDEX = PEREVAL_FIELDS.index('id')
+ADD_TIME_INDEX = PEREVAL_FIELDS.index('add_time')
+STATUS_INDEX = PEREVAL_FIELDS.index('status')
+UPDATED_AT_INDEX = PEREVAL_FIELDS.index('updated_at')
+
+IMAGE_FIELDS = ('pereval_id', 'id', 'image', 'title', 'thumbnail', 'web')
+
+
+def row_position(row):
+    """Позиция строки для keyset-пагинации: (add_time, id)"""
+    return row[ADD_TIME_INDEX], row[ID_INDEX]
+
+
+def row_version(row):
+    """Версия строки для ETag: (id, updated_at)"""
+    return row[ID_INDEX], row[UPDATED_AT_INDEX]
+
+
+def image_url_builder(request):
+    """
+    Функция name -> абсолютный URL изображения.
+    Адрес хоста вычисляется один раз на запрос, а не для каждого изображения.
+    """
+    storage = Image._meta.get_field('image').storage
+    origin = request.build_absolute_uri('/')[:-1]
+
+    def build(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return origin + url if url.startswith('/') else url
+
+    return build
+
+
+def fetch_image_rows(pereval_ids):
+    """
+    Изображения для набора перевалов:
+    {pereval_id: [(id, имя файла, название, миниатюра, веб-версия), ...]}.
+    Пока изображение не обработано, имена миниатюры и веб-версии пустые.
+    """
+    if not pereval_ids:
+        return {}
+    return group_image_rows(image_rows_queryset(pereval_ids))
+
+
+async def afetch_image_rows(pereval_ids):
+    """fetch_image_rows() на асинхронном ORM"""
+    if not pereval_ids:
+        return {}
+    return group_image_rows([row async for row in image_rows_queryset(pereval_ids)])
+
+
+def image_rows_queryset(pereval_ids):
+    """Queryset кортежей IMAGE_FIELDS для набора перевалов"""
+    return Image.objects.filter(
+        pereval_id__in=pereval_ids
+    ).exclude(image='').order_by('id').values_list(*IMAGE_FIELDS)
+
+
+def group_image_rows(rows):
+    """Кортежи IMAGE_FIELDS -> {pereval_id: [(id, имя файла, название, миниатюра, веб-версия), ...]}"""
+    images = {}
+    for pereval_id, pk, name, title, thumbnail, web in rows:
+        images.setdefault(pereval_id, []).append((pk, name, title, thumbnail, web))
+    return images
+
+
+def build_images(image_rows, request):
+    """Строки fetch_image_rows -> {pereval_id: [{"id", "image_url", "title", "thumbnail_url", "web_url"}, ...]}"""
+    build_url = image_url_builder(request)
+    return {
+        pereval_id: [
+            {
+                "id": pk,
+                "image_url": build_url(name),
+                "title": title,
+                "thumbnail_url": build_url(thumbnail),
+                "web_url": build_url(web)
+            }
+            for pk, name, title, thumbnail, web in items
+        ]
+        for pereval_id, items in image_rows.items()
+    }
+
+
+def fetch_images(pereval_ids, request):
+    """Изображения для набора перевалов: {pereval_id: [{"image_url", "title", ...}, ...]}"""
+    return build_images(fetch_image_rows(pereval_ids), request)
+
+
+def serialize_row(row, images):
+    """Кортеж из values_list(*PEREVAL_FIELDS) -> словарь ответа API"""
+    (pk, beauty_title, title, other_titles, connect, add_time, status,
+     email, fam, name, otc, phone,
+     latitude, longitude, height,
+     winter, summer, autumn, spring,
+     updated_at) = row
+    return {
+        "id": pk,
+        "beauty_title": beauty_title,
+        "title": title,
+        "other_titles": other_titles,
+        "connect": connect,
+        "add_time": add_time,
+        "status": status,
+        "user": {
+            "email": email,
+            "fam": fam,
+            "name": name,
+            "otc": otc,
+            "phone": phone
+        },
+        "coords": {
+            "latitude": float(latitude),
+            "longitude": float(longitude),
+            "height": height
+        },
+        "level": {
+            "winter": winter,
+            "summer": summer,
+            "autumn": autumn,
+            "spring": spring
+        },
+        "images": images.get(pk, [])
+    }
+
+
+def pereval_rows(queryset):
+    """Queryset перевалов -> queryset кортежей PEREVAL_FIELDS"""
+    return queryset.values_list(*PEREVAL_FIELDS)
+
+
+def serialize_rows(rows, request):
+    """Сериализация уже выбранных строк (2-й запрос - только изображения)"""
+    images = fetch_images([row[ID_INDEX] for row in rows], request)
+    return [serialize_row(row, images) for row in rows]
+
+
+async def aserialize_rows(rows, request):
+    """serialize_rows() на асинхронном ORM"""
+    images = build_images(await afetch_image_rows([row[ID_INDEX] for row in rows]), request)
+    return [serialize_row(row, images) for row in rows]
+
+
+def iter_serialized(rows, request, chunk_size):
+    """
+    Потоковая сериализация: строки читаются чанками через .iterator(),
+    изображения подгружаются одним запросом на чанк.
+    """
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from serialize_rows(chunk, request)
+            chunk = []
+    if chunk:
+        yield from serialize_rows(chunk, request)
@@ -0,0 +1,153 @@
+"""
+Поиск перевалов по координатам без PostGIS.
+
+Поверхность делится на ячейки сетки TILE_DEGREES x TILE_DEGREES градусов,
+номер ячейки (tile) хранится в Coords с B-tree индексом:
+    tile = строка * TILE_COLS + столбец
+Ячейки одной строки сетки идут подряд, поэтому прямоугольник (bbox)
+превращается в несколько диапазонов tile BETWEEN a AND b - по одному на
+строку. Точная проверка делается по широте/долготе, для радиуса - по
+формуле гаверсинусов над небольшим набором кандидатов.
+"""
+import math
+
+from django.db.models import Q
+
+# Размер ячейки сетки в градусах (~11 км по широте)
+TILE_DEGREES = 0.1
+TILE_ROWS = round(180 / TILE_DEGREES)
+TILE_COLS = round(360 / TILE_DEGREES)
+# При большем числе строк bbox ищется одним диапазоном от первой до последней строки
+MAX_TILE_RANGES = 64
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Тайлы карты: максимальный масштаб и граница широты проекции Web Mercator
+MAX_MAP_ZOOM = 18
+MERCATOR_MAX_LATITUDE = 85.0511287798
+
+# Радиус поиска по умолчанию и максимальный, км
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+
+
+def parse_number(params, name, low, high, default=None):
+    """Число из параметра запроса в пределах [low, high]; ValueError, если параметр некорректен"""
+    value = params.get(name)
+    if value in (None, ''):
+        if default is None:
+            raise ValueError(f"Не указан параметр {name}")
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Некорректный {name}: {value}")
+    if not math.isfinite(number) or not low <= number <= high:
+        raise ValueError(f"{name} должен быть в диапазоне от {low} до {high}")
+    return number
+
+
+def tile_row(latitude):
+    return min(max(int((float(latitude) + 90) // TILE_DEGREES), 0), TILE_ROWS - 1)
+
+
+def tile_col(longitude):
+    return min(max(int((float(longitude) + 180) // TILE_DEGREES), 0), TILE_COLS - 1)
+
+
+def tile_key(latitude, longitude):
+    """Номер ячейки сетки для точки"""
+    return tile_row(latitude) * TILE_COLS + tile_col(longitude)
+
+
+def tile_ranges(south, west, north, east):
+    """
+    Диапазоны номеров ячеек [(от, до), ...], покрывающие bbox.
+    west > east - bbox пересекает 180-й меридиан.
+    """
+    row_from, row_to = tile_row(south), tile_row(north)
+    if west <= east:
+        col_spans = [(tile_col(west), tile_col(east))]
+    else:
+        col_spans = [(tile_col(west), TILE_COLS - 1), (0, tile_col(east))]
+    if row_to - row_from + 1 > MAX_TILE_RANGES / len(col_spans):
+        return [(row_from * TILE_COLS, row_to * TILE_COLS + TILE_COLS - 1)]
+    return [
+        (row * TILE_COLS + col_from, row * TILE_COLS + col_to)
+        for row in range(row_from, row_to + 1)
+        for col_from, col_to in col_spans
+    ]
+
+
+def bbox_q(south, west, north, east, prefix=''):
+    """Условие попадания координат в bbox: диапазоны tile по индексу + точная проверка"""
+    tiles = Q()
+    for tile_from, tile_to in tile_ranges(south, west, north, east):
+        tiles |= Q(**{f'{prefix}tile__range': (tile_from, tile_to)})
+    longitude = Q(**{f'{prefix}longitude__range': (west, east)}) if west <= east else (
+        Q(**{f'{prefix}longitude__gte': west}) | Q(**{f'{prefix}longitude__lte': east})
+    )
+    return tiles & Q(**{f'{prefix}latitude__range': (south, north)}) & longitude
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """bbox (south, west, north, east), содержащий круг радиуса radius_km"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    # У полюса круг охватывает все долготы
+    max_abs_lat = max(abs(south), abs(north))
+    if max_abs_lat >= 90 or radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(max_abs_lat))) >= math.pi:
+        return south, -180.0, north, 180.0
+    lon_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(max_abs_lat))))
+    west, east = longitude - lon_delta, longitude + lon_delta
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def tile_bounds(zoom, x, y):
+    """Границы тайла карты zoom/x/y (Web Mercator, как у OSM): (south, west, north, east)"""
+    n = 2 ** zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return latitude(y + 1), x / n * 360 - 180, latitude(y), (x + 1) / n * 360 - 180
+
+
+def point_tiles(latitude, longitude, max_zoom=MAX_MAP_ZOOM):
+    """Тайлы карты (zoom, x, y), содержащие точку, для масштабов 0..max_zoom"""
+    latitude = min(max(float(latitude), -MERCATOR_MAX_LATITUDE), MERCATOR_MAX_LATITUDE)
+    lat_rad = math.radians(latitude)
+    x_frac = (float(longitude) + 180) / 360
+    y_frac = (1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2
+    tiles = []
+    for zoom in range(max_zoom + 1):
+        n = 2 ** zoom
+        tiles.append((zoom, min(int(x_frac * n), n - 1), min(max(int(y_frac * n), 0), n - 1)))
+    return tiles
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Расстояние по большому кругу в километрах"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def nearest(candidates, latitude, longitude, radius_km, limit):
+    """
+    Кандидаты [(id, широта, долгота), ...] -> [(id, расстояние), ...]
+    в пределах радиуса, ближайшие первыми.
+    """
+    found = []
+    for pk, lat, lon in candidates:
+        distance = haversine_km(latitude, longitude, float(lat), float(lon))
+        if distance <= radius_km:
+            found.append((distance, pk))
+    found.sort()
+    return [(pk, distance) for distance, pk in found[:limit]]
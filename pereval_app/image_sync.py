@@ -0,0 +1,66 @@
+"""
+Обновление изображений перевала в PATCH по разнице со списком клиента.
+
+Список images в PATCH - итоговый набор изображений. Вместо удаления всех
+изображений и создания их заново:
+    - элемент с id оставляет существующее изображение (меняется только название);
+    - новый файл, совпадающий по SHA-256 с существующим изображением,
+      оставляет его без повторной записи и обработки;
+    - остальные новые файлы создаются, а не упомянутые изображения удаляются.
+Файлы удаленных изображений освобождаются после коммита (сигнал post_delete Image).
+"""
+from .models import Image
+from .processing import schedule_processing
+from .storage import content_digest, file_digest
+
+
+class ImageSyncError(ValueError):
+    """Изображение из запроса не принадлежит перевалу"""
+
+
+def _digest(image):
+    """SHA-256 нового изображения: из имени загрузки (token) или по содержимому файла"""
+    if isinstance(image, str):
+        return content_digest(image)
+    return file_digest(image)
+
+
+def sync_images(pereval, images_data):
+    """
+    Приводит изображения перевала к images_data (validated_data ImageUpdateSerializer).
+    Вызывается внутри транзакции PATCH после claim_uploads.
+    Возвращает (создано, изменено, удалено).
+    """
+    existing = {image.id: image for image in pereval.images.order_by('id')}
+    by_digest = {}
+    for image in existing.values():
+        by_digest.setdefault(content_digest(image.image.name), []).append(image)
+
+    kept, renamed, created = set(), [], []
+    for img_data in images_data:
+        if 'id' in img_data:
+            image = existing.get(img_data['id'])
+            if image is None or image.id in kept:
+                raise ImageSyncError(f"Изображение {img_data['id']} не найдено у перевала")
+        else:
+            digest = _digest(img_data['image'])
+            candidates = [image for image in by_digest.get(digest, []) if image.id not in kept] if digest else []
+            if not candidates:
+                created.append(Image(pereval=pereval, image=img_data['image'], title=img_data['title']))
+                continue
+            image = candidates[0]
+        kept.add(image.id)
+        if image.title != img_data['title']:
+            image.title = img_data['title']
+            renamed.append(image)
+
+    removed = [image for image in existing.values() if image.id not in kept]
+    if removed:
+        Image.objects.filter(id__in=[image.id for image in removed]).delete()
+    if renamed:
+        Image.objects.bulk_update(renamed, ['title'])
+    if created:
+        # bulk_create не отправляет сигналы - обработка ставится в очередь явно
+        created = Image.objects.bulk_create(created)
+        schedule_processing(image.pk for image in created)
+    return len(created), len(renamed), len(removed)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from pereval_app.models import Image
+from pereval_app.processing import process_images
+
+
+class Command(BaseCommand):
+    """Синхронная обработка изображений, для которых еще нет миниатюры и веб-версии"""
+    help = "Строит миниатюры и веб-версии для необработанных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Обработать заново все изображения")
+
+    def handle(self, *args, **options):
+        images = Image.objects.exclude(image='')
+        if not options['all']:
+            images = images.filter(processed_at__isnull=True)
+        ids = list(images.order_by('id').values_list('id', flat=True))
+        process_images(ids)
+        self.stdout.write(f"Обработано изображений: {len(ids)}")
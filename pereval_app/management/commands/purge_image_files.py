@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from pereval_app.models import Image, ImageUpload
+from pereval_app.storage import content_storage, delete_unreferenced, grace_seconds, stored_names
+
+# Проверка ссылок - пачками, чтобы не собирать огромный IN (...)
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    """Удаление файлов изображений, на которые не ссылается ни одна запись"""
+    help = (
+        "Удаляет файлы изображений без ссылок из Image и ImageUpload, "
+        "не использовавшиеся дольше PEREVAL_FILE_GRACE_SECONDS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help="Минимальный возраст файла в секундах (по умолчанию PEREVAL_FILE_GRACE_SECONDS)"
+        )
+
+    def handle(self, *args, **options):
+        grace = grace_seconds() if options['grace'] is None else options['grace']
+        directories = {
+            field.upload_to.rstrip('/').split('/')[0]
+            for model in (Image, ImageUpload)
+            for field in model._meta.get_fields()
+            if getattr(field, 'storage', None) is content_storage
+        }
+        checked = removed = 0
+        for directory in sorted(directories):
+            if not content_storage.exists(directory):
+                continue
+            batch = []
+            for name in stored_names(content_storage, directory):
+                batch.append(name)
+                if len(batch) >= BATCH_SIZE:
+                    removed += len(delete_unreferenced(content_storage, set(batch), grace))
+                    checked += len(batch)
+                    batch = []
+            removed += len(delete_unreferenced(content_storage, set(batch), grace))
+            checked += len(batch)
+        self.stdout.write(f"Проверено файлов: {checked}, удалено: {removed}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from pereval_app.storage import release_files
+from pereval_app.uploads import expired_uploads
+
+
+class Command(BaseCommand):
+    """Удаление неиспользованных загрузок изображений с истекшим сроком (вместе с файлами)"""
+    help = "Удаляет просроченные загрузки изображений (POST /uploads/) и их файлы"
+
+    def handle(self, *args, **options):
+        removed = 0
+        for upload in expired_uploads().iterator():
+            storage, name = upload.image.storage, upload.image.name
+            upload.delete()
+            # Тот же файл мог быть загружен повторно или уже принадлежать изображению
+            release_files(storage, [name])
+            removed += 1
+        self.stdout.write(f"Удалено загрузок: {removed}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from pereval_app.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Полный пересчет поискового индекса перевалов"""
+    help = "Пересчитывает поисковый индекс (tsvector в PostgreSQL, FTS5 в SQLite) для всех перевалов"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Проиндексировано перевалов: {rebuild_index()}")
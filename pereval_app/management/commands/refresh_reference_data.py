@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from pereval_app.reference import reference_data
+
+
+class Command(BaseCommand):
+    """Перестроение снимка справочников во всех процессах"""
+    help = "Увеличивает версию справочников (регионы, виды активностей) в кэше: процессы перестроят снимок"
+
+    def handle(self, *args, **options):
+        reference_data.invalidate()
+        snapshot = reference_data.get()
+        self.stdout.write(
+            f"Версия справочников: {snapshot.version} "
+            f"(регионов: {len(snapshot.areas)}, видов активностей: {len(snapshot.activities)})"
+        )
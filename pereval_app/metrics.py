@@ -0,0 +1,309 @@
+"""
+Метрики запросов: время по фазам, SQL, объем данных (FSTR_METRICS=1).
+
+MetricsMiddleware на время запроса кладет в contextvar объект
+RequestMetrics; участки кода отмечаются через phase():
+
+    with phase('decode'):
+        ...
+
+Запросы к базе считает execute_wrapper, который ставится на каждое
+соединение при его создании (фаза db).
+
+Итоги запроса уходят в заголовок Server-Timing и в гистограммы процесса,
+которые отдает GET /metrics в текстовом формате Prometheus. Гистограммы
+свои у каждого процесса: при нескольких воркерах сервер метрик видит тот,
+который ответил на запрос.
+
+Без PEREVAL_METRICS middleware исключается из цепочки (MiddlewareNotUsed),
+execute_wrapper не ставится, а phase() возвращает общий nullcontext после
+одного ContextVar.get().
+"""
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024)
+
+_current = ContextVar('pereval_request_metrics', default=None)
+_no_phase = contextlib.nullcontext()
+
+
+def enabled():
+    return getattr(settings, 'PEREVAL_METRICS', False)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Histogram:
+    """Гистограмма с метками: счетчики по корзинам, сумма и число наблюдений на набор меток"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self.lock:
+            snapshot = [(values, list(counts), total, count) for values, (counts, total, count) in self.series.items()]
+        for values, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labels + ('le',), values + (format_value(bound),))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = format_labels(self.labels, values)
+            yield f'{self.name}_sum{labels} {format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Registry:
+    """Метрики процесса и их текстовое представление для Prometheus"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self.metrics:
+            with metric.lock:
+                metric.series.clear()
+
+
+registry = Registry()
+request_duration = registry.register(Histogram(
+    'pereval_http_request_duration_seconds', 'Время обработки запроса', ('method', 'view', 'status')
+))
+phase_duration = registry.register(Histogram(
+    'pereval_phase_duration_seconds', 'Время фазы запроса (decode, pillow, storage, db, parse, render)',
+    ('view', 'phase')
+))
+sql_queries = registry.register(Histogram(
+    'pereval_sql_queries', 'Число SQL-запросов на запрос', ('view',), QUERY_BUCKETS
+))
+request_size = registry.register(Histogram(
+    'pereval_http_request_size_bytes', 'Размер тела запроса', ('view',), SIZE_BUCKETS
+))
+response_size = registry.register(Histogram(
+    'pereval_http_response_size_bytes', 'Размер тела ответа (ответы с Content-Length)', ('view',), SIZE_BUCKETS
+))
+
+
+# Итоги запросов ждут раскладки по гистограммам: в запросе - только append, корзины - при чтении /metrics
+pending = deque()
+FLUSH_SIZE = 1000
+
+
+def record(entry):
+    """(method, view, status, total, phases, queries, CONTENT_LENGTH, Content-Length) запроса"""
+    pending.append(entry)
+    if len(pending) >= FLUSH_SIZE:
+        flush()
+
+
+def parse_size(value):
+    try:
+        return int(value or 0)
+    except ValueError:
+        return None
+
+
+def flush():
+    """Накопленные итоги запросов - в гистограммы"""
+    while True:
+        try:
+            method, view, status, total, phases, queries, size_in, size_out = pending.popleft()
+        except IndexError:
+            return
+        request_duration.observe(total, method, view, str(status))
+        for name, seconds in phases.items():
+            phase_duration.observe(seconds, view, name)
+        sql_queries.observe(queries, view)
+        size_in = parse_size(size_in)
+        if size_in is not None:
+            request_size.observe(size_in, view)
+        if size_out is not None:
+            response_size.observe(parse_size(size_out) or 0, view)
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus"""
+    flush()
+    return registry.render()
+
+
+def reset():
+    pending.clear()
+    registry.clear()
+
+
+class RequestMetrics:
+    """Накопленные за запрос времена фаз (секунды) и число SQL-запросов"""
+    __slots__ = ('phases', 'queries')
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Время и число запросов к базе; вне запроса с метриками - прямой вызов"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.add('db', time.perf_counter() - start)
+
+
+def install_execute_wrapper(sender=None, connection=None, **kwargs):
+    """
+    Обработчик connection_created: execute_wrapper ставится на соединение один
+    раз, а не на каждый запрос - обход connections.all() через asgiref.Local
+    стоит несколько микросекунд.
+    """
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+class Phase:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.add(self.name, time.perf_counter() - self.start)
+
+
+def phase(name):
+    """Контекстный менеджер, добавляющий время блока к фазе name текущего запроса"""
+    metrics = _current.get()
+    if metrics is None:
+        return _no_phase
+    return Phase(metrics, name)
+
+
+def server_timing(metrics, total):
+    """Значение заголовка Server-Timing: фазы, db с числом запросов и total, в миллисекундах"""
+    entries = [
+        f'db;dur={seconds * 1000:.2f};desc="{metrics.queries} queries"' if name == 'db'
+        else f'{name};dur={seconds * 1000:.2f}'
+        for name, seconds in metrics.phases.items()
+    ]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """Замер запроса целиком; должен стоять первым в MIDDLEWARE"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        connection_created.connect(install_execute_wrapper, dispatch_uid='pereval_metrics')
+        # Соединения, созданные до загрузки middleware
+        for connection in connections.all(initialized_only=True):
+            install_execute_wrapper(connection=connection)
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'PEREVAL_METRICS_SERVER_TIMING', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        match = request.resolver_match
+        # Имя маршрута, а не путь: число наборов меток не растет с числом id
+        view = match.view_name if match else 'unmatched'
+        # Content-Length ответа выставляет CommonMiddleware - без склейки тела
+        record((request.method, view, response.status_code, total, metrics.phases, metrics.queries,
+                request.META.get('CONTENT_LENGTH'), response.get('Content-Length')))
+        if self.server_timing:
+            response['Server-Timing'] = server_timing(metrics, total)
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 03:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0002_coords_image_level_pereval_user_delete_perevaladded_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='pereval',
+            options={'ordering': ['-add_time', '-id'], 'verbose_name': 'Перевал', 'verbose_name_plural': 'Перевалы'},
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    """Для существующих записей версия = время добавления"""
+    Pereval = apps.get_model('pereval_app', 'Pereval')
+    Pereval.objects.using(schema_editor.connection.alias).update(updated_at=models.F('add_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0003_alter_pereval_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pereval',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
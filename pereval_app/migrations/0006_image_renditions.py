@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0005_imageupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время обработки'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Размер, байт'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='pereval_images/thumbs/%Y/%m/%d/', verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='web',
+            field=models.ImageField(blank=True, upload_to='pereval_images/web/%Y/%m/%d/', verbose_name='Версия для веба'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-17 03:30
+
+import pereval_app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0006_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(storage=pereval_app.storage.ContentAddressedStorage(), upload_to='pereval_images/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, storage=pereval_app.storage.ContentAddressedStorage(), upload_to='pereval_images/thumbs/', verbose_name='Миниатюра'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='web',
+            field=models.ImageField(blank=True, storage=pereval_app.storage.ContentAddressedStorage(), upload_to='pereval_images/web/', verbose_name='Версия для веба'),
+        ),
+        migrations.AlterField(
+            model_name='imageupload',
+            name='image',
+            field=models.ImageField(storage=pereval_app.storage.ContentAddressedStorage(), upload_to='pereval_images/', verbose_name='Изображение'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0007_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pereval',
+            index=models.Index(fields=['user', '-add_time', '-id'], name='pereval_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pereval',
+            index=models.Index(fields=['status', '-add_time', '-id'], name='pereval_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pereval',
+            index=models.Index(condition=models.Q(('status', 'new')), fields=['-add_time', '-id'], name='pereval_new_time_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-17 03:33
+
+import pereval_app.models
+from django.db import migrations
+
+from pereval_app.geo import tile_key
+
+
+def fill_tiles(apps, schema_editor):
+    """Номер ячейки для существующих координат"""
+    Coords = apps.get_model('pereval_app', 'Coords')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for coords in Coords.objects.using(db_alias).only('latitude', 'longitude').iterator(chunk_size=2000):
+        coords.tile = tile_key(coords.latitude, coords.longitude)
+        batch.append(coords)
+        if len(batch) >= 2000:
+            Coords.objects.using(db_alias).bulk_update(batch, ['tile'])
+            batch = []
+    if batch:
+        Coords.objects.using(db_alias).bulk_update(batch, ['tile'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0008_pereval_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coords',
+            name='tile',
+            field=pereval_app.models.TileKeyField(db_index=True, editable=False, null=True, verbose_name='Ячейка сетки'),
+        ),
+        migrations.RunPython(fill_tiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-17 03:37
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс по tsvector в PostgreSQL, таблица FTS5 в SQLite; заполнение для существующих записей"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE pereval SET search_vector = "
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(other_titles, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(connect, '')), 'C') || "
+            "setweight(to_tsvector('russian', coalesce(beauty_title, '')), 'D')"
+        )
+        schema_editor.execute("CREATE INDEX pereval_search_vector_gin ON pereval USING gin (search_vector)")
+    elif vendor == 'sqlite':
+        from pereval_app.search import stem_text
+
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE pereval_search USING fts5(title, other_titles, connect, beauty_title)"
+        )
+        Pereval = apps.get_model('pereval_app', 'Pereval')
+        rows = Pereval.objects.using(schema_editor.connection.alias).values_list('id', 'title', 'other_titles', 'connect', 'beauty_title')
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO pereval_search (rowid, title, other_titles, connect, beauty_title) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(row[0], *(stem_text(value) for value in row[1:])) for row in rows.iterator()]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS pereval_search_vector_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS pereval_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0009_coords_tile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pereval',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
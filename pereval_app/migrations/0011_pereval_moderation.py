@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0010_pereval_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pereval',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взят в работу'),
+        ),
+        migrations.AddField(
+            model_name='pereval',
+            name='moderator',
+            field=models.CharField(blank=True, default='', max_length=150, verbose_name='Модератор'),
+        ),
+        migrations.AddIndex(
+            model_name='pereval',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['claimed_at'], name='pereval_pending_claim_idx'),
+        ),
+    ]
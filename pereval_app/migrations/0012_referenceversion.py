@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    ReferenceVersion = apps.get_model('pereval_app', 'ReferenceVersion')
+    ReferenceVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pereval_app', '0011_pereval_moderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия справочников',
+                'verbose_name_plural': 'Версия справочников',
+                'db_table': 'reference_version',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
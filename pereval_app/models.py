@@ -1,5 +1,11 @@
+import uuid
+
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from .geo import tile_key
+from .storage import content_storage
+
 
 class User(models.Model):
     """Модель пользователя"""
@@ -18,11 +24,33 @@ class User(models.Model):
         return f"{self.fam} {self.name} ({self.email})"
 
 
+class TileKeyField(models.IntegerField):
+    """
+    Номер ячейки сетки (geo.tile_key) по широте и долготе записи.
+    Вычисляется в pre_save - в том числе при bulk_create, где save() не вызывается.
+    """
+
+    def pre_save(self, model_instance, add):
+        value = tile_key(model_instance.latitude, model_instance.longitude)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class Coords(models.Model):
     """Модель координат"""
     latitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name="Широта")
     longitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name="Долгота")
     height = models.IntegerField(verbose_name="Высота")
+    # Пространственный индекс без PostGIS: поиск по bbox/радиусу идет по диапазонам tile
+    tile = TileKeyField(null=True, editable=False, db_index=True, verbose_name="Ячейка сетки")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Положение при загрузке: при изменении координат сбрасываются и тайлы карты старой точки
+        loaded = dict(zip(field_names, values))
+        instance._loaded_position = (loaded.get('latitude'), loaded.get('longitude'))
+        return instance
 
     class Meta:
         db_table = 'pereval_coords'
@@ -83,6 +111,23 @@ class SprActivitiesTypes(models.Model):
         return self.title
 
 
+class ReferenceVersion(models.Model):
+    """
+    Номер версии справочников (одна строка). Увеличивается в транзакции,
+    изменившей справочник; процессы сверяют с ним свой снимок
+    (reference.ReferenceData).
+    """
+    version = models.BigIntegerField(default=0, verbose_name="Версия")
+
+    class Meta:
+        db_table = 'reference_version'
+        verbose_name = 'Версия справочников'
+        verbose_name_plural = 'Версия справочников'
+
+    def __str__(self):
+        return str(self.version)
+
+
 class Pereval(models.Model):
     """Основная модель перевала"""
     STATUS_CHOICES = [
@@ -97,6 +142,10 @@ class Pereval(models.Model):
     other_titles = models.CharField(max_length=255, verbose_name="Другие названия", blank=True)
     connect = models.CharField(max_length=255, verbose_name="Соединяет", blank=True)
     add_time = models.DateTimeField(auto_now_add=True, verbose_name="Время добавления")
+    # Обновляется при каждом сохранении и при изменении изображений; основа ETag/Last-Modified
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время изменения")
+    # Поисковый вектор PostgreSQL (search.py); в SQLite не используется - там индекс FTS5
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name="Поисковый вектор")
 
     # Связи с другими моделями
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь", related_name='perevals')
@@ -129,12 +178,25 @@ class Pereval(models.Model):
         default='new',
         verbose_name="Статус"
     )
+    # Модерация (moderation.py): кто и когда взял запись в работу
+    moderator = models.CharField(max_length=150, blank=True, default='', verbose_name="Модератор")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Взят в работу")
 
     class Meta:
         db_table = 'pereval'
         verbose_name = 'Перевал'
         verbose_name_plural = 'Перевалы'
-        ordering = ['-add_time']
+        ordering = ['-add_time', '-id']
+        # Индексы под реальные запросы: список по email пользователя и модерация по статусу,
+        # оба в порядке ordering - выборка страницы без сортировки
+        indexes = [
+            models.Index(fields=['user', '-add_time', '-id'], name='pereval_user_time_idx'),
+            models.Index(fields=['status', '-add_time', '-id'], name='pereval_status_time_idx'),
+            models.Index(fields=['-add_time', '-id'], condition=models.Q(status='new'),
+                         name='pereval_new_time_idx'),
+            models.Index(fields=['claimed_at'], condition=models.Q(status='pending'),
+                         name='pereval_pending_claim_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.beauty_title}) - {self.get_status_display()}"
@@ -147,10 +209,20 @@ class Pereval(models.Model):
 class Image(models.Model):
     """Модель изображения"""
     pereval = models.ForeignKey(Pereval, on_delete=models.CASCADE, related_name='images', verbose_name="Перевал")
-    image = models.ImageField(upload_to='pereval_images/%Y/%m/%d/', verbose_name="Изображение")
+    image = models.ImageField(upload_to='pereval_images/', storage=content_storage, verbose_name="Изображение")
     title = models.CharField(max_length=255, verbose_name="Название изображения")
     date_added = models.DateTimeField(auto_now_add=True, verbose_name="Время добавления")
 
+    # Заполняются фоновой обработкой (processing.py) после сохранения
+    thumbnail = models.ImageField(upload_to='pereval_images/thumbs/', storage=content_storage, blank=True,
+                                  verbose_name="Миниатюра")
+    web = models.ImageField(upload_to='pereval_images/web/', storage=content_storage, blank=True,
+                            verbose_name="Версия для веба")
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name="Ширина")
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name="Высота")
+    size = models.PositiveIntegerField(null=True, blank=True, verbose_name="Размер, байт")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Время обработки")
+
     class Meta:
         db_table = 'pereval_image'
         verbose_name = 'Изображение'
@@ -159,11 +231,22 @@ class Image(models.Model):
     def __str__(self):
         return self.title
 
-    def delete(self, *args, **kwargs):
-        """Удаление файла изображения при удалении записи"""
-        if self.image:
-            storage, path = self.image.storage, self.image.path
-            super().delete(*args, **kwargs)
-            storage.delete(path)
-        else:
-            super().delete(*args, **kwargs)
+
+class ImageUpload(models.Model):
+    """
+    Изображение, загруженное отдельно от JSON перевала (POST /uploads/).
+    Клиент передает token вместо base64; при создании Image запись удаляется,
+    а файл переходит к изображению перевала без копирования.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Токен")
+    image = models.ImageField(upload_to='pereval_images/', storage=content_storage, verbose_name="Изображение")
+    size = models.PositiveIntegerField(verbose_name="Размер, байт")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Время загрузки")
+
+    class Meta:
+        db_table = 'pereval_image_upload'
+        verbose_name = 'Загрузка изображения'
+        verbose_name_plural = 'Загрузки изображений'
+
+    def __str__(self):
+        return f"{self.token} ({self.image.name})"
@@ -0,0 +1,106 @@
+"""
+Очередь модерации перевалов.
+
+Модераторы работают параллельно: claim_batch() выбирает самые старые
+новые перевалы через SELECT ... FOR UPDATE SKIP LOCKED и в той же
+транзакции переводит их в статус pending с именем модератора. Строки,
+заблокированные другим модератором, пропускаются, а не ожидаются, поэтому
+запросы не ждут друг друга и одна запись не достается двум модераторам.
+Решение (accepted/rejected) или возврат в очередь (new) применяется одним
+QuerySet.update() к записям, которые взял этот же модератор.
+
+Записи, по которым модератор не принял решение за
+PEREVAL_MODERATION_CLAIM_TIMEOUT, возвращаются в очередь при следующем
+claim_batch().
+
+QuerySet.update() не отправляет сигналы, поэтому кэш GET /submitData/<id>/
+сбрасывается явно, а updated_at (ETag/Last-Modified) задается в update().
+Кластеры тайлов и поисковый индекс от статуса не зависят.
+
+SQLite не поддерживает FOR UPDATE: там записи сериализуются самой базой,
+а повторный захват строки исключается условием status='new' в UPDATE.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import detail_cache
+from .models import Pereval
+
+# Время, через которое взятая запись без решения возвращается в очередь (секунды)
+DEFAULT_CLAIM_TIMEOUT = 30 * 60
+DEFAULT_CLAIM_SIZE = 10
+MAX_CLAIM_SIZE = 100
+# Статусы, которые модератор может назначить взятой записи; new - вернуть в очередь
+DECISIONS = ('accepted', 'rejected', 'new')
+
+
+def claim_timeout():
+    return timedelta(seconds=getattr(settings, 'PEREVAL_MODERATION_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT))
+
+
+def claim_batch(moderator, limit=DEFAULT_CLAIM_SIZE):
+    """Взять в работу до limit самых старых новых перевалов; id взятых записей"""
+    now = timezone.now()
+    with transaction.atomic():
+        expired = list(
+            Pereval.objects.filter(status='pending', claimed_at__lt=now - claim_timeout())
+            .order_by().select_for_update(skip_locked=True).values_list('id', flat=True)
+        )
+        if expired:
+            Pereval.objects.filter(id__in=expired).update(
+                status='new', moderator='', claimed_at=None, updated_at=now
+            )
+
+        ids = list(
+            Pereval.objects.filter(status='new').order_by('add_time', 'id')
+            .select_for_update(skip_locked=True).values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            claimed = Pereval.objects.filter(id__in=ids, status='new').update(
+                status='pending', moderator=moderator, claimed_at=now, updated_at=now
+            )
+            if claimed != len(ids):
+                # Без блокировок строк часть записей успел взять другой модератор
+                ids = list(
+                    Pereval.objects.filter(id__in=ids, moderator=moderator, claimed_at=now)
+                    .values_list('id', flat=True)
+                )
+        detail_cache.invalidate(*expired, *ids)
+    return ids
+
+
+def decide(moderator, ids, decision):
+    """Статус decision для взятых модератором записей из ids; id измененных записей"""
+    if decision not in DECISIONS:
+        raise ValueError(f"Недопустимый статус: {decision}")
+    with transaction.atomic():
+        # Блокировка в порядке id - параллельные решения не взаимоблокируются
+        owned = list(
+            Pereval.objects.filter(id__in=ids, status='pending', moderator=moderator)
+            .order_by('id').select_for_update().values_list('id', flat=True)
+        )
+        if owned:
+            Pereval.objects.filter(id__in=owned).update(**status_fields(decision))
+            detail_cache.invalidate(*owned)
+    return owned
+
+
+def set_status(queryset, new_status):
+    """Статус new_status для всех записей queryset без проверки очереди (действия админки); количество"""
+    with transaction.atomic():
+        ids = list(queryset.order_by('id').select_for_update().values_list('id', flat=True))
+        if ids:
+            Pereval.objects.filter(id__in=ids).update(**status_fields(new_status))
+            detail_cache.invalidate(*ids)
+    return len(ids)
+
+
+def status_fields(new_status):
+    """Поля update() для смены статуса; возврат в очередь снимает модератора"""
+    fields = {'status': new_status, 'updated_at': timezone.now()}
+    if new_status == 'new':
+        fields.update(moderator='', claimed_at=None)
+    return fields
@@ -0,0 +1,110 @@
+"""
+Keyset-пагинация и потоковая выдача списка перевалов.
+
+Курсор указывает на последнюю отданную запись и кодирует пару
+(add_time, id) - тот же порядок, что и в Pereval.Meta.ordering.
+Следующая страница выбирается условием "строго раньше курсора",
+поэтому стоимость запроса не растет с номером страницы.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+from .renderers import dumps
+
+# Порядок выдачи, совпадающий с Pereval.Meta.ordering
+KEYSET_ORDERING = ('-add_time', '-id')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать"""
+
+
+def encode_cursor(add_time, pk):
+    """Кодирование позиции (add_time, id) в непрозрачную строку"""
+    raw = f"{add_time.isoformat()}|{pk}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбор курсора в пару (add_time, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        add_time, pk = raw.split('|')
+        return datetime.fromisoformat(add_time), int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidCursor(f"Некорректный курсор: {cursor}")
+
+
+def parse_page_size(value):
+    """Размер страницы из параметра limit (с ограничением сверху)"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректный limit: {value}")
+    if page_size < 1:
+        raise ValueError(f"Некорректный limit: {value}")
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def apply_cursor(queryset, cursor):
+    """Упорядочивание по (add_time, id) и отсечение записей до курсора"""
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if not cursor:
+        return queryset
+    add_time, pk = decode_cursor(cursor)
+    return queryset.filter(Q(add_time__lt=add_time) | Q(add_time=add_time, id__lt=pk))
+
+
+def model_position(obj):
+    """Позиция экземпляра модели для курсора: (add_time, id)"""
+    return obj.add_time, obj.id
+
+
+def paginate(queryset, cursor, page_size, position=model_position):
+    """
+    Одна страница keyset-пагинации.
+    Возвращает (записи, next_cursor); next_cursor = None на последней странице.
+    position извлекает (add_time, id) из записи - экземпляра модели или строки values_list().
+    """
+    # Берем на одну запись больше, чтобы узнать, есть ли следующая страница
+    rows = list(apply_cursor(queryset, cursor)[:page_size + 1])
+    return split_page(rows, page_size, position)
+
+
+async def apaginate(queryset, cursor, page_size, position=model_position):
+    """paginate() на асинхронном ORM"""
+    rows = [row async for row in apply_cursor(queryset, cursor)[:page_size + 1]]
+    return split_page(rows, page_size, position)
+
+
+def split_page(rows, page_size, position):
+    """(записи страницы, next_cursor) из page_size + 1 выбранных записей"""
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(*position(rows[-1]))
+    return rows, next_cursor
+
+
+def stream_json(items):
+    """
+    Потоковая JSON-выдача в формате {"status": 200, "data": [...], "message": ...}.
+    items - итератор уже сериализованных записей; он читается лениво,
+    поэтому в памяти одновременно находится не больше одного чанка.
+    """
+    yield b'{"status": 200, "data": ['
+    count = 0
+    for item in items:
+        yield (b', ' if count else b'') + dumps(item)
+        count += 1
+    yield b'], "message": ' + dumps(f"Найдено {count} перевалов") + b'}'
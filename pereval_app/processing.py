@@ -0,0 +1,119 @@
+"""
+Фоновая обработка изображений перевалов.
+
+После коммита транзакции, в которой созданы Image, их id передаются в
+пул потоков внутри процесса. Для каждого изображения строятся миниатюра
+и версия для веба (JPEG, с учетом ориентации из EXIF, сами EXIF-данные
+в них не копируются), а в Image записываются размеры оригинала и его
+объем в байтах. Оригинал не изменяется.
+
+Режим задается настройкой PEREVAL_IMAGE_PROCESSING:
+    'thread' - пул потоков (по умолчанию), запрос POST не ждет обработки;
+    'sync'   - обработка сразу после коммита в том же потоке;
+    'off'    - обработка отключена (можно выполнить командой process_images).
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image as PILImage, ImageOps
+
+from .models import Image
+from .storage import content_storage, release_files
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THUMBNAIL_SIZE = (320, 320)
+DEFAULT_WEB_SIZE = (1600, 1600)
+THUMBNAIL_QUALITY = 80
+WEB_QUALITY = 85
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PEREVAL_IMAGE_WORKERS', 2),
+                thread_name_prefix='pereval-images'
+            )
+        return _executor
+
+
+def _render(source, max_size, quality):
+    """JPEG-версия изображения, вписанная в max_size, без метаданных"""
+    rendition = source.copy()
+    rendition.thumbnail(max_size, PILImage.LANCZOS)
+    if rendition.mode != 'RGB':
+        rendition = rendition.convert('RGB')
+    buffer = BytesIO()
+    rendition.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def process_image(image_id):
+    """Построение миниатюры и веб-версии, запись размеров изображения"""
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return
+
+    storage = image.image.storage
+    with storage.open(image.image.name, 'rb') as f:
+        with PILImage.open(f) as source:
+            # Поворот по EXIF Orientation до отбрасывания метаданных
+            source = ImageOps.exif_transpose(source)
+            width, height = source.size
+            thumbnail = _render(source, getattr(settings, 'PEREVAL_THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE),
+                                THUMBNAIL_QUALITY)
+            web = _render(source, getattr(settings, 'PEREVAL_WEB_IMAGE_SIZE', DEFAULT_WEB_SIZE), WEB_QUALITY)
+
+    base = os.path.splitext(os.path.basename(image.image.name))[0]
+    old_names = [f.name for f in (image.thumbnail, image.web) if f]
+    image.thumbnail.save(f"{base}.jpg", ContentFile(thumbnail), save=False)
+    image.web.save(f"{base}.jpg", ContentFile(web), save=False)
+    image.width, image.height = width, height
+    image.size = storage.size(image.image.name)
+    image.processed_at = timezone.now()
+    # save() отправляет post_save: сброс кэша и новая версия перевала для ETag
+    image.save(update_fields=['thumbnail', 'web', 'width', 'height', 'size', 'processed_at'])
+    # Прежние версии могли совпасть с новыми по содержимому или использоваться другими Image
+    release_files(content_storage, old_names)
+
+
+def process_images(image_ids):
+    """Обработка набора изображений; ошибка одного не мешает остальным"""
+    for image_id in image_ids:
+        try:
+            process_image(image_id)
+        except Exception as e:
+            logger.error("Image processing failed for %s: %s", image_id, e)
+
+
+def _run_in_worker(image_ids):
+    close_old_connections()
+    try:
+        process_images(image_ids)
+    finally:
+        # У каждого потока свое соединение с базой - закрываем его после задачи
+        close_old_connections()
+
+
+def schedule_processing(image_ids):
+    """Постановка изображений в очередь обработки после коммита текущей транзакции"""
+    image_ids = list(image_ids)
+    mode = getattr(settings, 'PEREVAL_IMAGE_PROCESSING', 'thread')
+    if not image_ids or mode == 'off':
+        return
+    if mode == 'sync':
+        transaction.on_commit(lambda: process_images(image_ids))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, image_ids))
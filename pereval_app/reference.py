@@ -0,0 +1,117 @@
+"""
+Справочники (регионы PerevalAreas и виды активностей SprActivitiesTypes)
+в памяти процесса.
+
+Справочники почти не меняются, поэтому процесс держит неизменяемый
+снимок: готовые данные ответов GET /areas/ и GET /activities/, дерево
+регионов (regions.RegionTree) и хэш версии содержимого, который отдается
+как ETag. Снимок строится при старте (wsgi.py/asgi.py вызывают preload())
+или при первом обращении.
+
+Сигналы справочников и команда refresh_reference_data увеличивают номер
+версии в таблице reference_version в той же транзакции, что и изменение.
+Процесс сверяет номер со своим не чаще раза в
+PEREVAL_REFERENCE_CHECK_INTERVAL секунд (один запрос к базе, остальные
+запросы обходятся без нее) и при расхождении перестраивает снимок.
+Версия в базе, а не в кэше Django: кэш по умолчанию (LocMemCache) свой у
+каждого процесса, и другие воркеры не узнали бы об изменении. Процесс,
+изменивший справочник, сбрасывает свой снимок сразу, остальные - через
+интервал проверки. Если содержимое не изменилось, хэш и ETag остаются
+прежними.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, router, transaction
+from django.db.models import F
+
+from .models import PerevalAreas, ReferenceVersion, SprActivitiesTypes
+from .regions import RegionTree
+
+logger = logging.getLogger(__name__)
+
+# Время хранения справочников у клиента (секунды)
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+# Как часто процесс сверяет версию справочников с базой (секунды)
+DEFAULT_CHECK_INTERVAL = 5
+
+
+class ReferenceSnapshot:
+    """Неизменяемый снимок справочников с хэшем версии"""
+
+    def __init__(self, areas, activities):
+        self.areas = tuple({"id": pk, "id_parent": parent, "title": title} for pk, parent, title in areas)
+        self.activities = tuple({"id": pk, "title": title} for pk, title in activities)
+        self.regions = RegionTree((area["id"], area["id_parent"], area["title"]) for area in self.areas)
+        payload = json.dumps([self.areas, self.activities], ensure_ascii=False, sort_keys=True)
+        self.version = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+
+    @classmethod
+    def load(cls, using):
+        """Снимок из базы: два запроса"""
+        return cls(
+            PerevalAreas.objects.using(using).order_by('id').values_list('id', 'id_parent', 'title'),
+            SprActivitiesTypes.objects.using(using).order_by('id').values_list('id', 'title')
+        )
+
+
+class ReferenceData:
+    """Снимок справочников процесса с перезагрузкой по версии из базы"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = None
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'PEREVAL_REFERENCE_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+
+    def get(self):
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if self._snapshot is not None and checked_at is not None and now - checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                # Версия и снимок - из одной базы: реплики могут отставать по-разному
+                using = router.db_for_read(PerevalAreas)
+                version = ReferenceVersion.objects.using(using).values_list('version', flat=True).first() or 0
+                if self._snapshot is None or self._version != version:
+                    self._snapshot = ReferenceSnapshot.load(using)
+                    self._version = version
+                self._checked_at = now
+            return self._snapshot
+
+    def preload(self):
+        """Построение снимка при старте процесса; без базы (например, до миграций) - при первом запросе"""
+        try:
+            return self.get()
+        except DatabaseError as e:
+            logger.error("Error preloading reference data: %s", e)
+            return None
+
+    def expire(self):
+        """Перечитать версию и снимок при следующем обращении"""
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = None
+
+    def invalidate(self):
+        """
+        Новая версия справочников для всех процессов - в текущей транзакции;
+        снимок этого процесса сбрасывается сразу и еще раз после коммита
+        """
+        if not ReferenceVersion.objects.filter(pk=1).update(version=F('version') + 1):
+            ReferenceVersion.objects.create(pk=1, version=1)
+        self.expire()
+        transaction.on_commit(self.expire)
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,71 @@
+"""
+Дерево регионов (PerevalAreas) в памяти процесса.
+
+Таблица pereval_areas хранит дерево через id_parent, и вопрос "все
+перевалы региона и его подрегионов" требует рекурсивного обхода. Дерево
+загружается одним запросом и хранится как nested set: регионы выписаны
+в порядке обхода в глубину, у каждого есть интервал [left, right) в этом
+списке, и поддерево региона - это срез order[left:right].
+
+Дерево входит в снимок справочников процесса (reference.reference_data)
+и перестраивается вместе с ним после изменения таблицы.
+"""
+
+
+class RegionTree:
+    """Неизменяемый снимок дерева регионов с индексом интервалов nested set"""
+
+    def __init__(self, rows):
+        self.titles = {}
+        self.parents = {}
+        children = {}
+        for pk, parent, title in rows:
+            self.titles[pk] = title
+            self.parents[pk] = parent
+            children.setdefault(parent, []).append(pk)
+
+        # Корни - регионы, родителя которых нет в таблице (обычно id_parent = 0)
+        roots = sorted(pk for pk, parent in self.parents.items() if parent not in self.titles)
+        self.order = []
+        self.left = {}
+        self.right = {}
+        for root in roots:
+            self._walk(root, children)
+
+    def _walk(self, root, children):
+        """Обход в глубину без рекурсии; повторные посещения (циклы в данных) пропускаются"""
+        stack = [(root, False)]
+        while stack:
+            pk, leaving = stack.pop()
+            if leaving:
+                self.right[pk] = len(self.order)
+                continue
+            if pk in self.left:
+                continue
+            self.left[pk] = len(self.order)
+            self.order.append(pk)
+            stack.append((pk, True))
+            stack.extend((child, False) for child in sorted(children.get(pk, ()), reverse=True))
+
+    def __contains__(self, pk):
+        return pk in self.left
+
+    def __len__(self):
+        return len(self.order)
+
+    def subtree(self, pk):
+        """id региона и всех его подрегионов"""
+        return self.order[self.left[pk]:self.right[pk]]
+
+    def is_descendant(self, pk, ancestor):
+        """pk входит в поддерево ancestor (включая сам ancestor)"""
+        return self.left[ancestor] <= self.left[pk] < self.right[ancestor]
+
+    def ancestors(self, pk):
+        """Цепочка родителей от корня до непосредственного родителя"""
+        chain = []
+        parent = self.parents[pk]
+        while parent in self.left and parent not in chain:
+            chain.append(parent)
+            parent = self.parents[parent]
+        return chain[::-1]
@@ -0,0 +1,78 @@
+"""
+Быстрые JSON-рендерер и парсер для API.
+
+Если установлен orjson, кодирование и разбор выполняются им: datetime
+(add_time) и float (координаты) он сериализует нативно, без вызова
+Python-кода на каждое значение. Без orjson классы ведут себя как
+стандартные JSONRenderer / JSONParser из DRF.
+"""
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Кодировщик DRF: запасной вариант без orjson и обработчик типов,
+# которые orjson не знает (Decimal, lazy-строки, QuerySet и т.д.)
+_fallback_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _default(obj):
+    return _fallback_encoder.default(obj)
+
+
+def dumps(data):
+    """Компактное JSON-представление data в байтах (UTF-8)"""
+    if orjson is not None:
+        # OPT_UTC_Z: '+00:00' -> 'Z', как в JSONEncoder DRF
+        ret = orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    else:
+        ret = _fallback_encoder.encode(data).encode('utf-8')
+    # Как и DRF, экранируем разделители строк, недопустимые в JavaScript
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на базе orjson с откатом на стандартную реализацию"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+        # orjson не умеет произвольный отступ и ASCII-вывод - такие запросы отдаем DRF
+        if (orjson is None or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на базе orjson с откатом на стандартную реализацию"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        with phase('parse'):
+            return self._parse(stream, media_type, parser_context)
+
+    def _parse(self, stream, media_type, parser_context):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,124 @@
+"""
+Чтение с реплик базы данных (FSTR_DB_REPLICA_*).
+
+Реплики используются только для чтения в безопасных HTTP-запросах
+(GET/HEAD/OPTIONS): это решает ReplicaMiddleware, выставляя флаг в
+contextvar на время запроса. Все остальное идет в основную базу:
+
+- запросы POST/PATCH/DELETE целиком, включая их чтения и
+  SELECT ... FOR UPDATE модерации;
+- фоновые задачи, команды и колбэки on_commit вне запроса;
+- GET-запросы клиента в течение PEREVAL_DB_STICKY_SECONDS после его
+  собственной записи (cookie pereval_primary_until): реплика может
+  отставать, а клиент должен сразу видеть созданный перевал.
+
+Кэш GET /submitData/<id>/ учитывает реплики (cache.DetailCache): запрос,
+привязанный к основной базе, не читает кэш, а перевал, измененный за
+последние PEREVAL_DB_STICKY_SECONDS, не попадает в кэш из чтения с реплики.
+Тайлы карты могут получить данные с реплики с задержкой не больше ее
+отставания.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'pereval_primary_until'
+DEFAULT_STICKY_SECONDS = 10
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_from_replica = ContextVar('pereval_read_from_replica', default=False)
+
+
+def replicas():
+    return getattr(settings, 'PEREVAL_DB_REPLICAS', ())
+
+
+def sticky_seconds():
+    return getattr(settings, 'PEREVAL_DB_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+class ReplicaRouter:
+    """Чтение - со случайной реплики, если запрос это разрешает; запись и миграции - как без роутера"""
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and _read_from_replica.get():
+            return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def reading_from_replica():
+    """Текущий запрос читает с реплики"""
+    return bool(replicas()) and _read_from_replica.get()
+
+
+def pinned_to_primary():
+    """Реплики есть, но текущий код читает основную базу: запись, cookie после записи, код вне запроса"""
+    return bool(replicas()) and not _read_from_replica.get()
+
+
+def is_sticky(request):
+    """Клиент недавно писал в базу - читать из основной"""
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """Выбор базы для чтения на время запроса и cookie привязки к основной базе после записи"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        token = _read_from_replica.set(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self.stick(request, response)
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        token = _read_from_replica.set(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self.stick(request, response)
+
+    def use_replica(self, request):
+        return request.method in SAFE_METHODS and not is_sticky(request)
+
+    def stick(self, request, response):
+        """После успешной записи следующие чтения клиента идут в основную базу"""
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = sticky_seconds()
+            response.set_cookie(STICKY_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
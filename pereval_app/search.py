@@ -0,0 +1,140 @@
+"""
+Полнотекстовый поиск по title, beauty_title, other_titles и connect.
+
+PostgreSQL: колонка Pereval.search_vector (tsvector, конфигурация russian,
+веса полей A-D) с GIN-индексом, ранжирование - ts_rank.
+SQLite: виртуальная таблица FTS5 pereval_search (инвертированный индекс,
+rowid = id перевала) со словами, приведенными к основе простым стеммером
+для русского языка; ранжирование - bm25 с теми же весами полей.
+
+Индекс обновляется по одной записи после коммита транзакции, в которой
+перевал создан или изменен (сигналы и bulk.create_perevals), поэтому
+запись POST/PATCH не ждет пересчета индекса.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import Pereval
+
+# Поле и вес: название важнее остальных полей
+SEARCH_FIELDS = (('title', 'A'), ('other_titles', 'B'), ('connect', 'C'), ('beauty_title', 'D'))
+TEXT_FIELDS = frozenset(field for field, _ in SEARCH_FIELDS)
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'pereval_search'
+# Веса bm25 для столбцов FTS5 в порядке SEARCH_FIELDS
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+MIN_QUERY_LENGTH = 2
+
+_WORD_RE = re.compile(r'\w+')
+_VOWELS = frozenset('аеиоуыэюя')
+# Окончания в порядке убывания длины: отбрасывается самое длинное подходящее
+_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ешь', 'ишь', 'ете', 'ите',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ей', 'ых', 'их', 'ом', 'ем', 'ам', 'ям',
+    'ах', 'ях', 'ов', 'ев', 'ую', 'юю', 'ия', 'ию', 'ть',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+
+def stem(word):
+    """Основа русского слова: отбрасывается окончание после первой гласной"""
+    word = word.lower().replace('ё', 'е')
+    start = next((i + 1 for i, char in enumerate(word) if char in _VOWELS), len(word))
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= max(start, 2):
+            return word[:-len(ending)]
+    return word
+
+
+def stem_text(text):
+    """Текст -> основы слов через пробел"""
+    return ' '.join(stem(word) for word in _WORD_RE.findall(text or ''))
+
+
+def search_vector():
+    """Выражение tsvector для Pereval с весами полей"""
+    vector = None
+    for field, weight in SEARCH_FIELDS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_index(pks):
+    """Пересчет поискового индекса для перевалов pks"""
+    pks = list(pks)
+    if not pks:
+        return
+    if connection.vendor == 'postgresql':
+        Pereval.objects.filter(pk__in=pks).update(search_vector=search_vector())
+    elif connection.vendor == 'sqlite':
+        fields = [field for field, _ in SEARCH_FIELDS]
+        rows = Pereval.objects.filter(pk__in=pks).values_list('id', *fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(fields)}) VALUES (%s{', %s' * len(fields)})",
+                [(row[0], *(stem_text(value) for value in row[1:])) for row in rows]
+            )
+
+
+def remove_from_index(pks):
+    """Удаление перевалов из индекса SQLite (в PostgreSQL индекс удаляется вместе со строкой)"""
+    pks = list(pks)
+    if pks and connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks)
+
+
+def schedule_index(pks):
+    """Обновление индекса после коммита текущей транзакции"""
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: update_index(pks))
+
+
+def rebuild_index(batch_size=1000):
+    """Полный пересчет индекса (команда rebuild_search_index)"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    ids = list(Pereval.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        update_index(ids[start:start + batch_size])
+    return len(ids)
+
+
+def search(query, limit):
+    """[(id перевала, ранг), ...] по убыванию релевантности"""
+    words = [stem(word) for word in _WORD_RE.findall(query)]
+    if not words:
+        return []
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        return list(
+            Pereval.objects.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-add_time', '-id')
+            .values_list('id', 'rank')[:limit]
+        )
+    if connection.vendor == 'sqlite':
+        # Каждая основа - префиксный запрос, все слова обязательны
+        match = ' '.join(f'"{word}"*' for word in words)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, {weights}) AS rank FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank DESC, rowid DESC LIMIT %s",
+                [match, limit]
+            )
+            return cursor.fetchall()
+    # Прочие базы: поиск подстроки без ранжирования
+    condition = Q()
+    for word in words:
+        condition &= Q(*(Q(**{f'{field}__icontains': word}) for field in TEXT_FIELDS), _connector=Q.OR)
+    return [(pk, 0.0) for pk in Pereval.objects.filter(condition).values_list('id', flat=True)[:limit]]
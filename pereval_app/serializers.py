@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from datetime import datetime
-import base64
 import uuid
-from django.core.files.base import ContentFile
-from .models import User, Coords, Level, Pereval, Image
+from .models import User, Coords, Level, Pereval, Image, ImageUpload
+from .uploads import UploadRef, active_uploads, upload_max_size
+from .decoders import IMAGE_FORMATS, IMAGE_FORMATS_TEXT, decode_base64_image
+from .metrics import phase
+from .moderation import DECISIONS, DEFAULT_CLAIM_SIZE, MAX_CLAIM_SIZE
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -68,31 +70,48 @@ class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             # Формат: data:image/jpeg;base64,<данные>
+            # Декодируем кусками: без копии строки и без полного bytes-объекта в памяти
             try:
-                format, imgstr = data.split(';base64,')
-                ext = format.split('/')[-1]
-
-                # Проверяем расширение
-                if ext not in ['jpeg', 'jpg', 'png', 'gif', 'bmp']:
-                    raise serializers.ValidationError(f"Неподдерживаемый формат изображения: {ext}")
-
-                # Декодируем base64
-                decoded_file = base64.b64decode(imgstr)
-
-                # Генерируем уникальное имя файла
-                file_name = f"{uuid.uuid4().hex[:10]}.{ext}"
-                data = ContentFile(decoded_file, name=file_name)
-
+                with phase('decode'):
+                    data = decode_base64_image(data, max_size=upload_max_size())
             except ValueError as e:
                 raise serializers.ValidationError(f"Неверный формат base64: {str(e)}")
             except Exception as e:
                 raise serializers.ValidationError(f"Ошибка обработки изображения: {str(e)}")
 
+        # Проверка файла через Pillow (ImageField)
+        with phase('pillow'):
+            return super().to_internal_value(data)
+
+
+class UploadTokenImageField(Base64ImageField):
+    """
+    Поле изображения: token загрузки из POST /uploads/ или base64-строка.
+    Для токена возвращается имя уже сохраненного файла - повторно он не декодируется и не копируется.
+    Если в контексте сериализатора есть uploads ({token: имя}, uploads.resolve_uploads),
+    токен ищется в нем, без запроса к базе.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and not data.startswith('data:image'):
+            try:
+                token = uuid.UUID(data)
+            except ValueError:
+                pass
+            else:
+                uploads = self.context.get('uploads')
+                if uploads is not None:
+                    upload = uploads.get(token)
+                else:
+                    upload = active_uploads().filter(token=token).values_list('image', flat=True).first()
+                if upload is None:
+                    raise serializers.ValidationError("Загрузка изображения не найдена или устарела")
+                return UploadRef(upload, token)
         return super().to_internal_value(data)
 
 
 class ImageSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(required=True)
+    image = UploadTokenImageField(required=True)
 
     class Meta:
         model = Image
@@ -102,6 +121,44 @@ class ImageSerializer(serializers.ModelSerializer):
         }
 
 
+class ImageUpdateSerializer(serializers.Serializer):
+    """
+    Изображение в PATCH: новое (image - base64 или token) или уже
+    сохраненное (id из ответа GET), у которого можно изменить название
+    """
+    id = serializers.IntegerField(required=False)
+    image = UploadTokenImageField(required=False)
+    title = serializers.CharField(required=True, max_length=255)
+
+    def validate(self, data):
+        if ('id' in data) == ('image' in data):
+            raise serializers.ValidationError("Укажите либо id существующего изображения, либо image")
+        return data
+
+
+class ImageUploadSerializer(serializers.Serializer):
+    """Сериализатор отдельной загрузки изображения"""
+    image = serializers.ImageField(required=True)
+
+    def validate_image(self, value):
+        """Проверка размера и формата файла"""
+        if value.size > upload_max_size():
+            raise serializers.ValidationError(
+                f"Максимальный размер изображения - {upload_max_size() // (1024 * 1024)} МБ"
+            )
+        # ImageField сохраняет проверенное изображение Pillow в value.image
+        if getattr(getattr(value, 'image', None), 'format', None) not in IMAGE_FORMATS:
+            raise serializers.ValidationError(f"Поддерживаются изображения {IMAGE_FORMATS_TEXT}")
+        return value
+
+    def create(self, validated_data):
+        image = validated_data['image']
+        # Имя и расширение от клиента не используем: файл с именем .html/.svg отдавался бы с таким типом.
+        # Расширение - по формату, который определил Pillow
+        image.name = f"{uuid.uuid4().hex[:10]}.{IMAGE_FORMATS[image.image.format]}"
+        return ImageUpload.objects.create(image=image, size=image.size)
+
+
 class PerevalSerializer(serializers.Serializer):
     beauty_title = serializers.CharField(required=True, max_length=255)
     title = serializers.CharField(required=True, max_length=255)
@@ -139,7 +196,7 @@ class PerevalUpdateSerializer(serializers.Serializer):
     connect = serializers.CharField(required=False, allow_blank=True, max_length=255)
     coords = CoordsSerializer(required=False)
     level = LevelSerializer(required=False)
-    images = ImageSerializer(many=True, required=False)
+    images = ImageUpdateSerializer(many=True, required=False)
 
     def validate(self, data):
         """Проверяем, что есть хотя бы одно поле для обновления"""
@@ -153,4 +210,15 @@ class PerevalUpdateSerializer(serializers.Serializer):
         # Проверяем, чтобы не было полей пользователя
         if any(field in data for field in ['email', 'fam', 'name', 'otc', 'phone']):
             raise serializers.ValidationError("Изменение данных пользователя запрещено")
-        return data
\ No newline at end of file
+        return data
+
+class ModerationClaimSerializer(serializers.Serializer):
+    """Сколько новых перевалов взять в работу"""
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=MAX_CLAIM_SIZE,
+                                     default=DEFAULT_CLAIM_SIZE)
+
+
+class ModerationDecisionSerializer(serializers.Serializer):
+    """Решение по взятым в работу перевалам"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_CLAIM_SIZE)
+    status = serializers.ChoiceField(choices=DECISIONS)
@@ -0,0 +1,104 @@
+"""Сигналы приложения: сброс кэшей и версии перевала при изменении данных, обработка изображений, поисковый индекс"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import cluster_cache, detail_cache
+from .models import Coords, Image, Level, Pereval, PerevalAreas, SprActivitiesTypes, User
+from .processing import schedule_processing
+from .reference import reference_data
+from .search import TEXT_FIELDS, remove_from_index, schedule_index
+from .storage import content_storage, release_files
+
+
+@receiver(post_save, sender=Pereval)
+@receiver(post_delete, sender=Pereval)
+def invalidate_pereval(sender, instance, **kwargs):
+    """Изменение перевала (в т.ч. статуса модератором). PATCH координат и уровня тоже сохраняет перевал"""
+    detail_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Coords)
+def invalidate_coords_tiles(sender, instance, **kwargs):
+    """Новые или измененные координаты: сброс кластеров тайлов старой и новой точки"""
+    points = [(instance.latitude, instance.longitude)]
+    loaded = getattr(instance, '_loaded_position', None)
+    if loaded is not None:
+        points.append(loaded)
+    cluster_cache.invalidate_points(points)
+    instance._loaded_position = (instance.latitude, instance.longitude)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Coords)
+@receiver(post_save, sender=Level)
+def touch_related_perevals(sender, instance, created, **kwargs):
+    """
+    Изменение пользователя, координат или уровня (например, в админке): новая
+    версия (updated_at) и сброс кэша перевалов, которые на них ссылаются.
+    Новые записи еще не связаны с перевалами; PATCH перевала сохраняет его
+    следом сам и помечает запись атрибутом _saved_with_pereval.
+    """
+    if created or getattr(instance, '_saved_with_pereval', False):
+        return
+    ids = list(instance.perevals.values_list('pk', flat=True))
+    if ids:
+        Pereval.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+        detail_cache.invalidate(*ids)
+
+
+@receiver(post_delete, sender=Pereval)
+def invalidate_pereval_tiles(sender, instance, **kwargs):
+    """Удаленный перевал пропадает из кластеров своего тайла"""
+    coords = Coords.objects.filter(pk=instance.coords_id).values_list('latitude', 'longitude').first()
+    if coords is not None:
+        cluster_cache.invalidate_points([coords])
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_pereval_images(sender, instance, **kwargs):
+    """Добавление, изменение или удаление изображения: новая версия перевала (updated_at)"""
+    Pereval.objects.filter(pk=instance.pereval_id).update(updated_at=timezone.now())
+    detail_cache.invalidate(instance.pereval_id)
+
+
+@receiver(post_delete, sender=Image)
+def release_image_files(sender, instance, **kwargs):
+    """
+    Удаленное изображение (в т.ч. каскадом с перевалом и массовым delete()):
+    файлы оригинала и производных версий освобождаются после коммита.
+    Файлы общие для одинаковых изображений - удаляются только без других ссылок.
+    """
+    release_files(content_storage, [f.name for f in (instance.image, instance.thumbnail, instance.web) if f])
+
+
+@receiver(post_save, sender=Image)
+def process_new_image(sender, instance, created, **kwargs):
+    """Новое изображение: миниатюра и веб-версия строятся после коммита"""
+    if created and instance.image:
+        schedule_processing([instance.pk])
+
+
+@receiver(post_save, sender=Pereval)
+def index_pereval(sender, instance, update_fields=None, **kwargs):
+    """Поисковый индекс обновляется после коммита, если могли измениться текстовые поля"""
+    if update_fields is None or TEXT_FIELDS & set(update_fields):
+        schedule_index([instance.pk])
+
+
+@receiver(post_delete, sender=Pereval)
+def unindex_pereval(sender, instance, **kwargs):
+    """Удаление перевала из индекса SQLite после коммита"""
+    pk = instance.pk
+    transaction.on_commit(lambda: remove_from_index([pk]))
+
+
+@receiver(post_save, sender=PerevalAreas)
+@receiver(post_delete, sender=PerevalAreas)
+@receiver(post_save, sender=SprActivitiesTypes)
+@receiver(post_delete, sender=SprActivitiesTypes)
+def invalidate_reference_data(sender, instance, **kwargs):
+    """Изменение справочника: процессы перестроят снимок при следующем обращении"""
+    reference_data.invalidate()
@@ -0,0 +1,160 @@
+"""
+Хранилище изображений с адресацией по содержимому.
+
+Имя файла - SHA-256 его байт: <каталог upload_to>/<2 символа хэша>/<хэш>.<расширение>.
+Одинаковые файлы (повторная отправка того же фото, повтор запроса клиентом)
+хранятся один раз: если файл с таким хэшем уже есть, запись на диск
+пропускается. Один файл может принадлежать нескольким Image, поэтому
+удаляется он только вместе с последней ссылкой и после коммита - см. release_files().
+
+Проверка ссылок не видит строк еще не закоммиченных транзакций: запрос
+мог только что получить уже существующий файл и еще не создать Image. Поэтому
+при совпадении хэша у файла обновляется время изменения, а удаляются только
+файлы старше PEREVAL_FILE_GRACE_SECONDS (delete_stale()). Файлы, пропущенные
+из-за этого, удаляет команда purge_image_files.
+"""
+import hashlib
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Q
+
+from .metrics import phase
+
+HASH_CHUNK_SIZE = 64 * 1024
+# Сколько секунд после записи или повторного использования файл нельзя удалять
+DEFAULT_GRACE_SECONDS = 15 * 60
+# Суффикс файла на время проверки перед удалением
+DELETING_SUFFIX = '.deleting'
+
+
+def grace_seconds():
+    return getattr(settings, 'PEREVAL_FILE_GRACE_SECONDS', DEFAULT_GRACE_SECONDS)
+
+
+def content_digest(name):
+    """SHA-256 из имени файла хранилища; None для файлов со старыми (случайными) именами"""
+    digest = os.path.splitext(posixpath.basename(name or ''))[0]
+    if len(digest) == 64 and all(c in '0123456789abcdef' for c in digest):
+        return digest
+    return None
+
+
+def file_digest(content):
+    """SHA-256 содержимого файла (File/UploadedFile), читается кусками"""
+    sha256 = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, который называет файлы по хэшу содержимого и не пишет дубликаты"""
+
+    def save(self, name, content, max_length=None):
+        with phase('storage'):
+            return self._save_by_digest(name, content)
+
+    def _save_by_digest(self, name, content):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest = file_digest(content)
+
+        # Каталог - из upload_to, исходное имя файла не используется (кроме расширения)
+        ext = os.path.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), digest[:2], digest + ext)
+
+        try:
+            # Файл используется снова: delete_stale() не удалит его до конца транзакции запроса
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        content.seek(0)
+        return self._save(name, content)
+
+    def delete_stale(self, name, grace=None):
+        """
+        Удаление файла, который не менялся и не использовался повторно
+        grace секунд; True, если файл удален.
+
+        Файл сначала переименовывается: повторное использование после этого
+        не найдет его и запишет файл заново, а время изменения
+        переименованного файла показывает, не успели ли его использовать
+        до переименования - тогда он возвращается на место.
+        """
+        grace = grace_seconds() if grace is None else grace
+        path = self.path(name)
+        deleting = path + DELETING_SUFFIX
+        try:
+            os.rename(path, deleting)
+        except FileNotFoundError:
+            return False
+        if time.time() - os.stat(deleting).st_mtime < grace:
+            os.replace(deleting, path)
+            return False
+        os.remove(deleting)
+        return True
+
+
+def referenced_names(names):
+    """Имена из names, на которые еще ссылаются изображения или незабранные загрузки"""
+    from .models import Image, ImageUpload
+
+    names = set(names)
+    if not names:
+        return set()
+    images = Image.objects.filter(
+        Q(image__in=names) | Q(thumbnail__in=names) | Q(web__in=names)
+    ).values_list('image', 'thumbnail', 'web')
+    uploads = ImageUpload.objects.filter(image__in=names).values_list('image', flat=True)
+    referenced = {name for row in images for name in row} | set(uploads)
+    return names & referenced
+
+
+def delete_unreferenced(storage, names, grace=None):
+    """Удаление файлов, на которые больше никто не ссылается и которые старше grace секунд"""
+    removed = set()
+    for name in names - referenced_names(names):
+        if storage.delete_stale(name, grace):
+            removed.add(name)
+    return removed
+
+
+def stored_names(storage, directory):
+    """Имена файлов с адресацией по содержимому в directory и подкаталогах"""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        if content_digest(name):
+            yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from stored_names(storage, posixpath.join(directory, subdirectory))
+
+
+def release_files(storage, names):
+    """
+    Освобождение файлов после удаления или изменения ссылающихся строк.
+    Счетчик ссылок - число строк Image/ImageUpload с этим именем; он
+    проверяется и файлы удаляются после коммита транзакции: при откате
+    файлы остаются на месте. Ссылки из еще не закоммиченных транзакций
+    проверка не видит, от их потери защищает только grace-период: файлы
+    моложе PEREVAL_FILE_GRACE_SECONDS остаются до запуска purge_image_files.
+    Вне транзакции удаление выполняется сразу.
+    """
+    names = {name for name in names if name}
+    if names:
+        transaction.on_commit(lambda: delete_unreferenced(storage, names))
+
+
+# Общий экземпляр для полей изображений
+content_storage = ContentAddressedStorage()
@@ -1,19 +1,78 @@
 
 import json
 import base64
-from io import BytesIO
+import logging
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
 from PIL import Image as PILImage  # Изменяем импорт для избежания конфликта имен
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.contrib.admin import site as admin_site
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase, APIClient
-from .models import User, Coords, Level, Pereval, Image
-from .serializers import PerevalSerializer, PerevalUpdateSerializer, UserSerializer
+from .models import User, Coords, Level, Pereval, Image, ImageUpload, PerevalAreas, SprActivitiesTypes
+from .serializers import PerevalSerializer, PerevalUpdateSerializer, UserSerializer, ImageSerializer
+from .decoders import decode_base64_image
+from .fast_serializers import PEREVAL_FIELDS, pereval_rows, serialize_rows
+from .renderers import FastJSONParser, FastJSONRenderer
+from .cache import detail_cache
+from .processing import process_image, process_images
+from .storage import DELETING_SUFFIX, content_digest, content_storage
+from .geo import haversine_km, point_tiles, tile_bounds, tile_key, tile_ranges
+from .clusters import cluster_points
+from .search import stem
+from .regions import RegionTree
+from .reference import ReferenceData, reference_data
+from .moderation import claim_batch
+from .admin import EstimatedCountPaginator, estimated_count
+from .routers import STICKY_COOKIE, ReplicaRouter
+from .metrics import Histogram, phase, reset as reset_metrics
+from pereval_project.database import connection_settings, replica_databases
+from pereval_project.logs import JsonFormatter, QueueHandler, RateLimitFilter
+
+
+class TempMediaMixin:
+    """MEDIA_ROOT во временном каталоге класса: тесты с файлами изображений не пишут в media/ проекта"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='pereval_media_')
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls.media_settings.disable()
+            shutil.rmtree(cls.media_root, ignore_errors=True)
 
 
 # Тесты для моделей
-class ModelTests(TestCase):
+class ModelTests(TempMediaMixin, TestCase):
     """Тесты для моделей базы данных"""
     def setUp(self):
         """Настройка тестовых данных"""
@@ -248,7 +307,7 @@ class SerializerTests(TestCase):
 
 
 # Тесты для API endpoints
-class APITests(APITestCase):
+class APITests(TempMediaMixin, APITestCase):
     """Тесты для REST API endpoints"""
 
     def setUp(self):
@@ -787,4 +846,1910 @@ class ErrorHandlingTests(APITestCase):
             data=json.dumps(invalid_data),
             content_type='application/json'
         )
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class PaginationTests(APITestCase):
+    """Тесты keyset-пагинации и потоковой выдачи списка перевалов"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.submit_data_url = reverse('submit-data-list')
+        self.user = User.objects.create(
+            email="many@example.com",
+            fam="Много",
+            name="Перевалов",
+            phone="+79990001122"
+        )
+        self.perevals = []
+        for i in range(5):
+            coords = Coords.objects.create(latitude=50 + i, longitude=40 + i, height=1000 + i)
+            level = Level.objects.create(winter="1A")
+            self.perevals.append(Pereval.objects.create(
+                beauty_title=f"Перевал {i}",
+                title=f"Перевал №{i}",
+                user=self.user,
+                coords=coords,
+                level=level
+            ))
+        # Одинаковое время добавления у части записей проверяет сортировку по id
+        Pereval.objects.filter(id__in=[p.id for p in self.perevals[:3]]).update(
+            add_time=self.perevals[0].add_time
+        )
+
+    def test_cursor_pages_cover_all_records(self):
+        """Последовательный обход страниц возвращает все записи без повторов"""
+        seen = []
+        params = {'user__email': self.user.email, 'limit': 2}
+        while True:
+            response = self.client.get(self.submit_data_url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['data']), 2)
+            seen.extend(item['id'] for item in response.data['data'])
+            if response.data['next_cursor'] is None:
+                break
+            params['cursor'] = response.data['next_cursor']
+
+        expected = list(Pereval.objects.filter(user=self.user).values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        """Если записи помещаются на страницу, next_cursor пустой"""
+        response = self.client.get(self.submit_data_url, {'user__email': self.user.email})
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор - ошибка 400"""
+        response = self.client.get(
+            self.submit_data_url,
+            {'user__email': self.user.email, 'cursor': 'не-курсор'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['status'], 400)
+
+    def test_invalid_limit(self):
+        """Некорректный limit - ошибка 400"""
+        response = self.client.get(self.submit_data_url, {'user__email': self.user.email, 'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_mode(self):
+        """Потоковый режим отдает все записи одним JSON-документом"""
+        response = self.client.get(self.submit_data_url, {'user__email': self.user.email, 'stream': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        payload = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(payload['status'], 200)
+        self.assertEqual(len(payload['data']), 5)
+        self.assertIn('5', payload['message'])
+        self.assertEqual(payload['data'][0]['coords']['height'], 1004)
+
+
+class QueryCountTests(TempMediaMixin, APITestCase):
+    """
+    Фиксация количества SQL-запросов для основных endpoint'ов.
+    Если тест упал - значит, изменение добавило запросы (например, N+1).
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.submit_data_url = reverse('submit-data-list')
+        self.submit_data_detail_url = lambda id: reverse('submit-data-detail', args=[id])
+        self.user = User.objects.create(
+            email="queries@example.com",
+            fam="Запросов",
+            name="Счетчик",
+            phone="+79990003344"
+        )
+        image = PILImage.new('RGB', (10, 10), color='green')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG')
+        self.image_bytes = buffer.getvalue()
+        self.image_base64 = base64.b64encode(self.image_bytes).decode('utf-8')
+
+        for i in range(3):
+            pereval = Pereval.objects.create(
+                beauty_title=f"Перевал {i}",
+                title=f"Перевал №{i}",
+                user=self.user,
+                coords=Coords.objects.create(latitude=50, longitude=40, height=1000),
+                level=Level.objects.create(winter="1A")
+            )
+            for j in range(2):
+                Image.objects.create(
+                    pereval=pereval,
+                    image=SimpleUploadedFile(f"q{i}{j}.jpg", self.image_bytes, content_type="image/jpeg"),
+                    title=f"Изображение {j}"
+                )
+        self.pereval = pereval
+
+    def test_list_queries(self):
+        """Список: выборка страницы + prefetch изображений"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.submit_data_url, {'user__email': self.user.email})
+        self.assertEqual(len(response.data['data']), 3)
+
+    def test_list_empty_queries(self):
+        """Пустой список: только выборка страницы"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.submit_data_url, {'user__email': 'nobody@example.com'})
+        self.assertEqual(response.data['data'], [])
+
+    def test_detail_queries(self):
+        """Детальная запись: выборка с join'ами + prefetch изображений"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.submit_data_detail_url(self.pereval.id))
+        self.assertEqual(len(response.data['data']['images']), 2)
+
+    def test_create_queries(self):
+        """Создание: пользователь, координаты, уровень, перевал, изображения одним INSERT и savepoint'ы"""
+        data = {
+            "beauty_title": "Новый",
+            "title": "Новый перевал",
+            "user": {
+                "email": self.user.email,
+                "fam": self.user.fam,
+                "name": self.user.name,
+                "phone": self.user.phone
+            },
+            "coords": {"latitude": 51, "longitude": 41, "height": 1100},
+            "level": {"winter": "1A"},
+            "images": [{"image": f"data:image/jpeg;base64,{self.image_base64}", "title": f"Вид {i}"} for i in range(5)]
+        }
+        # Число запросов не зависит от числа изображений
+        with self.assertNumQueries(7):
+            response = self.client.post(self.submit_data_url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Image.objects.filter(pereval_id=response.data['id']).count(), 5)
+
+    def test_patch_queries(self):
+        """Обновление полей, координат и уровня без ленивых запросов"""
+        data = {
+            "title": "Обновленный",
+            "coords": {"latitude": 52, "longitude": 42, "height": 1200},
+            "level": {"summer": "2A"}
+        }
+        with self.assertNumQueries(6):
+            response = self.client.patch(
+                self.submit_data_detail_url(self.pereval.id),
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class FastSerializerTests(TestCase):
+    """Тесты сериализации строк values_list()"""
+
+    def setUp(self):
+        self.user = User.objects.create(email="rows@example.com", fam="Строк", name="Ряд", phone="+79990005566")
+        self.pereval = Pereval.objects.create(
+            beauty_title="пер.",
+            title="Строковый",
+            user=self.user,
+            coords=Coords.objects.create(latitude=43.5, longitude=42.25, height=3000),
+            level=Level.objects.create(winter="1A", summer="1Б")
+        )
+        self.image = Image.objects.create(pereval=self.pereval, image="pereval_images/2025/01/01/a b.jpg", title="Вид")
+        Image.objects.create(pereval=self.pereval, image="", title="Без файла")
+
+    def test_serialize_rows(self):
+        """Строка разворачивается в тот же словарь, что отдает API"""
+        request = RequestFactory().get('/submitData/')
+        rows = list(pereval_rows(Pereval.objects.filter(id=self.pereval.id)))
+        data = serialize_rows(rows, request)[0]
+        self.assertEqual(data['id'], self.pereval.id)
+        self.assertEqual(data['add_time'], self.pereval.add_time)
+        self.assertEqual(data['user']['email'], "rows@example.com")
+        self.assertEqual(data['coords'], {"latitude": 43.5, "longitude": 42.25, "height": 3000})
+        self.assertEqual(data['level']['summer'], "1Б")
+        # Изображения без файла пропускаются, URL абсолютный и экранированный
+        self.assertEqual(data['images'], [{
+            "id": self.image.id,
+            "image_url": "http://testserver/media/pereval_images/2025/01/01/a%20b.jpg",
+            "title": "Вид",
+            "thumbnail_url": None,
+            "web_url": None
+        }])
+
+
+class RendererTests(TestCase):
+    """Тесты быстрых JSON-рендерера и парсера"""
+
+    def setUp(self):
+        self.payload = {
+            "status": 200,
+            "message": "Найдено",
+            "data": {
+                "add_time": datetime(2025, 1, 20, 10, 30, 0, 123456, tzinfo=dt_timezone.utc),
+                "coords": {"latitude": 43.123456, "longitude": 42.5, "height": 3000},
+                "level": Decimal("1.5"),
+                "title": "Перевал\u2028Турист"
+            }
+        }
+
+    def test_matches_drf_renderer(self):
+        """Результат совпадает со стандартным JSONRenderer DRF"""
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(self.payload)),
+            json.loads(JSONRenderer().render(self.payload))
+        )
+        rendered = FastJSONRenderer().render(self.payload)
+        self.assertIn(b'"2025-01-20T10:30:00.123456Z"', rendered)
+        self.assertIn(b'\\u2028', rendered)
+
+    def test_fallback_without_orjson(self):
+        """Без orjson используется стандартный кодировщик"""
+        with mock.patch('pereval_app.renderers.orjson', None):
+            rendered = FastJSONRenderer().render(self.payload)
+            parsed = FastJSONParser().parse(BytesIO(rendered))
+        self.assertEqual(parsed, json.loads(JSONRenderer().render(self.payload)))
+
+    def test_parser_error(self):
+        """Некорректный JSON - ParseError"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title": '))
+
+
+class DetailCacheTests(APITestCase):
+    """Тесты кэша GET /submitData/<id>/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        detail_cache.reset_stats()
+        self.user = User.objects.create(email="cache@example.com", fam="Кэш", name="Тест", phone="+79990007788")
+        self.pereval = Pereval.objects.create(
+            beauty_title="пер.",
+            title="Кэшируемый",
+            user=self.user,
+            coords=Coords.objects.create(latitude=43, longitude=42, height=3000),
+            level=Level.objects.create(winter="1A")
+        )
+        self.url = reverse('submit-data-detail', args=[self.pereval.id])
+
+    def test_second_request_served_from_cache(self):
+        """Повторный запрос не обращается к базе"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['data']['title'], "Кэшируемый")
+        self.assertEqual(detail_cache.stats()['hits'], 1)
+        self.assertEqual(detail_cache.stats()['misses'], 1)
+
+    def test_invalidated_by_patch(self):
+        """PATCH сбрасывает кэш"""
+        self.client.get(self.url)
+        self.client.patch(self.url, data=json.dumps({"title": "Обновленный"}), content_type='application/json')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['data']['title'], "Обновленный")
+
+    def test_invalidated_by_image_change(self):
+        """Добавление изображения сбрасывает кэш"""
+        self.client.get(self.url)
+        Image.objects.create(pereval=self.pereval, image="pereval_images/2025/01/01/x.jpg", title="Новое")
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']['images']), 1)
+
+    def test_invalidated_by_status_change(self):
+        """Смена статуса модератором сбрасывает кэш"""
+        self.client.get(self.url)
+        self.pereval.status = 'accepted'
+        self.pereval.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['data']['status'], 'accepted')
+
+    def test_invalidated_by_related_records(self):
+        """Изменение пользователя, координат или уровня (например, в админке) - новые данные и ETag"""
+        etag = self.client.get(self.url)['ETag']
+        for record, field, value in (
+            (self.user, 'fam', "Исправленный"), (self.pereval.coords, 'height', 3100), (self.pereval.level, 'winter', "2A")
+        ):
+            setattr(record, field, value)
+            record.save()
+            response = self.client.get(self.url)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+        data = response.data['data']
+        self.assertEqual((data['user']['fam'], data['coords']['height'], data['level']['winter']),
+                         ("Исправленный", 3100, "2A"))
+
+    def test_stats_endpoint(self):
+        """Счетчики доступны через API только staff"""
+        self.client.get(self.url)
+        self.client.get(self.url)
+        response = self.client.get(reverse('cache-stats'))
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.client.force_authenticate(get_user_model().objects.create_user("stats", is_staff=True))
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.data['data'], {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+
+class ConditionalGetTests(APITestCase):
+    """Тесты ETag / Last-Modified и ответов 304"""
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        self.user = User.objects.create(email="etag@example.com", fam="Етаг", name="Тест", phone="+79990009900")
+        self.pereval = Pereval.objects.create(
+            beauty_title="пер.",
+            title="Версионный",
+            user=self.user,
+            coords=Coords.objects.create(latitude=43, longitude=42, height=3000),
+            level=Level.objects.create(winter="1A")
+        )
+        self.detail_url = reverse('submit-data-detail', args=[self.pereval.id])
+        self.list_url = reverse('submit-data-list')
+
+    def test_detail_not_modified(self):
+        """Совпадающий If-None-Match - 304 одним легким запросом"""
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        """If-Modified-Since не раньше updated_at - 304"""
+        response = self.client.get(self.detail_url)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_on_patch(self):
+        """PATCH меняет ETag"""
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, data=json.dumps({"title": "Новый"}), content_type='application/json')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_changes_on_image_change(self):
+        """Изменение изображений меняет updated_at и ETag"""
+        etag = self.client.get(self.detail_url)['ETag']
+        Image.objects.create(pereval=self.pereval, image="pereval_images/2025/01/01/e.jpg", title="Новое")
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        """Страница списка без изменений - 304 одним легким запросом"""
+        params = {'user__email': self.user.email}
+        etag = self.client.get(self.list_url, params)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Новая запись на странице меняет ETag
+        Pereval.objects.create(
+            beauty_title="пер.", title="Еще один", user=self.user,
+            coords=self.pereval.coords, level=self.pereval.level
+        )
+        response = self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 2)
+
+
+class BulkSubmitTests(TempMediaMixin, APITestCase):
+    """Тесты пакетного создания перевалов"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('submit-data-bulk')
+        User.objects.create(email="existing@example.com", fam="Старый", name="Турист", phone="+79990001111")
+        image = PILImage.new('RGB', (10, 10), color='white')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG')
+        self.image = f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+    def make_item(self, title, email):
+        return {
+            "beauty_title": "пер.",
+            "title": title,
+            "user": {"email": email, "fam": "Новый", "name": "Турист", "phone": "+79990002222"},
+            "coords": {"latitude": 43.1, "longitude": 42.2, "height": 3000},
+            "level": {"summer": "1А"},
+            "images": [{"image": self.image, "title": "Вид"}, {"image": self.image, "title": "Спуск"}]
+        }
+
+    def post(self, items, mode=None):
+        url = f"{self.url}?mode={mode}" if mode else self.url
+        return self.client.post(url, data=json.dumps(items), content_type='application/json')
+
+    def test_bulk_create_dedupes_users(self):
+        """Все записи созданы, пользователи по email не дублируются"""
+        items = [
+            self.make_item("Первый", "new@example.com"),
+            self.make_item("Второй", "new@example.com"),
+            self.make_item("Третий", "existing@example.com"),
+        ]
+        response = self.post(items)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [result['id'] for result in response.data['results']]
+        self.assertTrue(all(ids))
+        self.assertEqual(User.objects.filter(email="new@example.com").count(), 1)
+        self.assertEqual(Pereval.objects.get(id=ids[2]).user.fam, "Старый")
+        self.assertEqual(Pereval.objects.get(id=ids[0]).title, "Первый")
+        self.assertEqual(Image.objects.filter(pereval_id__in=ids).count(), 6)
+
+    def test_atomic_mode_rejects_whole_batch(self):
+        """mode=atomic: одна ошибка - ничего не создается"""
+        items = [self.make_item("Первый", "new@example.com"), self.make_item("", "new@example.com")]
+        response = self.post(items)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.data['results'][1]['errors'])
+        self.assertIsNone(response.data['results'][0]['id'])
+        self.assertFalse(Pereval.objects.filter(title="Первый").exists())
+
+    def test_partial_mode(self):
+        """mode=partial: корректные записи создаются, ошибки возвращаются по индексам"""
+        items = [self.make_item("", "new@example.com"), self.make_item("Второй", "new@example.com")]
+        response = self.post(items, mode='partial')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('errors', response.data['results'][0])
+        self.assertTrue(Pereval.objects.filter(id=response.data['results'][1]['id']).exists())
+
+    def test_invalid_payload(self):
+        """Не массив - ошибка 400"""
+        response = self.client.post(self.url, data=json.dumps({"title": "x"}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """Число запросов не зависит от размера пакета"""
+        items = [self.make_item(f"Перевал {i}", f"user{i % 2}@example.com") for i in range(5)]
+        # savepoint, выборка пользователей, вставка новых, повторная выборка,
+        # coords, level, pereval, image, release
+        with self.assertNumQueries(9):
+            response = self.post(items)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ImageUploadTests(TempMediaMixin, APITestCase):
+    """Тесты загрузки изображений отдельно от JSON перевала"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.upload_url = reverse('image-upload')
+        self.submit_data_url = reverse('submit-data-list')
+        image = PILImage.new('RGB', (20, 20), color='yellow')
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+        self.image_bytes = buffer.getvalue()
+        self.pereval_data = {
+            "beauty_title": "пер.",
+            "title": "С загрузкой",
+            "user": {"email": "upload@example.com", "fam": "Загрузкин", "name": "Тест", "phone": "+79990003333"},
+            "coords": {"latitude": 43.1, "longitude": 42.2, "height": 3000},
+            "level": {"summer": "1А"},
+        }
+
+    def upload(self):
+        response = self.client.post(
+            self.upload_url,
+            {'image': SimpleUploadedFile("photo.png", self.image_bytes, content_type="image/png")},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+
+    def test_upload_and_submit_by_token(self):
+        """Токен загрузки принимается вместо base64, файл переходит к изображению перевала"""
+        token = self.upload()
+        upload_name = ImageUpload.objects.get(token=token).image.name
+        data = dict(self.pereval_data, images=[{"image": token, "title": "Вид"}])
+        response = self.client.post(self.submit_data_url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        image = Image.objects.get(pereval_id=response.data['id'])
+        self.assertEqual(image.image.name, upload_name)
+        self.assertFalse(ImageUpload.objects.filter(token=token).exists())
+
+    def test_extension_from_image_format(self):
+        """Расширение файла - по формату изображения, а не по имени от клиента"""
+        buffer = BytesIO()
+        PILImage.new('RGB', (8, 8), color='blue').save(buffer, format='GIF')
+        response = self.client.post(
+            self.upload_url,
+            {'image': SimpleUploadedFile("evil.pdf", buffer.getvalue(), content_type="application/pdf")},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(ImageUpload.objects.get(token=response.data['token']).image.name.endswith('.gif'))
+
+        buffer = BytesIO()
+        PILImage.new('RGB', (8, 8), color='blue').save(buffer, format='BMP')
+        response = self.client.post(
+            self.upload_url,
+            {'image': SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_token_can_be_used_once(self):
+        """Повторное использование токена - ошибка валидации"""
+        token = self.upload()
+        data = dict(self.pereval_data, images=[{"image": token, "title": "Вид"}])
+        self.client.post(self.submit_data_url, data=json.dumps(data), content_type='application/json')
+        response = self.client.post(self.submit_data_url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_duplicate_token_in_request(self):
+        """Один токен дважды в одном запросе - ошибка 400"""
+        token = self.upload()
+        data = dict(self.pereval_data, images=[{"image": token, "title": "1"}, {"image": token, "title": "2"}])
+        response = self.client.post(self.submit_data_url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(ImageUpload.objects.filter(token=token).exists())
+
+    def test_bulk_partial_claims_per_item(self):
+        """mode=partial: уже использованный токен - ошибка своей записи, остальные создаются"""
+        token, other = self.upload(), self.upload()
+        items = [
+            dict(self.pereval_data, title="Первый", images=[{"image": token, "title": "Вид"}]),
+            dict(self.pereval_data, title="Второй", images=[{"image": token, "title": "Вид"}]),
+            dict(self.pereval_data, title="Третий", images=[{"image": other, "title": "Вид"}]),
+        ]
+        url = f"{reverse('submit-data-bulk')}?mode=partial"
+        response = self.client.post(url, data=json.dumps(items), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second, third = response.data['results']
+        self.assertTrue(first['id'] and third['id'])
+        self.assertIsNone(second['id'])
+        self.assertIn('images', second['errors'])
+        self.assertEqual(Image.objects.filter(pereval_id__in=[first['id'], third['id']]).count(), 2)
+        self.assertFalse(Pereval.objects.filter(title="Второй").exists())
+
+        token = self.upload()
+        items = [dict(item, images=[{"image": token, "title": "Вид"}]) for item in items[:2]]
+        response = self.client.post(reverse('submit-data-bulk'), data=json.dumps(items), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(ImageUpload.objects.filter(token=token).exists())
+
+    def test_raw_body_upload(self):
+        """Загрузка "сырым" телом запроса с Content-Disposition"""
+        response = self.client.post(
+            self.upload_url,
+            data=self.image_bytes,
+            content_type='image/png',
+            HTTP_CONTENT_DISPOSITION='attachment; filename=photo.png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['size'], len(self.image_bytes))
+
+    def test_not_an_image(self):
+        """Файл, не являющийся изображением - ошибка 400"""
+        response = self.client.post(
+            self.upload_url,
+            {'image': SimpleUploadedFile("photo.png", b"not an image", content_type="image/png")},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_token(self):
+        """Неизвестный токен - ошибка валидации"""
+        data = dict(self.pereval_data, images=[{"image": str(uuid.uuid4()), "title": "Вид"}])
+        response = self.client.post(self.submit_data_url, data=json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class Base64DecoderTests(TestCase):
+    """Тесты потокового декодирования base64-изображений"""
+
+    def setUp(self):
+        image = PILImage.effect_noise((200, 200), 64).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+        self.image_bytes = buffer.getvalue()
+        self.data_uri = f"data:image/png;base64,{base64.b64encode(self.image_bytes).decode('ascii')}"
+
+    def test_chunked_decode_matches_original(self):
+        """Декодирование малыми кусками дает исходные байты"""
+        uploaded = decode_base64_image(self.data_uri, max_size=10 ** 7, chunk_chars=1000)
+        self.assertEqual(uploaded.read(), self.image_bytes)
+        self.assertEqual(uploaded.size, len(self.image_bytes))
+
+    def test_line_wrapped_base64(self):
+        """Переводы строк внутри base64 (MIME) допускаются"""
+        encoded = base64.encodebytes(self.image_bytes).decode('ascii')
+        uploaded = decode_base64_image(f"data:image/png;base64,{encoded}", max_size=10 ** 7, chunk_chars=100)
+        self.assertEqual(uploaded.read(), self.image_bytes)
+
+    def test_large_image_goes_to_disk(self):
+        """Файл больше порога памяти пишется во временный файл"""
+        uploaded = decode_base64_image(self.data_uri, max_size=10 ** 7, memory_size=1024)
+        self.assertTrue(hasattr(uploaded, 'temporary_file_path'))
+        with open(uploaded.temporary_file_path(), 'rb') as f:
+            self.assertEqual(f.read(), self.image_bytes)
+        uploaded.close()
+
+    def test_formats_match_uploads(self):
+        """Форматы base64 - те же, что у POST /uploads/: WEBP принимается, BMP - нет"""
+        for image_format, accepted in (('WEBP', True), ('JPEG', True), ('BMP', False)):
+            buffer = BytesIO()
+            PILImage.new('RGB', (8, 8), color='blue').save(buffer, format=image_format)
+            data_uri = f"data:image/{image_format.lower()};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+            serializer = ImageSerializer(data={"image": data_uri, "title": image_format})
+            self.assertEqual(serializer.is_valid(), accepted, serializer.errors)
+            if accepted:
+                self.assertTrue(serializer.validated_data['image'].name.endswith(
+                    {'WEBP': '.webp', 'JPEG': '.jpg'}[image_format]))
+
+    def test_signature_mismatch(self):
+        """PNG-данные, заявленные как JPEG, отклоняются"""
+        with self.assertRaises(ValueError):
+            decode_base64_image(self.data_uri.replace('image/png', 'image/jpeg'), max_size=10 ** 7)
+
+    def test_too_large(self):
+        """Превышение размера отклоняется до декодирования"""
+        with self.assertRaises(ValueError):
+            decode_base64_image(self.data_uri, max_size=100)
+
+    def test_serializer_accepts_large_image(self):
+        """ImageSerializer принимает изображение из временного файла"""
+        with self.settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024):
+            serializer = ImageSerializer(data={"image": self.data_uri, "title": "Шум"})
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+
+class ImageProcessingTests(TempMediaMixin, APITestCase):
+    """Тесты фоновой обработки изображений"""
+
+    def setUp(self):
+        self.client = APIClient()
+        # Изображение 400x200 с EXIF Orientation=6 (повернуть на 90°) и координатами съемки
+        image = PILImage.new('RGB', (400, 200), color='red')
+        exif = PILImage.Exif()
+        exif[0x0112] = 6
+        exif[0x8825] = {1: 'N', 2: (43.0, 10.0, 0.0)}
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', exif=exif)
+        self.image = f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+        self.image_size = len(buffer.getvalue())
+        self.data = {
+            "beauty_title": "пер.",
+            "title": "Обработка",
+            "user": {"email": "proc@example.com", "fam": "Фото", "name": "Граф", "phone": "+79990003333"},
+            "coords": {"latitude": 43.1, "longitude": 42.2, "height": 3000},
+            "level": {"summer": "1А"},
+            "images": [{"image": self.image, "title": "Вид"}]
+        }
+
+    def post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('submit-data-list'), data=json.dumps(self.data),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['id']
+
+    def test_renditions(self):
+        """Миниатюра и веб-версия строятся с учетом ориентации и без EXIF"""
+        pereval_id = self.post()
+        image = Image.objects.get(pereval_id=pereval_id)
+        self.assertIsNone(image.processed_at)
+        with self.settings(PEREVAL_THUMBNAIL_SIZE=(50, 50)):
+            process_image(image.id)
+        image.refresh_from_db()
+        self.assertIsNotNone(image.processed_at)
+        self.assertEqual((image.width, image.height), (200, 400))
+        self.assertEqual(image.size, self.image_size)
+        with PILImage.open(image.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (25, 50))
+            self.assertEqual(len(thumbnail.getexif()), 0)
+        with PILImage.open(image.web.path) as web:
+            self.assertEqual(web.size, (200, 400))
+            self.assertEqual(len(web.getexif()), 0)
+
+        response = self.client.get(reverse('submit-data-detail', args=[pereval_id]))
+        data = response.data['data']['images'][0]
+        self.assertTrue(data['thumbnail_url'].startswith('http://testserver/media/pereval_images/thumbs/'))
+        self.assertTrue(data['web_url'].startswith('http://testserver/media/pereval_images/web/'))
+
+    def test_processing_off(self):
+        """Без обработки URL миниатюры и веб-версии пустые, команда process_images догоняет"""
+        pereval_id = self.post()
+        response = self.client.get(reverse('submit-data-detail', args=[pereval_id]))
+        self.assertIsNone(response.data['data']['images'][0]['thumbnail_url'])
+        self.assertIsNone(response.data['data']['images'][0]['web_url'])
+
+        call_command('process_images', stdout=StringIO())
+        self.assertTrue(Image.objects.get(pereval_id=pereval_id).web)
+
+    def test_post_schedules_processing(self):
+        """POST ставит обработку в очередь после коммита транзакции"""
+        with self.settings(PEREVAL_IMAGE_PROCESSING='sync'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                pereval_id = self.client.post(reverse('submit-data-list'), data=json.dumps(self.data),
+                                              content_type='application/json').data['id']
+            self.assertIsNone(Image.objects.get(pereval_id=pereval_id).processed_at)
+            for callback in callbacks:
+                callback()
+        self.assertIsNotNone(Image.objects.get(pereval_id=pereval_id).processed_at)
+
+    def test_bulk_schedules_processing(self):
+        """bulk_create не отправляет сигналы - обработка ставится в очередь явно"""
+        with self.settings(PEREVAL_IMAGE_PROCESSING='sync'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('submit-data-bulk'), data=json.dumps([self.data]),
+                                            content_type='application/json')
+        pereval_id = response.data['results'][0]['id']
+        self.assertIsNotNone(Image.objects.get(pereval_id=pereval_id).processed_at)
+
+    def test_broken_file_is_logged(self):
+        """Ошибка обработки одного изображения не прерывает остальные"""
+        pereval_id = self.post()
+        image = Image.objects.get(pereval_id=pereval_id)
+        with mock.patch('pereval_app.processing.process_image', side_effect=[OSError("broken"), None]) as process:
+            with self.assertLogs('pereval_app.processing', level='ERROR'):
+                process_images([image.id, image.id])
+        self.assertEqual(process.call_count, 2)
+
+
+class ContentAddressedStorageTests(TempMediaMixin, APITestCase):
+    """Тесты хранения изображений по хэшу содержимого"""
+
+    def setUp(self):
+        self.client = APIClient()
+        image = PILImage.effect_noise((40, 40), 64).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+        self.image_bytes = buffer.getvalue()
+        self.image = f"data:image/png;base64,{base64.b64encode(self.image_bytes).decode('ascii')}"
+
+    def post(self, title):
+        data = {
+            "beauty_title": "пер.",
+            "title": title,
+            "user": {"email": "cas@example.com", "fam": "Хэш", "name": "Файл", "phone": "+79990004444"},
+            "coords": {"latitude": 43.1, "longitude": 42.2, "height": 3000},
+            "level": {"summer": "1А"},
+            "images": [{"image": self.image, "title": "Вид"}]
+        }
+        response = self.client.post(reverse('submit-data-list'), data=json.dumps(data),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return Image.objects.get(pereval_id=response.data['id'])
+
+    def test_identical_images_stored_once(self):
+        """Одинаковые байты - одно имя файла по SHA-256"""
+        first, second = self.post("Первый"), self.post("Второй")
+        digest = hashlib.sha256(self.image_bytes).hexdigest()
+        self.assertEqual(first.image.name, f"pereval_images/{digest[:2]}/{digest}.png")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(content_digest(first.image.name), digest)
+        self.assertIsNone(content_digest("pereval_images/2025/01/01/a1b2c3d4e5.jpg"))
+        with open(first.image.path, 'rb') as f:
+            self.assertEqual(f.read(), self.image_bytes)
+
+    @override_settings(PEREVAL_FILE_GRACE_SECONDS=0)
+    def test_file_removed_with_last_reference(self):
+        """Файл удаляется только вместе с последним ссылающимся изображением"""
+        first, second = self.post("Первый"), self.post("Второй")
+        storage, name = first.image.storage, first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+            # До коммита файл на месте: откат транзакции не оставит запись без файла
+            self.assertTrue(storage.exists(name))
+        self.assertFalse(storage.exists(name))
+
+    @override_settings(PEREVAL_FILE_GRACE_SECONDS=0)
+    def test_pereval_delete_removes_files(self):
+        """Удаление перевала через ORM (каскадом) удаляет файлы изображения и его версий после коммита"""
+        image = self.post("Первый")
+        process_image(image.id)
+        image.refresh_from_db()
+        names = [image.image.name, image.thumbnail.name, image.web.name]
+        self.assertTrue(all(content_storage.exists(name) for name in names))
+        with self.captureOnCommitCallbacks(execute=True):
+            Pereval.objects.filter(id=image.pereval_id).delete()
+        self.assertFalse(any(content_storage.exists(name) for name in names))
+
+    def age(self, name, seconds):
+        path = content_storage.path(name)
+        mtime = time.time() - seconds
+        os.utime(path, (mtime, mtime))
+
+    def test_reused_file_not_deleted(self):
+        """Файл, только что полученный другим запросом по хэшу, переживает освобождение последней ссылки"""
+        first = self.post("Первый")
+        name = first.image.name
+        self.age(name, 3600)
+        # Другой запрос сохраняет те же байты, но его Image еще не закоммичен
+        self.assertEqual(content_storage.save('pereval_images/photo.png', ContentFile(self.image_bytes)), name)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(content_storage.exists(name))
+        self.assertFalse(content_storage.exists(name + DELETING_SUFFIX))
+
+    def test_purge_image_files(self):
+        """Команда удаляет старые файлы без ссылок и оставляет используемые и недавние"""
+        image = self.post("Первый")
+        orphan = content_storage.save('pereval_images/orphan.png', ContentFile(b'orphan'))
+        recent = content_storage.save('pereval_images/recent.png', ContentFile(b'recent'))
+        self.age(image.image.name, 3600)
+        self.age(orphan, 3600)
+        out = StringIO()
+        call_command('purge_image_files', grace=600, stdout=out)
+        self.assertIn("удалено: 1", out.getvalue())
+        self.assertFalse(content_storage.exists(orphan))
+        self.assertTrue(content_storage.exists(recent))
+        self.assertTrue(content_storage.exists(image.image.name))
+
+
+class ImageSyncTests(TempMediaMixin, APITestCase):
+    """Тесты обновления изображений в PATCH по разнице"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.images = []
+        for color in ('red', 'green', 'blue'):
+            buffer = BytesIO()
+            PILImage.new('RGB', (10, 10), color=color).save(buffer, format='PNG')
+            self.images.append(f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}")
+        data = {
+            "beauty_title": "пер.",
+            "title": "Разница",
+            "user": {"email": "sync@example.com", "fam": "Диф", "name": "Патч", "phone": "+79990005555"},
+            "coords": {"latitude": 43.1, "longitude": 42.2, "height": 3000},
+            "level": {"summer": "1А"},
+            "images": [{"image": self.images[0], "title": "Красный"}, {"image": self.images[1], "title": "Зеленый"}]
+        }
+        response = self.client.post(reverse('submit-data-list'), data=json.dumps(data),
+                                    content_type='application/json')
+        self.pereval_id = response.data['id']
+        self.url = reverse('submit-data-detail', args=[self.pereval_id])
+        self.red, self.green = Image.objects.filter(pereval_id=self.pereval_id).order_by('id')
+
+    def patch(self, images):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(self.url, data=json.dumps({"images": images}),
+                                     content_type='application/json')
+
+    def test_rename_by_id_keeps_rows(self):
+        """Элемент с id меняет только название, записи и файлы не пересоздаются"""
+        response = self.patch([
+            {"id": self.red.id, "title": "Алый"},
+            {"id": self.green.id, "title": "Зеленый"},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        images = list(Image.objects.filter(pereval_id=self.pereval_id).order_by('id'))
+        self.assertEqual([image.id for image in images], [self.red.id, self.green.id])
+        self.assertEqual(images[0].title, "Алый")
+        self.assertEqual(images[0].date_added, self.red.date_added)
+
+    @override_settings(PEREVAL_FILE_GRACE_SECONDS=0)
+    def test_same_content_matched_by_hash(self):
+        """Повторно отправленный файл совпадает по SHA-256, лишнее удаляется, новое добавляется"""
+        storage, green_name = self.green.image.storage, self.green.image.name
+        response = self.patch([
+            {"image": self.images[0], "title": "Красный"},
+            {"image": self.images[2], "title": "Синий"},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        images = list(Image.objects.filter(pereval_id=self.pereval_id).order_by('id'))
+        self.assertEqual(images[0].id, self.red.id)
+        self.assertEqual(images[1].title, "Синий")
+        self.assertEqual(len(images), 2)
+        self.assertFalse(storage.exists(green_name))
+        self.assertTrue(storage.exists(self.red.image.name))
+
+    def test_rollback_keeps_files(self):
+        """Ошибка в транзакции PATCH не удаляет файлы изображений"""
+        storage, green_name = self.green.image.storage, self.green.image.name
+        with mock.patch('pereval_app.image_sync.Image.objects.bulk_update', side_effect=RuntimeError("db")):
+            response = self.patch([{"id": self.red.id, "title": "Алый"}])
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertTrue(storage.exists(green_name))
+        self.assertEqual(Image.objects.filter(pereval_id=self.pereval_id).count(), 2)
+
+    def test_foreign_image_id(self):
+        """id изображения другого перевала - ошибка 400"""
+        other = Image.objects.create(pereval=Pereval.objects.create(
+            beauty_title="пер.", title="Другой", user=self.red.pereval.user,
+            coords=Coords.objects.create(latitude=1, longitude=1, height=1), level=Level.objects.create()
+        ), image="pereval_images/x.jpg", title="Чужое")
+        response = self.patch([{"id": other.id, "title": "Мое"}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_id_and_image_are_exclusive(self):
+        """В элементе нужен либо id, либо image"""
+        response = self.patch([{"id": self.red.id, "image": self.images[2], "title": "Оба"}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IndexUsageTests(TestCase):
+    """Планы запросов списка и модерации используют индексы из миграции 0008"""
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # В тестовой базе мало строк, и PostgreSQL выбрал бы seq scan. Запрет seq scan
+            # дает план, который планировщик строит на ~1M строк (см. benchmarks/bench_indexes.py)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                return queryset.explain()
+        return queryset.explain()
+
+    def assertUsesIndex(self, plan, index):
+        self.assertIn(index, plan)
+        # Порядок индекса совпадает с ordering - отдельной сортировки нет
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotRegex(plan, r'\bSort\b')
+
+    def test_user_listing_uses_index(self):
+        """Страница GET /submitData/?user__email= читается по (user_id, add_time DESC, id DESC)"""
+        queryset = pereval_rows(Pereval.objects.filter(user__email="plan@example.com"))[:101]
+        self.assertUsesIndex(self.explain(queryset), 'pereval_user_time_idx')
+
+    def test_moderation_queue_uses_index(self):
+        """Выборка по статусу в порядке add_time использует индекс по статусу"""
+        queryset = Pereval.objects.filter(status='new').values_list('id', flat=True)[:100]
+        plan = self.explain(queryset)
+        self.assertRegex(plan, r'pereval_(status|new)_time_idx')
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotRegex(plan, r'\bSort\b')
+
+
+class GeoSearchTests(APITestCase):
+    """Тесты поиска перевалов по координатам"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email="geo@example.com", fam="Гео", name="Поиск", phone="+79990006666")
+        self.points = {
+            "Эльбрус": (43.3499, 42.4453),
+            "Казбек": (42.6996, 44.5186),
+            "Рядом с Эльбрусом": (43.40, 42.50),
+            "Чукотка": (65.0, 179.95),
+            "Аляска": (65.0, -179.95),
+        }
+        self.ids = {}
+        for title, (lat, lon) in self.points.items():
+            pereval = Pereval.objects.create(
+                beauty_title="пер.", title=title, user=self.user,
+                coords=Coords.objects.create(latitude=lat, longitude=lon, height=3000),
+                level=Level.objects.create()
+            )
+            self.ids[title] = pereval.id
+
+    def test_tile_key_filled_on_save_and_bulk_create(self):
+        """tile вычисляется в pre_save, в том числе при bulk_create"""
+        coords = Coords.objects.get(perevals__title="Эльбрус")
+        self.assertEqual(coords.tile, tile_key(43.3499, 42.4453))
+        bulk, = Coords.objects.bulk_create([Coords(latitude=10, longitude=20, height=1)])
+        self.assertEqual(Coords.objects.get(id=bulk.id).tile, tile_key(10, 20))
+
+    def test_haversine(self):
+        """Расстояние Эльбрус - Казбек около 180 км, один градус по экватору - 111 км"""
+        self.assertAlmostEqual(haversine_km(43.3499, 42.4453, 42.6996, 44.5186), 182, delta=10)
+        self.assertAlmostEqual(haversine_km(0, 0, 0, 1), 111.2, delta=0.1)
+
+    def test_tile_ranges_cover_antimeridian(self):
+        """bbox через 180-й меридиан - два диапазона на строку"""
+        ranges = tile_ranges(64.9, 179.9, 65.1, -179.9)
+        self.assertTrue(any(lo <= tile_key(65.0, 179.95) <= hi for lo, hi in ranges))
+        self.assertTrue(any(lo <= tile_key(65.0, -179.95) <= hi for lo, hi in ranges))
+        self.assertEqual(len(tile_ranges(-80, -170, 80, 170)), 1)
+
+    def test_nearby_sorted_by_distance(self):
+        """В радиусе 20 км - Эльбрус и соседняя точка, ближайшая первой"""
+        response = self.client.get(reverse('perevals-nearby'), {'lat': 43.35, 'lon': 42.445, 'radius': 20})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [item['title'] for item in response.data['data']]
+        self.assertEqual(titles, ["Эльбрус", "Рядом с Эльбрусом"])
+        self.assertLess(response.data['data'][0]['distance'], 1)
+        self.assertIn('images', response.data['data'][0])
+
+    def test_nearby_across_antimeridian(self):
+        """Точки по разные стороны 180-го меридиана находятся из одного центра"""
+        response = self.client.get(reverse('perevals-nearby'), {'lat': 65.0, 'lon': 180, 'radius': 10})
+        titles = {item['title'] for item in response.data['data']}
+        self.assertEqual(titles, {"Чукотка", "Аляска"})
+
+    def test_nearby_invalid_params(self):
+        """Без координат или с радиусом вне пределов - 400"""
+        self.assertEqual(self.client.get(reverse('perevals-nearby'), {'lat': 43}).status_code, 400)
+        response = self.client.get(reverse('perevals-nearby'), {'lat': 43, 'lon': 42, 'radius': 10000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bbox(self):
+        """bbox Кавказа не включает Чукотку; bbox через меридиан - включает"""
+        response = self.client.get(reverse('perevals-bbox'), {'south': 42, 'west': 42, 'north': 44, 'east': 45})
+        self.assertEqual({item['title'] for item in response.data['data']},
+                         {"Эльбрус", "Казбек", "Рядом с Эльбрусом"})
+        response = self.client.get(reverse('perevals-bbox'), {'south': 60, 'west': 170, 'north': 70, 'east': -170})
+        self.assertEqual({item['title'] for item in response.data['data']}, {"Чукотка", "Аляска"})
+
+    def test_bbox_query_count(self):
+        """Страница bbox: запрос перевалов + запрос изображений"""
+        with self.assertNumQueries(2):
+            self.client.get(reverse('perevals-bbox'), {'south': 42, 'west': 42, 'north': 44, 'east': 45})
+
+
+class TileClusterTests(APITestCase):
+    """Тесты кластеризации перевалов по тайлам карты"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email="tiles@example.com", fam="Тайл", name="Карта", phone="+79990007777")
+        # Две точки у Эльбруса и одна у Казбека
+        for lat, lon, height in ((43.35, 42.44, 5000), (43.36, 42.45, 3000), (42.70, 44.52, 5033)):
+            self.create(lat, lon, height)
+        self.zoom = 6
+        self.tile = point_tiles(43.35, 42.44, self.zoom)[self.zoom]
+
+    def create(self, lat, lon, height=3000):
+        return Pereval.objects.create(
+            beauty_title="пер.", title="Точка", user=self.user,
+            coords=Coords.objects.create(latitude=lat, longitude=lon, height=height),
+            level=Level.objects.create()
+        )
+
+    def get(self, tile):
+        return self.client.get(reverse('perevals-clusters', args=tile))
+
+    def test_clusters_counts_and_centroids(self):
+        """Близкие точки - один кластер с центроидом и средней высотой"""
+        response = self.get(self.tile)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['count'], 3)
+        clusters = sorted(data['clusters'], key=lambda cluster: -cluster['count'])
+        self.assertEqual(clusters[0]['count'], 2)
+        self.assertAlmostEqual(clusters[0]['latitude'], 43.355, places=4)
+        self.assertAlmostEqual(clusters[0]['longitude'], 42.445, places=4)
+        self.assertEqual(clusters[0]['height'], 4000)
+
+    def test_cluster_points_vectorised(self):
+        """Точки за границей тайла не учитываются, пустые ячейки сетки не возвращаются"""
+        south, west, north, east = tile_bounds(2, 1, 1)
+        points = np.array([
+            [north - 1e-6, west + 1e-6, 100],
+            [south - 1e-6, west + 1e-6, 100],  # уже в соседнем тайле снизу
+            [(north + south) / 2, (west + east) / 2, 200],
+        ])
+        clusters = cluster_points(points, 2, 1, 1, grid=4)
+        self.assertEqual(sum(cluster['count'] for cluster in clusters), 2)
+        self.assertEqual(len(clusters), 2)
+
+    def test_cached_and_invalidated_on_create(self):
+        """Тайл кэшируется, новый перевал в тайле сбрасывает кэш"""
+        self.get(self.tile)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.tile).data['data']['count'], 3)
+        self.create(43.37, 42.46)
+        self.assertEqual(self.get(self.tile).data['data']['count'], 4)
+
+    def test_invalidated_on_patch_move(self):
+        """PATCH координат сбрасывает тайлы старой и новой точки"""
+        pereval = Pereval.objects.filter(coords__latitude=43.36).get()
+        far_tile = point_tiles(55.75, 37.62, self.zoom)[self.zoom]
+        self.assertEqual(self.get(self.tile).data['data']['count'], 3)
+        self.assertEqual(self.get(far_tile).data['data']['count'], 0)
+        response = self.client.patch(
+            reverse('submit-data-detail', args=[pereval.id]),
+            data=json.dumps({"coords": {"latitude": 55.75, "longitude": 37.62, "height": 150}}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get(self.tile).data['data']['count'], 2)
+        self.assertEqual(self.get(far_tile).data['data']['count'], 1)
+
+    def test_invalid_tile(self):
+        """x/y за пределами масштаба - 400"""
+        self.assertEqual(self.get((2, 4, 0)).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchTests(TempMediaMixin, APITestCase):
+    """Тесты полнотекстового поиска"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email="search@example.com", fam="Поиск", name="Текст", phone="+79990008888")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.elbrus = self.create("Эльбрусский перевал", other_titles="Седловина Эльбруса")
+            self.kazbek = self.create("Казбек", connect="Долины Терека и Арагви")
+            self.other = self.create("Перевал Дятлова", connect="Седловина у Эльбруса")
+
+    def create(self, title, other_titles="", connect=""):
+        return Pereval.objects.create(
+            beauty_title="пер.", title=title, other_titles=other_titles, connect=connect, user=self.user,
+            coords=Coords.objects.create(latitude=43, longitude=42, height=3000), level=Level.objects.create()
+        )
+
+    def image(self):
+        buffer = BytesIO()
+        PILImage.new('RGB', (10, 10), color='white').save(buffer, format='PNG')
+        return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+    def find(self, query):
+        response = self.client.get(reverse('perevals-search'), {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['data']]
+
+    def test_stem(self):
+        """Разные формы слова приводятся к одной основе"""
+        self.assertEqual(stem("перевалы"), stem("перевалом"))
+        self.assertEqual(stem("Эльбруса"), stem("эльбрус"))
+        self.assertEqual(stem("долины"), stem("долина"))
+
+    def test_morphology_and_ranking(self):
+        """Поиск по другой форме слова; совпадение в названии выше, чем в connect"""
+        self.assertEqual(self.find("седловины эльбрус"), [self.elbrus.id, self.other.id])
+        self.assertEqual(self.find("Терек"), [self.kazbek.id])
+
+    def test_index_updated_on_patch(self):
+        """PATCH названия обновляет индекс после коммита"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('submit-data-detail', args=[self.kazbek.id]),
+                              data=json.dumps({"title": "Крестовый перевал"}), content_type='application/json')
+        self.assertEqual(self.find("крестовый"), [self.kazbek.id])
+        self.assertEqual(self.find("казбек"), [])
+
+    def test_index_updated_on_post_and_delete(self):
+        """Новый перевал находится после коммита, удаленный - пропадает"""
+        data = {
+            "beauty_title": "пер.", "title": "Гондарайский", "connect": "Теберда",
+            "user": {"email": "search@example.com", "fam": "Поиск", "name": "Текст", "phone": "+79990008888"},
+            "coords": {"latitude": 43.1, "longitude": 42.2, "height": 3000},
+            "level": {"summer": "1А"},
+            "images": [{"image": self.image(), "title": "Вид"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            pereval_id = self.client.post(reverse('submit-data-list'), data=json.dumps(data),
+                                          content_type='application/json').data['id']
+        self.assertEqual(self.find("гондарайский"), [pereval_id])
+        with self.captureOnCommitCallbacks(execute=True):
+            Pereval.objects.get(id=pereval_id).delete()
+        self.assertEqual(self.find("гондарайский"), [])
+
+    def test_short_query(self):
+        """Запрос короче двух символов - 400"""
+        response = self.client.get(reverse('perevals-search'), {'q': 'а'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RegionTreeTests(APITestCase):
+    """Тесты дерева регионов и выборки перевалов по поддереву"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email="areas@example.com", fam="Регион", name="Дерево", phone="+79990006666")
+        # Кавказ -> (Приэльбрусье -> Адыл-Су), Кавказ -> Дигория; Алтай отдельно
+        for pk, parent, title in ((1, 0, "Кавказ"), (2, 1, "Приэльбрусье"), (3, 2, "Адыл-Су"),
+                                  (4, 1, "Дигория"), (5, 0, "Алтай")):
+            PerevalAreas.objects.create(id=pk, id_parent=parent, title=title)
+        self.adylsu = self.create(3)
+        self.digoria = self.create(4)
+        self.altai = self.create(5)
+
+    def create(self, area_id):
+        return Pereval.objects.create(
+            beauty_title="пер.", title="Перевал", user=self.user, area_id=area_id,
+            coords=Coords.objects.create(latitude=43, longitude=42, height=3000), level=Level.objects.create()
+        )
+
+    def get(self, area_id, **params):
+        return self.client.get(reverse('area-perevals', args=[area_id]), params)
+
+    def test_nested_set(self):
+        """Интервалы nested set: поддерево - срез, предки - путь от корня"""
+        tree = RegionTree([(1, 0, "A"), (2, 1, "B"), (3, 2, "C"), (4, 1, "D"), (5, 0, "E")])
+        self.assertEqual(tree.subtree(1), [1, 2, 3, 4])
+        self.assertEqual(tree.subtree(2), [2, 3])
+        self.assertEqual(tree.subtree(5), [5])
+        self.assertTrue(tree.is_descendant(3, 1))
+        self.assertFalse(tree.is_descendant(4, 2))
+        self.assertEqual(tree.ancestors(3), [1, 2])
+
+    def test_cycle_does_not_hang(self):
+        """Цикл в id_parent не приводит к бесконечному обходу"""
+        tree = RegionTree([(1, 0, "A"), (2, 3, "B"), (3, 2, "C")])
+        self.assertEqual(tree.subtree(1), [1])
+        self.assertNotIn(2, tree)
+
+    def test_subtree_perevals(self):
+        """Перевалы региона включают перевалы всех подрегионов"""
+        response = self.get(1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in response.data['data']}, {self.adylsu.id, self.digoria.id})
+        self.assertEqual(response.data['area']['subareas'], 3)
+        self.assertEqual([item['id'] for item in self.get(3).data['area']['path']], [1, 2])
+        self.assertEqual([item['id'] for item in self.get(5).data['data']], [self.altai.id])
+
+    def test_tree_served_from_memory(self):
+        """Повторный запрос не читает таблицу регионов: только перевалы и изображения"""
+        self.get(1)
+        with self.assertNumQueries(2):
+            self.get(1)
+
+    def test_reload_after_change(self):
+        """Изменение таблицы регионов сбрасывает дерево процесса"""
+        self.assertEqual(len(reference_data.get().regions), 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            PerevalAreas.objects.create(id=6, id_parent=5, title="Чуйский хребет")
+        self.assertEqual(reference_data.get().regions.subtree(5), [5, 6])
+        with self.captureOnCommitCallbacks(execute=True):
+            PerevalAreas.objects.filter(id=6).delete()
+        self.assertNotIn(6, reference_data.get().regions)
+
+    def test_unknown_area(self):
+        """Несуществующий регион - 404"""
+        self.assertEqual(self.get(999).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ReferenceDataTests(APITestCase):
+    """Тесты справочников из снимка процесса"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        PerevalAreas.objects.create(id=1, id_parent=0, title="Кавказ")
+        PerevalAreas.objects.create(id=2, id_parent=1, title="Приэльбрусье")
+        SprActivitiesTypes.objects.create(id=1, title="пешком")
+
+    def test_areas_and_activities(self):
+        """Справочники отдаются с версией, ETag и Cache-Control"""
+        response = self.client.get(reverse('areas'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][1], {"id": 2, "id_parent": 1, "title": "Приэльбрусье"})
+        self.assertEqual(response['ETag'], f'"{response.data["version"]}"')
+        self.assertIn('max-age=', response['Cache-Control'])
+        activities = self.client.get(reverse('activities'))
+        self.assertEqual(list(activities.data['data']), [{"id": 1, "title": "пешком"}])
+        self.assertEqual(activities['ETag'], response['ETag'])
+
+    def test_served_without_queries(self):
+        """Повторные запросы не обращаются к базе"""
+        self.client.get(reverse('areas'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('areas'))
+            self.client.get(reverse('activities'))
+
+    def test_not_modified(self):
+        """If-None-Match с текущей версией - 304"""
+        etag = self.client.get(reverse('activities'))['ETag']
+        response = self.client.get(reverse('activities'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_version_changes_with_content(self):
+        """Изменение справочника меняет версию; пересборка без изменений - нет"""
+        version = self.client.get(reverse('areas')).data['version']
+        call_command('refresh_reference_data', stdout=StringIO())
+        self.assertEqual(self.client.get(reverse('areas')).data['version'], version)
+        with self.captureOnCommitCallbacks(execute=True):
+            SprActivitiesTypes.objects.create(id=2, title="лыжи")
+        response = self.client.get(reverse('activities'))
+        self.assertEqual(len(response.data['data']), 2)
+        self.assertNotEqual(response.data['version'], version)
+
+    def test_other_process_sees_change(self):
+        """Снимок другого процесса перестраивается по версии в базе, а не в локальном кэше"""
+        worker = ReferenceData()
+        self.assertEqual(len(worker.get().activities), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            SprActivitiesTypes.objects.create(id=2, title="лыжи")
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(worker.get().activities), 1)
+        with override_settings(PEREVAL_REFERENCE_CHECK_INTERVAL=0):
+            self.assertEqual(len(worker.get().activities), 2)
+
+
+class ModerationTests(APITestCase):
+    """Тесты очереди модерации"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        staff = get_user_model()
+        self.alice = staff.objects.create_user("alice", is_staff=True)
+        self.bob = staff.objects.create_user("bob", is_staff=True)
+        self.user = User.objects.create(email="mod@example.com", fam="Модер", name="Ация", phone="+79990005555")
+        self.perevals = [
+            Pereval.objects.create(
+                beauty_title="пер.", title=f"Перевал {i}", user=self.user, level=Level.objects.create(),
+                coords=Coords.objects.create(latitude=43, longitude=42, height=3000)
+            )
+            for i in range(5)
+        ]
+
+    def claim(self, moderator, limit):
+        self.client.force_authenticate(moderator)
+        response = self.client.post(reverse('moderation-claim'), data={"limit": limit}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['id'] for item in response.data['data'])
+
+    def decide(self, moderator, ids, decision):
+        self.client.force_authenticate(moderator)
+        return self.client.post(reverse('moderation-decide'), data={"ids": ids, "status": decision}, format='json')
+
+    def test_claims_are_disjoint(self):
+        """Модераторы получают разные записи, самые старые первыми"""
+        first = self.claim(self.alice, 3)
+        second = self.claim(self.bob, 3)
+        self.assertEqual(first, [p.id for p in self.perevals[:3]])
+        self.assertEqual(second, [p.id for p in self.perevals[3:]])
+        self.assertEqual(self.claim(self.bob, 3), [])
+        pereval = Pereval.objects.get(id=first[0])
+        self.assertEqual((pereval.status, pereval.moderator), ('pending', 'alice'))
+
+    def test_decide_only_own_claims(self):
+        """Решение применяется только к записям текущего модератора"""
+        ids = self.claim(self.alice, 2)
+        other = self.claim(self.bob, 1)
+        response = self.decide(self.bob, ids + other, 'rejected')
+        self.assertEqual(response.data['updated'], other)
+        self.assertEqual(response.data['skipped'], ids)
+        response = self.decide(self.alice, ids, 'accepted')
+        self.assertEqual(response.data['updated'], ids)
+        self.assertEqual(set(Pereval.objects.filter(id__in=ids).values_list('status', flat=True)), {'accepted'})
+
+    def test_release_returns_to_queue(self):
+        """status=new возвращает запись в очередь"""
+        ids = self.claim(self.alice, 1)
+        self.decide(self.alice, ids, 'new')
+        self.assertEqual(self.claim(self.bob, 1), ids)
+
+    def test_expired_claims_are_reclaimed(self):
+        """Запись без решения дольше таймаута снова попадает в очередь"""
+        ids = self.claim(self.alice, 5)
+        with self.settings(PEREVAL_MODERATION_CLAIM_TIMEOUT=-1):
+            self.assertEqual(self.claim(self.bob, 5), ids)
+        self.assertEqual(self.decide(self.alice, ids, 'accepted').data['updated'], [])
+
+    def test_detail_cache_and_version_updated(self):
+        """Смена статуса сбрасывает кэш и меняет ETag записи"""
+        pereval = self.perevals[0]
+        url = reverse('submit-data-detail', args=[pereval.id])
+        etag = self.client.get(url)['ETag']
+        self.claim(self.alice, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.decide(self.alice, [pereval.id], 'accepted')
+        response = self.client.get(url)
+        self.assertEqual(response.data['data']['status'], 'accepted')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_skip_locked(self):
+        """Выборка новых записей не ждет блокировок других модераторов"""
+        if not connection.features.has_select_for_update_skip_locked:
+            self.skipTest("База не поддерживает SKIP LOCKED")
+        with CaptureQueriesContext(connection) as queries:
+            claim_batch("alice", 1)
+        self.assertTrue(any('SKIP LOCKED' in query['sql'] for query in queries.captured_queries))
+
+    def test_staff_only(self):
+        """Без прав staff - 403, некорректный статус - 400"""
+        response = self.client.post(reverse('moderation-claim'), data={}, format='json')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertEqual(self.decide(self.alice, [1], 'pending').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AdminTests(TestCase):
+    """Тесты админки перевалов"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", None)
+        self.client.force_login(self.admin)
+        self.user = User.objects.create(email="admin-list@example.com", fam="Админ", name="Ка", phone="+79990004444")
+
+    def create(self, count, title="Перевал"):
+        perevals = []
+        for _ in range(count):
+            pereval = Pereval.objects.create(
+                beauty_title="пер.", title=title, user=self.user, level=Level.objects.create(summer="1А"),
+                coords=Coords.objects.create(latitude=43, longitude=42, height=3000)
+            )
+            Image.objects.create(pereval=pereval, image="pereval_images/a.jpg", thumbnail="pereval_images/thumbs/a.jpg",
+                                 title="Вид")
+            perevals.append(pereval)
+        return perevals
+
+    def changelist(self, **params):
+        return self.client.get(reverse('admin:pereval_app_pereval_changelist'), params)
+
+    def test_changelist_query_count_does_not_grow(self):
+        """Количество запросов списка не зависит от числа строк"""
+        self.create(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.changelist().status_code, 200)
+        self.create(10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.changelist()
+        self.assertEqual(len(large), len(small))
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_search_uses_full_text_index(self):
+        """Поиск в админке идет через полнотекстовый индекс"""
+        self.create(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            elbrus = self.create(1, title="Эльбрусский")[0]
+        response = self.changelist(q="эльбрус")
+        self.assertEqual([obj.id for obj in response.context['cl'].result_list], [elbrus.id])
+
+    def test_status_actions(self):
+        """Массовое действие меняет статус одним UPDATE и обновляет updated_at"""
+        perevals = self.create(3)
+        before = Pereval.objects.get(id=perevals[0].id).updated_at
+        response = self.client.post(reverse('admin:pereval_app_pereval_changelist'), {
+            'action': 'mark_accepted', '_selected_action': [p.id for p in perevals[:2]]
+        })
+        self.assertEqual(response.status_code, 302)
+        statuses = dict(Pereval.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[p.id] for p in perevals], ['accepted', 'accepted', 'new'])
+        self.assertGreater(Pereval.objects.get(id=perevals[0].id).updated_at, before)
+
+    def test_delete_releases_files(self):
+        """Удаление перевала из админки освобождает файлы изображений"""
+        pereval = self.create(1)[0]
+        with mock.patch('pereval_app.signals.release_files') as release:
+            admin_site._registry[Pereval].delete_queryset(None, Pereval.objects.filter(id=pereval.id))
+        self.assertFalse(Pereval.objects.filter(id=pereval.id).exists())
+        self.assertEqual(set(release.call_args[0][1]), {"pereval_images/a.jpg", "pereval_images/thumbs/a.jpg"})
+
+    def test_image_bulk_delete_releases_files(self):
+        """Массовое удаление изображений из админки освобождает их файлы"""
+        pereval = self.create(1)[0]
+        images = Image.objects.filter(pereval=pereval)
+        with mock.patch('pereval_app.signals.release_files') as release:
+            response = self.client.post(reverse('admin:pereval_app_image_changelist'), {
+                'action': 'delete_selected', '_selected_action': list(images.values_list('id', flat=True)),
+                'post': 'yes'
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(images.exists())
+        self.assertEqual(set(release.call_args[0][1]), {"pereval_images/a.jpg", "pereval_images/thumbs/a.jpg"})
+
+    def test_paginator_exact_without_statistics(self):
+        """Без статистики PostgreSQL пагинатор считает точно"""
+        self.create(3)
+        if connection.vendor != 'postgresql':
+            self.assertIsNone(estimated_count(Pereval.objects.all()))
+        self.assertEqual(EstimatedCountPaginator(Pereval.objects.all(), 2).count, 3)
+        with mock.patch('pereval_app.admin.estimated_count', return_value=5_000_000):
+            self.assertEqual(EstimatedCountPaginator(Pereval.objects.all(), 2).count, 5_000_000)
+
+
+class AsyncViewTests(TempMediaMixin, TestCase):
+    """Тесты асинхронных версий списка, записи и создания"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="async@example.com", fam="Асинк", name="Вью", phone="+79990003333")
+        self.perevals = [
+            Pereval.objects.create(
+                beauty_title="пер.", title=f"Перевал {i}", user=self.user, level=Level.objects.create(summer="1А"),
+                coords=Coords.objects.create(latitude=43.1, longitude=42.2, height=3000)
+            )
+            for i in range(3)
+        ]
+
+    def image(self):
+        buffer = BytesIO()
+        PILImage.new('RGB', (12, 12), color='red').save(buffer, format='PNG')
+        return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+    def test_list_matches_sync_endpoint(self):
+        """Список совпадает с GET /submitData/, включая курсор"""
+        params = {'user__email': self.user.email, 'limit': 2}
+        sync = self.client.get(reverse('submit-data-list'), params).json()
+        response = self.client.get(reverse('async-submit-data-list'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), sync)
+        response = self.client.get(reverse('async-submit-data-list'), {**params, 'cursor': sync['next_cursor']})
+        self.assertEqual([item['id'] for item in response.json()['data']], [self.perevals[0].id])
+
+    def test_detail_matches_sync_endpoint(self):
+        """Запись совпадает с GET /submitData/<id>/, повторный запрос - из кэша или 304 по ETag"""
+        pk = self.perevals[0].id
+        sync = self.client.get(reverse('submit-data-detail', args=[pk]))
+        response = self.client.get(reverse('async-submit-data-detail', args=[pk]))
+        self.assertEqual(response.json(), sync.json())
+        self.assertEqual(response['ETag'], sync['ETag'])
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('async-submit-data-detail', args=[pk]), HTTP_IF_NONE_MATCH=sync['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get(reverse('async-submit-data-detail', args=[999999])).status_code, 404)
+
+    async def test_native_async_client(self):
+        """Представления работают в цикле событий без перехода в синхронный режим"""
+        response = await self.async_client.get(reverse('async-submit-data-list'), {'user__email': self.user.email})
+        self.assertEqual(len(response.json()['data']), 3)
+        response = await self.async_client.get(reverse('async-submit-data-list'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_create(self):
+        """POST сохраняет запись и изображение; ошибки валидации - 400"""
+        data = {
+            "beauty_title": "пер.", "title": "Асинхронный",
+            "user": {"email": "async-new@example.com", "fam": "Новый", "name": "Турист", "phone": "+79990002222"},
+            "coords": {"latitude": 43.2, "longitude": 42.3, "height": 3100},
+            "level": {"summer": "1Б"},
+            "images": [{"image": self.image(), "title": "Вершина"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('async-submit-data-list'), data=json.dumps(data),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        pereval = Pereval.objects.get(id=response.json()['id'])
+        self.assertEqual((pereval.title, pereval.user.email, pereval.status),
+                         ("Асинхронный", "async-new@example.com", 'new'))
+        image = pereval.images.get()
+        self.assertTrue(image.image.storage.exists(image.image.name))
+
+        response = self.client.post(reverse('async-submit-data-list'), data=json.dumps({**data, "images": []}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('async-submit-data-list'), data="{", content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_validates_outside_database_thread(self):
+        """Валидация (декодирование, Pillow) идет в пуле потоков: токены загрузок проверены заранее"""
+        buffer = BytesIO()
+        PILImage.new('RGB', (12, 12), color='blue').save(buffer, format='PNG')
+        upload = self.client.post(reverse('image-upload'), {
+            'image': SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+        }, format='multipart')
+        token = upload.json()['token']
+        data = {
+            "beauty_title": "пер.", "title": "С токеном",
+            "user": {"email": "async-token@example.com", "fam": "Новый", "name": "Турист", "phone": "+79990002222"},
+            "coords": {"latitude": 43.2, "longitude": 42.3, "height": 3100},
+            "level": {"summer": "1Б"},
+            "images": [{"image": token, "title": "Загрузка"}, {"image": self.image(), "title": "Base64"}],
+        }
+        threads = []
+        is_valid = PerevalSerializer.is_valid
+
+        def record_thread(serializer, *args, **kwargs):
+            threads.append(threading.get_ident())
+            return is_valid(serializer, *args, **kwargs)
+
+        with mock.patch.object(PerevalSerializer, 'is_valid', record_thread), \
+                mock.patch('pereval_app.serializers.active_uploads', side_effect=AssertionError("query in validation")):
+            response = self.client.post(reverse('async-submit-data-list'), data=json.dumps(data),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            unknown = dict(data, images=[{"image": str(uuid.uuid4()), "title": "Нет"}])
+            response = self.client.post(reverse('async-submit-data-list'), data=json.dumps(unknown),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(Image.objects.filter(pereval__title="С токеном").count(), 2)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    """Тесты настроек соединений из FSTR_DB_*"""
+
+    def test_persistent_connections_by_default(self):
+        """Без переменных - постоянные соединения с проверкой"""
+        self.assertEqual(connection_settings({}), {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True, 'OPTIONS': {}})
+        config = connection_settings({'FSTR_DB_CONN_MAX_AGE': '0', 'FSTR_DB_CONN_HEALTH_CHECKS': 'false'})
+        self.assertEqual((config['CONN_MAX_AGE'], config['CONN_HEALTH_CHECKS']), (0, False))
+
+    def test_pool(self):
+        """FSTR_DB_POOL=1 - пул psycopg 3, постоянные соединения отключены"""
+        env = {'FSTR_DB_POOL': '1', 'FSTR_DB_POOL_MAX_SIZE': '20'}
+        with mock.patch('importlib.util.find_spec', return_value=object()):
+            config = connection_settings(env)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10})
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            with self.assertRaises(ImproperlyConfigured):
+                connection_settings(env)
+
+    def test_asgi(self):
+        """Под ASGI постоянные соединения выключены по умолчанию и запрещены явно"""
+        config = connection_settings({'FSTR_ASGI': '1'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'FSTR_DB_POOL'):
+            connection_settings({'FSTR_ASGI': '1', 'FSTR_DB_CONN_MAX_AGE': '60'})
+        with mock.patch('importlib.util.find_spec', return_value=object()):
+            config = connection_settings({'FSTR_ASGI': '1', 'FSTR_DB_POOL': '1', 'FSTR_DB_CONN_MAX_AGE': '60'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+    def test_invalid_number(self):
+        """Нечисловое значение - ImproperlyConfigured с именем переменной"""
+        with self.assertRaisesMessage(ImproperlyConfigured, 'FSTR_DB_CONN_MAX_AGE'):
+            connection_settings({'FSTR_DB_CONN_MAX_AGE': 'forever'})
+
+    def test_replicas(self):
+        """FSTR_DB_REPLICA_HOST через запятую - реплики replica_1, replica_2 с параметрами основной базы"""
+        primary = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'pereval', 'USER': 'app', 'HOST': 'db'}
+        self.assertEqual(replica_databases(primary, {}), {})
+        replicas = replica_databases(primary, {'FSTR_DB_REPLICA_HOST': 'r1, r2', 'FSTR_DB_REPLICA_LOGIN': 'reader'})
+        self.assertEqual(list(replicas), ['replica_1', 'replica_2'])
+        self.assertEqual(
+            (replicas['replica_2']['HOST'], replicas['replica_2']['NAME'], replicas['replica_2']['USER']),
+            ('r2', 'pereval', 'reader')
+        )
+        self.assertEqual(replicas['replica_1']['TEST'], {'MIRROR': 'default'})
+
+
+REPLICA = 'replica_test'
+
+
+class ReplicaRoutingTests(TempMediaMixin, APITestCase):
+    """
+    Тесты чтения с реплики: отдельный файл SQLite под алиасом replica_test.
+    Алиас создается в setUpClass, поэтому вместо имени в databases - '__all__':
+    раннер и системные проверки видят только базы из настроек, а класс - и реплику.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings[REPLICA] = connections.configure_settings({**connections.settings, REPLICA: {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+        }})[REPLICA]
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        os.remove(os.path.join(cls.replica_dir, 'replica.sqlite3'))
+        os.rmdir(cls.replica_dir)
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(email="replica@example.com", fam="Реплика", name="Тест", phone="+79990004444")
+        self.pereval = Pereval.objects.create(
+            beauty_title="пер.", title="Основная", user=user, level=Level.objects.create(summer="1А"),
+            coords=Coords.objects.create(latitude=43.1, longitude=42.2, height=3000)
+        )
+        # Вне запроса чтение идет в основную базу - копия на реплику с другим названием
+        for model in (User, Coords, Level, Pereval):
+            model.objects.using(REPLICA).bulk_create(list(model.objects.all()))
+        Pereval.objects.using(REPLICA).filter(pk=self.pereval.pk).update(title="Реплика")
+        override = override_settings(PEREVAL_DB_REPLICAS=[REPLICA], PEREVAL_DB_STICKY_SECONDS=10)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def detail_title(self, client, pk):
+        response = client.get(reverse('submit-data-detail', args=[pk]))
+        return response.json()['data']['title'] if response.status_code == 200 else response.status_code
+
+    def test_router(self):
+        """Без флага запроса чтение и запись - в основной базе"""
+        router = ReplicaRouter()
+        self.assertEqual((router.db_for_read(Pereval), router.db_for_write(Pereval)), ('default', 'default'))
+
+    def test_get_reads_replica(self):
+        """GET читает реплику, без реплик в настройках - основную базу"""
+        self.assertEqual(self.detail_title(self.client, self.pereval.pk), "Реплика")
+        cache.clear()
+        response = self.client.get(reverse('async-submit-data-detail', args=[self.pereval.pk]))
+        self.assertEqual(response.json()['data']['title'], "Реплика")
+        cache.clear()
+        with self.settings(PEREVAL_DB_REPLICAS=[]):
+            self.assertEqual(self.detail_title(self.client, self.pereval.pk), "Основная")
+
+    def test_read_your_writes(self):
+        """После записи клиент читает основную базу, пока не истечет cookie"""
+        buffer = BytesIO()
+        PILImage.new('RGB', (12, 12), color='red').save(buffer, format='PNG')
+        data = {
+            "beauty_title": "пер.", "title": "Новый",
+            "user": {"email": "replica-new@example.com", "fam": "Новый", "name": "Турист", "phone": "+79990005555"},
+            "coords": {"latitude": 43.2, "longitude": 42.3, "height": 3100},
+            "level": {"summer": "1Б"},
+            "images": [{"image": f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}",
+                        "title": "Вершина"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('submit-data-list'), data=json.dumps(data),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        pk = response.json()['id']
+
+        # Другой клиент читает реплику, где записи еще нет
+        self.assertEqual(self.detail_title(APIClient(), pk), 404)
+        self.assertEqual(self.detail_title(self.client, pk), "Новый")
+        self.assertEqual(self.detail_title(self.client, self.pereval.pk), "Основная")
+
+        cache.clear()
+        self.client.cookies[STICKY_COOKIE] = f"{time.time() - 1:.3f}"
+        self.assertEqual(self.detail_title(self.client, self.pereval.pk), "Реплика")
+
+    def test_detail_cache_after_write(self):
+        """Привязанный к основной базе клиент не читает кэш; недавно измененный перевал не кэшируется с реплики"""
+        pk = self.pereval.pk
+        reader = APIClient()
+        self.assertEqual(self.detail_title(reader, pk), "Реплика")
+        self.assertIsNotNone(detail_cache.cache.get(detail_cache.key(pk)))
+
+        # Запись: клиент получает cookie, перевал - метку недавнего изменения
+        with self.captureOnCommitCallbacks(execute=True):
+            detail_cache.invalidate(pk)
+        self.client.cookies[STICKY_COOKIE] = f"{time.time() + 10:.3f}"
+        self.assertEqual(self.detail_title(reader, pk), "Реплика")
+        self.assertIsNone(detail_cache.cache.get(detail_cache.key(pk)))
+
+        # Старая версия в кэше (например, положенная до записи) не видна писавшему клиенту
+        stale = Pereval.objects.using(REPLICA).filter(pk=pk).values_list(*PEREVAL_FIELDS).get()
+        detail_cache.cache.set(detail_cache.key(pk), (stale, []))
+        self.assertEqual(self.detail_title(self.client, pk), "Основная")
+        response = self.client.get(reverse('async-submit-data-detail', args=[pk]))
+        self.assertEqual(response.json()['data']['title'], "Основная")
+        # Ответ из основной базы обновил кэш
+        self.assertEqual(self.detail_title(reader, pk), "Основная")
+
+    def test_failed_write_does_not_stick(self):
+        """Ошибка валидации не привязывает клиента к основной базе"""
+        response = self.client.post(reverse('submit-data-list'), data={}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class ListHandler(logging.Handler):
+    """Обработчик, собирающий записи в список; поток, в котором они обработаны, - в threads"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+        self.threads.add(threading.get_ident())
+
+
+class LoggingTests(SimpleTestCase):
+    """Тесты очереди логов, JSON-формата и ограничения частоты ошибок"""
+
+    def record(self, msg, *args, level=logging.ERROR, **extra):
+        record = logging.LogRecord('pereval_app.views', level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter(self):
+        """Одна строка JSON: сообщение собирается из аргументов, extra и исключение - отдельными полями"""
+        try:
+            raise ValueError("плохие данные")
+        except ValueError:
+            record = logging.LogRecord('pereval_app.views', logging.ERROR, __file__, 7, "Ошибка %s", (42,),
+                                       sys.exc_info())
+        record.pereval_id = 42
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual((entry['level'], entry['logger'], entry['line']), ('ERROR', 'pereval_app.views', 7))
+        self.assertEqual((entry['message'], entry['pereval_id']), ("Ошибка 42", 42))
+        self.assertIn("ValueError: плохие данные", entry['exception'])
+
+    def test_rate_limit(self):
+        """Не больше rate ошибок на шаблон за окно; первая запись нового окна знает число отброшенных"""
+        limit = RateLimitFilter(rate=2, period=60)
+        with mock.patch('pereval_project.logs.time.monotonic', return_value=100.0):
+            passed = [limit.filter(self.record("Validation errors: %s", i)) for i in range(5)]
+            self.assertTrue(limit.filter(self.record("Other error: %s", 1)))
+            self.assertTrue(limit.filter(self.record("Validation errors: %s", 0, level=logging.INFO)))
+        self.assertEqual(passed, [True, True, False, False, False])
+        record = self.record("Validation errors: %s", 5)
+        with mock.patch('pereval_project.logs.time.monotonic', return_value=160.0):
+            self.assertTrue(limit.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_queue_handler(self):
+        """Запись уходит в поток слушателя; форматирование - там же, переполненная очередь не блокирует"""
+        target = ListHandler()
+        target.set_name('test_list')
+        self.addCleanup(target.close)
+        with self.assertRaises(ValueError):
+            QueueHandler(['test_missing'])
+        handler = QueueHandler(['test_list'], maxsize=2)
+        logger = logging.getLogger('pereval_app.tests.queue')
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        logger.error("Validation errors: %s", {'title': ['Обязательное поле.']})
+        handler.stop()
+        self.assertEqual(target.records, ["Validation errors: {'title': ['Обязательное поле.']}"])
+        self.assertNotIn(threading.get_ident(), target.threads)
+
+        # Слушатель не запущен: очередь на две записи заполняется, третья отбрасывается
+        with mock.patch.object(handler, 'start'):
+            handler.pid = os.getpid()
+            for i in range(3):
+                logger.error("Error %s", i)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_settings(self):
+        """Логгер приложения пишет только через очередь, файл - с ротацией и JSON"""
+        handlers = logging.getLogger('pereval_app').handlers
+        self.assertEqual([type(handler) for handler in handlers], [QueueHandler])
+        file_handler = logging._handlers['file']
+        self.assertIsInstance(file_handler, logging.handlers.RotatingFileHandler)
+        self.assertIsInstance(file_handler.formatter, JsonFormatter)
+        self.assertIn(file_handler, handlers[0].targets)
+
+
+class MetricsTests(TempMediaMixin, APITestCase):
+    """Тесты Server-Timing и GET /metrics"""
+
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        self.user = User.objects.create(email="metrics@example.com", fam="Метрики", name="Тест", phone="+79990006666")
+        self.pereval = Pereval.objects.create(
+            beauty_title="пер.", title="Замер", user=self.user, level=Level.objects.create(summer="1А"),
+            coords=Coords.objects.create(latitude=43.1, longitude=42.2, height=3000)
+        )
+
+    def submit(self):
+        buffer = BytesIO()
+        PILImage.new('RGB', (12, 12), color='red').save(buffer, format='PNG')
+        data = {
+            "beauty_title": "пер.", "title": "Новый",
+            "user": {"email": "metrics-new@example.com", "fam": "Новый", "name": "Турист", "phone": "+79990007777"},
+            "coords": {"latitude": 43.2, "longitude": 42.3, "height": 3100},
+            "level": {"summer": "1Б"},
+            "images": [{"image": f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}",
+                        "title": "Вершина"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('submit-data-list'), data=json.dumps(data),
+                                    content_type='application/json')
+
+    def test_disabled(self):
+        """Без PEREVAL_METRICS нет ни заголовка, ни /metrics, phase() - пустой контекст"""
+        response = self.client.get(reverse('submit-data-detail', args=[self.pereval.pk]))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.assertIs(phase('decode'), phase('render'))
+
+    @override_settings(PEREVAL_METRICS=True)
+    def test_server_timing(self):
+        """POST с изображением: фазы декодирования, Pillow, записи файла, SQL, разбора и рендеринга"""
+        response = self.submit()
+        self.assertEqual(response.status_code, 200)
+        entries = {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+        self.assertTrue({'parse', 'decode', 'pillow', 'storage', 'db', 'render', 'total'} <= set(entries))
+        self.assertRegex(entries['db'], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+
+        response = self.client.get(reverse('async-submit-data-detail', args=[self.pereval.pk]))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(PEREVAL_METRICS=True)
+    def test_metrics_endpoint(self):
+        """/metrics - гистограммы по имени маршрута в формате Prometheus"""
+        self.submit()
+        self.client.get(reverse('submit-data-detail', args=[self.pereval.pk]))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE pereval_http_request_duration_seconds histogram', body)
+        self.assertIn('pereval_http_request_duration_seconds_count'
+                      '{method="POST",view="submit-data-list",status="200"} 1', body)
+        self.assertIn('pereval_phase_duration_seconds_count{view="submit-data-list",phase="decode"} 1', body)
+        self.assertIn('pereval_sql_queries_count{view="submit-data-detail"} 1', body)
+        self.assertIn('pereval_http_request_size_bytes_count{view="submit-data-list"} 1', body)
+
+    @override_settings(PEREVAL_METRICS=True, PEREVAL_METRICS_TOKEN='s3cret')
+    def test_token(self):
+        """С FSTR_METRICS_TOKEN /metrics требует Bearer-токен"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_histogram(self):
+        """Корзины накопительные, граница le включает значение"""
+        histogram = Histogram('test_seconds', 'Тест', ('view',), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, 'a')
+        self.assertEqual(list(histogram.samples()), [
+            'test_seconds_bucket{view="a",le="0.1"} 2',
+            'test_seconds_bucket{view="a",le="1"} 3',
+            'test_seconds_bucket{view="a",le="+Inf"} 4',
+            'test_seconds_sum{view="a"} 3.65',
+            'test_seconds_count{view="a"} 4',
+        ])
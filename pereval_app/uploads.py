@@ -0,0 +1,87 @@
+"""
+Изображения, загруженные отдельно от JSON перевала.
+
+POST /uploads/ сохраняет файл в хранилище потоково (через upload handlers
+Django) и возвращает token. В images[].image клиент передает этот token
+вместо base64-строки. При создании Image загрузка "забирается": строка
+ImageUpload удаляется, а уже сохраненный файл становится файлом Image.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ImageUpload
+
+# Время жизни неиспользованной загрузки и максимальный размер файла
+DEFAULT_UPLOAD_TTL = 24 * 60 * 60
+DEFAULT_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+
+
+class UploadClaimError(ValueError):
+    """Загрузка уже использована или удалена"""
+
+
+class UploadRef(str):
+    """Имя файла загрузки в хранилище с токеном, по которому ее нужно забрать"""
+
+    def __new__(cls, name, token):
+        ref = super().__new__(cls, name)
+        ref.token = token
+        return ref
+
+
+def upload_ttl():
+    return timedelta(seconds=getattr(settings, 'PEREVAL_UPLOAD_TTL', DEFAULT_UPLOAD_TTL))
+
+
+def upload_max_size():
+    return getattr(settings, 'PEREVAL_UPLOAD_MAX_SIZE', DEFAULT_UPLOAD_MAX_SIZE)
+
+
+def active_uploads():
+    """Загрузки, которые еще можно использовать"""
+    return ImageUpload.objects.filter(created_at__gte=timezone.now() - upload_ttl())
+
+
+def resolve_uploads(tokens):
+    """{token: имя файла} действующих загрузок одним запросом"""
+    tokens = list(tokens)
+    if not tokens:
+        return {}
+    return dict(active_uploads().filter(token__in=tokens).values_list('token', 'image'))
+
+
+def upload_tokens(images):
+    """Токены загрузок (UUID) среди необработанных images[].image запроса"""
+    tokens = set()
+    for img in images if isinstance(images, list) else ():
+        value = img.get('image') if isinstance(img, dict) else None
+        if isinstance(value, str) and not value.startswith('data:image'):
+            try:
+                tokens.add(uuid.UUID(value))
+            except ValueError:
+                pass
+    return tokens
+
+
+def expired_uploads():
+    """Неиспользованные загрузки с истекшим сроком"""
+    return ImageUpload.objects.filter(created_at__lt=timezone.now() - upload_ttl())
+
+
+def claim_uploads(images_data):
+    """
+    Забирает загрузки, на которые ссылаются images_data (validated_data изображений).
+    Вызывается внутри транзакции создания Image; одна загрузка может быть
+    использована только один раз. Без токенов запросов к базе нет.
+    """
+    tokens = [img['image'].token for img in images_data if isinstance(img['image'], UploadRef)]
+    if not tokens:
+        return
+    if len(set(tokens)) != len(tokens):
+        raise UploadClaimError("Одна загрузка указана несколько раз")
+    deleted, _ = ImageUpload.objects.filter(token__in=tokens).delete()
+    if deleted != len(tokens):
+        raise UploadClaimError("Загрузка изображения уже использована")
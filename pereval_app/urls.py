@@ -1,10 +1,39 @@
 from django.urls import path
+from . import async_views
 from .views import (
     SubmitDataView,
-    PerevalDetailView
+    PerevalDetailView,
+    BulkSubmitDataView,
+    ImageUploadView,
+    CacheStatsView,
+    MetricsView,
+    NearbyPerevalsView,
+    BboxPerevalsView,
+    TileClustersView,
+    SearchPerevalsView,
+    AreaPerevalsView,
+    AreasView,
+    ActivitiesView,
+    ModerationClaimView,
+    ModerationDecisionView
 )
 
 urlpatterns = [
     path('submitData/', SubmitDataView.as_view(), name='submit-data-list'),
     path('submitData/<int:id>/', PerevalDetailView.as_view(), name='submit-data-detail'),
+    path('submitData/bulk/', BulkSubmitDataView.as_view(), name='submit-data-bulk'),
+    path('uploads/', ImageUploadView.as_view(), name='image-upload'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('perevals/nearby/', NearbyPerevalsView.as_view(), name='perevals-nearby'),
+    path('perevals/bbox/', BboxPerevalsView.as_view(), name='perevals-bbox'),
+    path('areas/', AreasView.as_view(), name='areas'),
+    path('activities/', ActivitiesView.as_view(), name='activities'),
+    path('areas/<int:id>/perevals/', AreaPerevalsView.as_view(), name='area-perevals'),
+    path('perevals/search/', SearchPerevalsView.as_view(), name='perevals-search'),
+    path('perevals/clusters/<int:zoom>/<int:x>/<int:y>/', TileClustersView.as_view(), name='perevals-clusters'),
+    path('moderation/claim/', ModerationClaimView.as_view(), name='moderation-claim'),
+    path('moderation/decide/', ModerationDecisionView.as_view(), name='moderation-decide'),
+    path('async/submitData/', async_views.submit_data, name='async-submit-data-list'),
+    path('async/submitData/<int:id>/', async_views.pereval_detail, name='async-submit-data-detail'),
 ]
\ No newline at end of file
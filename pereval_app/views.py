@@ -1,14 +1,43 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import permissions, status
 from django.db import transaction
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.core.exceptions import ObjectDoesNotExist
+import hmac
 import logging
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from .serializers import PerevalSerializer, PerevalUpdateSerializer
+from rest_framework.parsers import FileUploadParser, MultiPartParser
+from .serializers import (
+    PerevalSerializer, PerevalUpdateSerializer, ImageUploadSerializer, ModerationClaimSerializer,
+    ModerationDecisionSerializer
+)
 from .models import Pereval, User, Coords, Level, Image
+from .pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_CHUNK_SIZE, apply_cursor, paginate, parse_page_size, stream_json
+)
+from .fast_serializers import (
+    STATUS_INDEX, build_images, fetch_image_rows, iter_serialized, pereval_rows, row_position,
+    row_version, serialize_row, serialize_rows
+)
+from .conditional import (
+    detail_validators, has_conditional_headers, list_validators, not_modified, page_validators, set_validators
+)
+from .cache import detail_cache
+from .decoders import IMAGE_FORMATS_TEXT
+from .bulk import MAX_BATCH_SIZE, create_perevals, create_perevals_partial
+from .uploads import UploadClaimError, claim_uploads, upload_ttl
+from .image_sync import ImageSyncError, sync_images
+from .processing import schedule_processing
+from .geo import DEFAULT_RADIUS_KM, MAX_MAP_ZOOM, MAX_RADIUS_KM, bbox_q, nearest, parse_number, radius_bbox
+from .clusters import tile_clusters
+from .search import MIN_QUERY_LENGTH, search
+from .reference import DEFAULT_MAX_AGE, reference_data
+from .moderation import claim_batch, decide
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +58,27 @@ class SubmitDataView(APIView):
                 description="Email пользователя для фильтрации",
                 type=openapi.TYPE_STRING,
                 required=True
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description="Курсор следующей страницы (next_cursor из предыдущего ответа)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            openapi.Parameter(
+                'limit',
+                openapi.IN_QUERY,
+                description=f"Размер страницы (по умолчанию {DEFAULT_PAGE_SIZE}, максимум {MAX_PAGE_SIZE})",
+                type=openapi.TYPE_INTEGER,
+                required=False
+            ),
+            openapi.Parameter(
+                'stream',
+                openapi.IN_QUERY,
+                description="Потоковая выдача всех записей без пагинации (stream=1)",
+                type=openapi.TYPE_BOOLEAN,
+                required=False
             )
         ],
         responses={
@@ -39,6 +89,7 @@ class SubmitDataView(APIView):
                     properties={
                         'status': openapi.Schema(type=openapi.TYPE_INTEGER),
                         'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'next_cursor': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
                         'data': openapi.Schema(
                             type=openapi.TYPE_ARRAY,
                             items=openapi.Schema(
@@ -83,8 +134,11 @@ class SubmitDataView(APIView):
                                         items=openapi.Schema(
                                             type=openapi.TYPE_OBJECT,
                                             properties={
+                                                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
                                                 'image_url': openapi.Schema(type=openapi.TYPE_STRING),
                                                 'title': openapi.Schema(type=openapi.TYPE_STRING),
+                                                'thumbnail_url': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                                                'web_url': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
                                             }
                                         )
                                     )
@@ -94,8 +148,11 @@ class SubmitDataView(APIView):
                     }
                 )
             ),
+            304: openapi.Response(
+                description="Страница не изменилась (If-None-Match / If-Modified-Since)"
+            ),
             400: openapi.Response(
-                description="Не указан email",
+                description="Не указан email или некорректные параметры пагинации",
                 schema=openapi.Schema(
                     type=openapi.TYPE_OBJECT,
                     properties={
@@ -136,33 +193,56 @@ class SubmitDataView(APIView):
                     "data": []
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Ищем все перевалы с таким email пользователя
-            perevals = Pereval.objects.filter(
-                user__email=email
-            ).select_related(
-                'user', 'coords', 'level'
-            ).prefetch_related('images')
+            # Ищем все перевалы с таким email пользователя (строки с join'ами, без моделей)
+            perevals = pereval_rows(Pereval.objects.filter(user__email=email))
+
+            cursor = request.query_params.get('cursor')
+
+            try:
+                page_size = parse_page_size(request.query_params.get('limit'))
+                if request.query_params.get('stream') in ('1', 'true'):
+                    # Потоковый режим: вся выборка чанками, без пагинации
+                    return StreamingHttpResponse(
+                        stream_json(
+                            iter_serialized(apply_cursor(perevals, cursor), request, STREAM_CHUNK_SIZE)
+                        ),
+                        content_type='application/json'
+                    )
+                if has_conditional_headers(request):
+                    # Легкая проверка версий страницы без join'ов на coords/level и изображений
+                    response = not_modified(
+                        request, *page_validators(Pereval.objects.filter(user__email=email), cursor, page_size)
+                    )
+                    if response is not None:
+                        return response
+                # Один запрос за страницей (+ запрос изображений), без отдельного exists()
+                rows, next_cursor = paginate(perevals, cursor, page_size, position=row_position)
+            except ValueError as e:
+                return Response({
+                    "status": 400,
+                    "message": str(e),
+                    "data": []
+                }, status=status.HTTP_400_BAD_REQUEST)
 
-            if not perevals.exists():
+            if not rows and not cursor:
                 return Response({
                     "status": 200,
                     "message": f"Для пользователя с email {email} перевалы не найдены",
-                    "data": []
+                    "data": [],
+                    "next_cursor": None
                 }, status=status.HTTP_200_OK)
 
-            result = []
-            for pereval in perevals:
-                pereval_data = self._serialize_pereval(pereval, request)
-                result.append(pereval_data)
+            result = serialize_rows(rows, request)
 
-            return Response({
+            return set_validators(Response({
                 "status": 200,
                 "message": f"Найдено {len(result)} перевалов",
-                "data": result
-            }, status=status.HTTP_200_OK)
+                "data": result,
+                "next_cursor": next_cursor
+            }, status=status.HTTP_200_OK), *list_validators([row_version(row) for row in rows], next_cursor))
 
         except Exception as e:
-            logger.error(f"Error getting perevals by email: {e}")
+            logger.error("Error getting perevals by email: %s", e)
             return Response({
                 "status": 500,
                 "message": "Internal server error",
@@ -214,7 +294,7 @@ class SubmitDataView(APIView):
             serializer = PerevalSerializer(data=request.data)
 
             if not serializer.is_valid():
-                logger.error(f"Validation errors: {serializer.errors}")
+                logger.error("Validation errors: %s", serializer.errors)
                 return Response({
                     "status": 400,
                     "message": "Bad Request",
@@ -243,8 +323,9 @@ class SubmitDataView(APIView):
                 level_data = serializer.validated_data.pop('level')
                 level = Level.objects.create(**level_data)
 
-                # Обрабатываем изображения
+                # Обрабатываем изображения (загруженные отдельно забираем по токенам)
                 images_data = serializer.validated_data.pop('images')
+                claim_uploads(images_data)
 
                 # Создаем перевал
                 pereval = Pereval.objects.create(
@@ -255,9 +336,10 @@ class SubmitDataView(APIView):
                     status='new'
                 )
 
-                # Создаем изображения
-                for img_data in images_data:
-                    Image.objects.create(pereval=pereval, **img_data)
+                # Изображения - одним INSERT: сигналы post_save не нужны, updated_at перевала
+                # уже выставлен при его создании, обработка ставится в очередь явно
+                images = Image.objects.bulk_create([Image(pereval=pereval, **img_data) for img_data in images_data])
+                schedule_processing(image.pk for image in images if image.image)
 
             return Response({
                 "status": 200,
@@ -265,56 +347,20 @@ class SubmitDataView(APIView):
                 "id": pereval.id
             }, status=status.HTTP_200_OK)
 
+        except UploadClaimError as e:
+            return Response({
+                "status": 400,
+                "message": str(e),
+                "id": None
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
+            logger.error("Unexpected error: %s", e)
             return Response({
                 "status": 500,
                 "message": "Internal server error",
                 "id": None
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def _serialize_pereval(self, pereval, request):
-        """Сериализация объекта перевала"""
-        # Получаем полный URL для изображений
-        images_data = []
-        for img in pereval.images.all():
-            if img.image:
-                # Формируем полный URL до изображения
-                image_url = request.build_absolute_uri(img.image.url) if img.image else None
-                images_data.append({
-                    "image_url": image_url,
-                    "title": img.title
-                })
-
-        return {
-            "id": pereval.id,
-            "beauty_title": pereval.beauty_title,
-            "title": pereval.title,
-            "other_titles": pereval.other_titles,
-            "connect": pereval.connect,
-            "add_time": pereval.add_time,
-            "status": pereval.status,
-            "user": {
-                "email": pereval.user.email,
-                "fam": pereval.user.fam,
-                "name": pereval.user.name,
-                "otc": pereval.user.otc,
-                "phone": pereval.user.phone
-            },
-            "coords": {
-                "latitude": float(pereval.coords.latitude),
-                "longitude": float(pereval.coords.longitude),
-                "height": pereval.coords.height
-            },
-            "level": {
-                "winter": pereval.level.winter,
-                "summer": pereval.level.summer,
-                "autumn": pereval.level.autumn,
-                "spring": pereval.level.spring
-            },
-            "images": images_data
-        }
-
 
 class PerevalDetailView(APIView):
     """
@@ -375,8 +421,11 @@ class PerevalDetailView(APIView):
                                     items=openapi.Schema(
                                         type=openapi.TYPE_OBJECT,
                                         properties={
+                                            'id': openapi.Schema(type=openapi.TYPE_INTEGER),
                                             'image_url': openapi.Schema(type=openapi.TYPE_STRING),
                                             'title': openapi.Schema(type=openapi.TYPE_STRING),
+                                            'thumbnail_url': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                                            'web_url': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
                                         }
                                     )
                                 )
@@ -385,6 +434,9 @@ class PerevalDetailView(APIView):
                     }
                 )
             ),
+            304: openapi.Response(
+                description="Перевал не изменился (If-None-Match / If-Modified-Since)"
+            ),
             404: openapi.Response(
                 description="Перевал не найден",
                 schema=openapi.Schema(
@@ -412,65 +464,44 @@ class PerevalDetailView(APIView):
     def get(self, request, id):
         """GET метод - получение перевала по ID"""
         try:
-            try:
-                pereval = Pereval.objects.select_related(
-                    'user', 'coords', 'level'
-                ).prefetch_related('images').get(id=id)
-            except Pereval.DoesNotExist:
-                return Response({
-                    "status": 404,
-                    "message": f"Перевал с ID {id} не найден",
-                    "id": None
-                }, status=status.HTTP_404_NOT_FOUND)
+            cached = detail_cache.get(id)
+            if cached is None and has_conditional_headers(request):
+                # Легкая проверка версии без join'ов и изображений
+                updated_at = Pereval.objects.filter(id=id).values_list('updated_at', flat=True).first()
+                if updated_at is not None:
+                    response = not_modified(request, *detail_validators(id, updated_at))
+                    if response is not None:
+                        return response
 
-            # Сериализуем данные
-            images_data = []
-            for img in pereval.images.all():
-                if img.image:
-                    # Формируем полный URL до изображения
-                    image_url = request.build_absolute_uri(img.image.url) if img.image else None
-                    images_data.append({
-                        "image_url": image_url,
-                        "title": img.title
-                    })
-
-            pereval_data = {
-                "id": pereval.id,
-                "beauty_title": pereval.beauty_title,
-                "title": pereval.title,
-                "other_titles": pereval.other_titles,
-                "connect": pereval.connect,
-                "add_time": pereval.add_time,
-                "status": pereval.status,
-                "user": {
-                    "email": pereval.user.email,
-                    "fam": pereval.user.fam,
-                    "name": pereval.user.name,
-                    "otc": pereval.user.otc,
-                    "phone": pereval.user.phone
-                },
-                "coords": {
-                    "latitude": float(pereval.coords.latitude),
-                    "longitude": float(pereval.coords.longitude),
-                    "height": pereval.coords.height
-                },
-                "level": {
-                    "winter": pereval.level.winter,
-                    "summer": pereval.level.summer,
-                    "autumn": pereval.level.autumn,
-                    "spring": pereval.level.spring
-                },
-                "images": images_data
-            }
+            if cached is None:
+                rows = list(pereval_rows(Pereval.objects.filter(id=id)))
+                if not rows:
+                    return Response({
+                        "status": 404,
+                        "message": f"Перевал с ID {id} не найден",
+                        "id": None
+                    }, status=status.HTTP_404_NOT_FOUND)
+                row = rows[0]
+                image_rows = fetch_image_rows([id]).get(id, [])
+                detail_cache.set(id, row[STATUS_INDEX], row, image_rows)
+            else:
+                row, image_rows = cached
 
-            return Response({
+            validators = detail_validators(*row_version(row))
+            response = not_modified(request, *validators)
+            if response is not None:
+                return response
+
+            pereval_data = serialize_row(row, build_images({id: image_rows}, request))
+
+            return set_validators(Response({
                 "status": 200,
                 "message": "Найдено",
                 "data": pereval_data
-            }, status=status.HTTP_200_OK)
+            }, status=status.HTTP_200_OK), *validators)
 
         except Exception as e:
-            logger.error(f"Error getting pereval {id}: {e}")
+            logger.error("Error getting pereval %s: %s", id, e)
             return Response({
                 "status": 500,
                 "message": "Internal server error",
@@ -528,7 +559,8 @@ class PerevalDetailView(APIView):
         try:
             # Проверяем существование перевала
             try:
-                pereval = Pereval.objects.get(id=id)
+                # coords и level подтягиваются сразу, чтобы не было ленивых запросов при обновлении
+                pereval = Pereval.objects.select_related('coords', 'level').get(id=id)
             except Pereval.DoesNotExist:
                 return Response({
                     "state": 0,
@@ -546,7 +578,7 @@ class PerevalDetailView(APIView):
             serializer = PerevalUpdateSerializer(data=request.data, partial=True)
 
             if not serializer.is_valid():
-                logger.error(f"Validation errors: {serializer.errors}")
+                logger.error("Validation errors: %s", serializer.errors)
                 return Response({
                     "state": 0,
                     "message": f"Ошибка валидации"
@@ -576,6 +608,7 @@ class PerevalDetailView(APIView):
                     coords_data = serializer.validated_data.pop('coords')
                     for key, value in coords_data.items():
                         setattr(pereval.coords, key, value)
+                    pereval.coords._saved_with_pereval = True
                     pereval.coords.save()
 
                 # Обновляем уровень сложности
@@ -583,18 +616,15 @@ class PerevalDetailView(APIView):
                     level_data = serializer.validated_data.pop('level')
                     for key, value in level_data.items():
                         setattr(pereval.level, key, value)
+                    pereval.level._saved_with_pereval = True
                     pereval.level.save()
 
-                # Обновляем изображения
+                # Обновляем изображения по разнице: неизмененные файлы не удаляются и не пишутся заново.
+                # Версия перевала и кэш обновляются ниже через pereval.save()
                 if 'images' in serializer.validated_data:
-                    # Удаляем старые изображения (и их файлы)
-                    for img in pereval.images.all():
-                        img.delete()
-
-                    # Создаем новые изображения
                     images_data = serializer.validated_data.pop('images')
-                    for img_data in images_data:
-                        Image.objects.create(pereval=pereval, **img_data)
+                    claim_uploads([img_data for img_data in images_data if 'image' in img_data])
+                    sync_images(pereval, images_data)
 
                 # Обновляем основные поля перевала
                 for field, value in serializer.validated_data.items():
@@ -606,9 +636,926 @@ class PerevalDetailView(APIView):
                 "message": "Запись успешно обновлена"
             }, status=status.HTTP_200_OK)
 
+        except (UploadClaimError, ImageSyncError) as e:
+            return Response({
+                "state": 0,
+                "message": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Unexpected error in update: {e}")
+            logger.error("Unexpected error in update: %s", e)
             return Response({
                 "state": 0,
                 "message": f"Internal server error"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CacheStatsView(APIView):
+    """
+    API endpoint для:
+    GET /cache/stats/ - счетчики попаданий/промахов кэша перевалов (в пределах процесса, только для staff)
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Статистика кэша GET /submitData/<id>/",
+        responses={
+            200: openapi.Response(
+                description="Счетчики кэша",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'hits': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'misses': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'hit_rate': openapi.Schema(type=openapi.TYPE_NUMBER, format='float'),
+                            }
+                        )
+                    }
+                )
+            ),
+            403: openapi.Response(description="Требуется учетная запись staff")
+        }
+    )
+    def get(self, request):
+        """GET метод - счетчики кэша"""
+        return Response({
+            "status": 200,
+            "data": detail_cache.stats()
+        }, status=status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+    """
+    API endpoint для:
+    GET /metrics - метрики запросов процесса в текстовом формате Prometheus (FSTR_METRICS=1)
+    """
+
+    @swagger_auto_schema(
+        operation_description="Гистограммы времени запросов, фаз, SQL-запросов и размеров тел в формате Prometheus",
+        responses={
+            200: openapi.Response(description="Метрики в текстовом формате Prometheus"),
+            403: openapi.Response(description="Неверный токен (FSTR_METRICS_TOKEN)"),
+            404: openapi.Response(description="Метрики отключены")
+        }
+    )
+    def get(self, request):
+        """GET метод - метрики процесса"""
+        if not metrics.enabled():
+            return Response({
+                "status": 404,
+                "message": "Метрики отключены (FSTR_METRICS)",
+                "data": None
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        token = getattr(settings, 'PEREVAL_METRICS_TOKEN', '')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response({
+                "status": 403,
+                "message": "Неверный токен метрик",
+                "data": None
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+class BulkSubmitDataView(APIView):
+    """
+    API endpoint для:
+    POST /submitData/bulk/ - пакетное создание записей (например, синхронизация после похода)
+    """
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Пакетное создание перевалов. Тело запроса - массив объектов в формате POST /submitData/ "
+            f"(не более {MAX_BATCH_SIZE}). mode=atomic (по умолчанию) - все или ничего, "
+            "mode=partial - создаются все корректные записи"
+        ),
+        request_body=PerevalSerializer(many=True),
+        manual_parameters=[
+            openapi.Parameter(
+                'mode',
+                openapi.IN_QUERY,
+                description="Режим: atomic (все или ничего) или partial (частичный успех)",
+                type=openapi.TYPE_STRING,
+                enum=['atomic', 'partial'],
+                required=False
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description="Пакет обработан",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'index': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'id': openapi.Schema(type=openapi.TYPE_INTEGER, nullable=True),
+                                    'errors': openapi.Schema(type=openapi.TYPE_OBJECT),
+                                }
+                            )
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Некорректный пакет или ошибки валидации в режиме atomic",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT)
+                        )
+                    }
+                )
+            ),
+            500: openapi.Response(
+                description="Внутренняя ошибка сервера",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'results': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT)
+                        )
+                    }
+                )
+            )
+        }
+    )
+    def post(self, request):
+        """POST метод - пакетное создание перевалов"""
+        try:
+            mode = request.query_params.get('mode', 'atomic')
+            if mode not in ('atomic', 'partial'):
+                return Response({
+                    "status": 400,
+                    "message": f"Неизвестный режим: {mode}",
+                    "results": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            items = request.data
+            if not isinstance(items, list) or not items:
+                return Response({
+                    "status": 400,
+                    "message": "Ожидается непустой массив записей",
+                    "results": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if len(items) > MAX_BATCH_SIZE:
+                return Response({
+                    "status": 400,
+                    "message": f"Максимальный размер пакета - {MAX_BATCH_SIZE}",
+                    "results": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Валидируем каждую запись отдельно, чтобы вернуть ошибки по индексам
+            results = []
+            valid = []
+            for index, item in enumerate(items):
+                serializer = PerevalSerializer(data=item)
+                if serializer.is_valid():
+                    results.append({"index": index, "id": None})
+                    valid.append((index, serializer.validated_data))
+                else:
+                    results.append({"index": index, "id": None, "errors": serializer.errors})
+
+            invalid_count = len(items) - len(valid)
+            if invalid_count:
+                logger.error("Bulk validation errors in %s of %s items", invalid_count, len(items))
+                if mode == 'atomic':
+                    return Response({
+                        "status": 400,
+                        "message": "Bad Request",
+                        "results": results
+                    }, status=status.HTTP_400_BAD_REQUEST)
+
+            created = 0
+            if valid and mode == 'partial':
+                # Неверный токен загрузки - ошибка только своей записи
+                outcomes = create_perevals_partial([data for _, data in valid])
+                for (index, _), (pereval_id, error) in zip(valid, outcomes):
+                    if error:
+                        results[index]["errors"] = {"images": [error]}
+                    else:
+                        results[index]["id"] = pereval_id
+                        created += 1
+            elif valid:
+                ids = create_perevals([data for _, data in valid])
+                for (index, _), pereval_id in zip(valid, ids):
+                    results[index]["id"] = pereval_id
+                created = len(ids)
+
+            return Response({
+                "status": 200,
+                "message": f"Создано {created} из {len(items)}",
+                "results": results
+            }, status=status.HTTP_200_OK)
+
+        except UploadClaimError as e:
+            return Response({
+                "status": 400,
+                "message": str(e),
+                "results": []
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error("Unexpected error in bulk submit: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "results": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ImageUploadView(APIView):
+    """
+    API endpoint для:
+    POST /uploads/ - загрузка изображения отдельно от данных перевала, возвращает token
+    """
+    # multipart (поле image) или "сырое" тело с заголовком Content-Disposition: attachment; filename=...
+    # В обоих случаях Django пишет файл на диск частями, не держа его целиком в памяти
+    parser_classes = [MultiPartParser, FileUploadParser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Загрузка изображения. Полученный token передается в images[].image "
+            "в POST /submitData/, PATCH /submitData/<id>/ и POST /submitData/bulk/ вместо base64"
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'image',
+                openapi.IN_FORM,
+                description=f"Файл изображения ({IMAGE_FORMATS_TEXT})",
+                type=openapi.TYPE_FILE,
+                required=True
+            )
+        ],
+        consumes=['multipart/form-data'],
+        responses={
+            200: openapi.Response(
+                description="Изображение загружено",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'token': openapi.Schema(type=openapi.TYPE_STRING, format='uuid'),
+                        'size': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'expires_in': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    }
+                )
+            ),
+            400: openapi.Response(
+                description="Ошибка валидации",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'token': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                        'errors': openapi.Schema(type=openapi.TYPE_OBJECT),
+                    }
+                )
+            ),
+            500: openapi.Response(
+                description="Внутренняя ошибка сервера",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'token': openapi.Schema(type=openapi.TYPE_STRING, nullable=True),
+                    }
+                )
+            )
+        }
+    )
+    def post(self, request):
+        """POST метод - загрузка изображения"""
+        try:
+            image = request.data.get('image') or request.data.get('file')
+            serializer = ImageUploadSerializer(data={'image': image})
+
+            if not serializer.is_valid():
+                logger.error("Upload validation errors: %s", serializer.errors)
+                return Response({
+                    "status": 400,
+                    "message": "Bad Request",
+                    "token": None,
+                    "errors": serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            upload = serializer.save()
+
+            return Response({
+                "status": 200,
+                "message": "Загружено",
+                "token": str(upload.token),
+                "size": upload.size,
+                "expires_in": int(upload_ttl().total_seconds())
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Unexpected error in upload: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "token": None
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def list_response_schema():
+    """Схема ответа поиска (по координатам и полнотекстового)"""
+    return openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+            'message': openapi.Schema(type=openapi.TYPE_STRING),
+            'data': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    description="Перевал в формате GET /submitData/<id>/ "
+                                "(для nearby - с полем distance, км, для search - с полем rank)"
+                )
+            ),
+        }
+    )
+
+
+LIMIT_PARAMETER = openapi.Parameter(
+    'limit',
+    openapi.IN_QUERY,
+    description=f"Максимум записей (по умолчанию {DEFAULT_PAGE_SIZE}, максимум {MAX_PAGE_SIZE})",
+    type=openapi.TYPE_INTEGER,
+    required=False
+)
+
+
+class NearbyPerevalsView(APIView):
+    """
+    API endpoint для:
+    GET /perevals/nearby/?lat=&lon=&radius= - перевалы в радиусе (км), ближайшие первыми
+    """
+
+    @swagger_auto_schema(
+        operation_description="Перевалы в радиусе от точки, отсортированные по расстоянию",
+        manual_parameters=[
+            openapi.Parameter('lat', openapi.IN_QUERY, description="Широта центра",
+                              type=openapi.TYPE_NUMBER, required=True),
+            openapi.Parameter('lon', openapi.IN_QUERY, description="Долгота центра",
+                              type=openapi.TYPE_NUMBER, required=True),
+            openapi.Parameter('radius', openapi.IN_QUERY,
+                              description=f"Радиус, км (по умолчанию {DEFAULT_RADIUS_KM}, максимум {MAX_RADIUS_KM})",
+                              type=openapi.TYPE_NUMBER, required=False),
+            LIMIT_PARAMETER,
+        ],
+        responses={
+            200: openapi.Response(description="Успешный запрос", schema=list_response_schema()),
+            400: openapi.Response(description="Некорректные параметры", schema=list_response_schema()),
+        }
+    )
+    def get(self, request):
+        """GET метод - поиск перевалов рядом с точкой"""
+        try:
+            try:
+                latitude = parse_number(request.query_params, 'lat', -90, 90)
+                longitude = parse_number(request.query_params, 'lon', -180, 180)
+                radius = parse_number(request.query_params, 'radius', 0, MAX_RADIUS_KM, default=DEFAULT_RADIUS_KM)
+                limit = parse_page_size(request.query_params.get('limit'))
+            except ValueError as e:
+                return Response({
+                    "status": 400,
+                    "message": str(e),
+                    "data": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Кандидаты по индексу tile и bbox круга, точное расстояние - по гаверсинусам
+            candidates = Pereval.objects.filter(
+                bbox_q(*radius_bbox(latitude, longitude, radius), prefix='coords__')
+            ).order_by().values_list('id', 'coords__latitude', 'coords__longitude')
+            found = nearest(candidates, latitude, longitude, radius, limit)
+
+            rows = {row[0]: row for row in pereval_rows(Pereval.objects.filter(id__in=[pk for pk, _ in found]))}
+            result = serialize_rows([rows[pk] for pk, _ in found if pk in rows], request)
+            distances = dict(found)
+            for item in result:
+                item["distance"] = round(distances[item["id"]], 3)
+
+            return Response({
+                "status": 200,
+                "message": f"Найдено {len(result)} перевалов",
+                "data": result
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error in nearby search: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BboxPerevalsView(APIView):
+    """
+    API endpoint для:
+    GET /perevals/bbox/?south=&west=&north=&east= - перевалы в прямоугольнике
+    """
+
+    @swagger_auto_schema(
+        operation_description="Перевалы в прямоугольнике координат (west > east - через 180-й меридиан)",
+        manual_parameters=[
+            openapi.Parameter('south', openapi.IN_QUERY, description="Южная граница (широта)",
+                              type=openapi.TYPE_NUMBER, required=True),
+            openapi.Parameter('west', openapi.IN_QUERY, description="Западная граница (долгота)",
+                              type=openapi.TYPE_NUMBER, required=True),
+            openapi.Parameter('north', openapi.IN_QUERY, description="Северная граница (широта)",
+                              type=openapi.TYPE_NUMBER, required=True),
+            openapi.Parameter('east', openapi.IN_QUERY, description="Восточная граница (долгота)",
+                              type=openapi.TYPE_NUMBER, required=True),
+            LIMIT_PARAMETER,
+        ],
+        responses={
+            200: openapi.Response(description="Успешный запрос", schema=list_response_schema()),
+            400: openapi.Response(description="Некорректные параметры", schema=list_response_schema()),
+        }
+    )
+    def get(self, request):
+        """GET метод - поиск перевалов в прямоугольнике"""
+        try:
+            try:
+                south = parse_number(request.query_params, 'south', -90, 90)
+                west = parse_number(request.query_params, 'west', -180, 180)
+                north = parse_number(request.query_params, 'north', -90, 90)
+                east = parse_number(request.query_params, 'east', -180, 180)
+                limit = parse_page_size(request.query_params.get('limit'))
+                if south > north:
+                    raise ValueError("south должен быть не больше north")
+            except ValueError as e:
+                return Response({
+                    "status": 400,
+                    "message": str(e),
+                    "data": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            rows = list(pereval_rows(
+                Pereval.objects.filter(bbox_q(south, west, north, east, prefix='coords__'))
+            )[:limit])
+            result = serialize_rows(rows, request)
+
+            return Response({
+                "status": 200,
+                "message": f"Найдено {len(result)} перевалов",
+                "data": result
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error in bbox search: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TileClustersView(APIView):
+    """
+    API endpoint для:
+    GET /perevals/clusters/<zoom>/<x>/<y>/ - кластеры перевалов тайла карты
+    """
+
+    @swagger_auto_schema(
+        operation_description="Кластеры перевалов тайла карты zoom/x/y (Web Mercator): количество и центроиды",
+        responses={
+            200: openapi.Response(
+                description="Кластеры тайла",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'zoom': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'x': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'y': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'clusters': openapi.Schema(
+                                    type=openapi.TYPE_ARRAY,
+                                    items=openapi.Schema(
+                                        type=openapi.TYPE_OBJECT,
+                                        properties={
+                                            'latitude': openapi.Schema(type=openapi.TYPE_NUMBER),
+                                            'longitude': openapi.Schema(type=openapi.TYPE_NUMBER),
+                                            'height': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                        }
+                                    )
+                                )
+                            }
+                        )
+                    }
+                )
+            ),
+            400: openapi.Response(description="Некорректный тайл")
+        }
+    )
+    def get(self, request, zoom, x, y):
+        """GET метод - кластеры тайла"""
+        try:
+            if zoom > MAX_MAP_ZOOM or x >= 2 ** zoom or y >= 2 ** zoom:
+                return Response({
+                    "status": 400,
+                    "message": f"Некорректный тайл {zoom}/{x}/{y} (масштаб 0..{MAX_MAP_ZOOM})",
+                    "data": None
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({
+                "status": 200,
+                "message": "Найдено",
+                "data": tile_clusters(zoom, x, y)
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error clustering tile %s/%s/%s: %s", zoom, x, y, e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": None
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SearchPerevalsView(APIView):
+    """
+    API endpoint для:
+    GET /perevals/search/?q=<запрос> - полнотекстовый поиск по названиям перевалов
+    """
+
+    @swagger_auto_schema(
+        operation_description="Поиск по title, beauty_title, other_titles и connect с учетом морфологии, "
+                              "самые релевантные первыми",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description=f"Поисковый запрос (от {MIN_QUERY_LENGTH} символов)",
+                              type=openapi.TYPE_STRING, required=True),
+            LIMIT_PARAMETER,
+        ],
+        responses={
+            200: openapi.Response(description="Успешный запрос", schema=list_response_schema()),
+            400: openapi.Response(description="Некорректные параметры", schema=list_response_schema()),
+        }
+    )
+    def get(self, request):
+        """GET метод - полнотекстовый поиск"""
+        try:
+            query = request.query_params.get('q', '').strip()
+            try:
+                if len(query) < MIN_QUERY_LENGTH:
+                    raise ValueError(f"Запрос должен содержать не менее {MIN_QUERY_LENGTH} символов")
+                limit = parse_page_size(request.query_params.get('limit'))
+            except ValueError as e:
+                return Response({
+                    "status": 400,
+                    "message": str(e),
+                    "data": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            found = search(query, limit)
+            rows = {row[0]: row for row in pereval_rows(Pereval.objects.filter(id__in=[pk for pk, _ in found]))}
+            result = serialize_rows([rows[pk] for pk, _ in found if pk in rows], request)
+            ranks = dict(found)
+            for item in result:
+                item["rank"] = round(float(ranks[item["id"]]), 6)
+
+            return Response({
+                "status": 200,
+                "message": f"Найдено {len(result)} перевалов",
+                "data": result
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error in search: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AreaPerevalsView(APIView):
+    """
+    API endpoint для:
+    GET /areas/<id>/perevals/ - перевалы региона и всех его подрегионов
+    """
+
+    @swagger_auto_schema(
+        operation_description="Перевалы региона и его подрегионов (дерево регионов берется из снимка справочников)",
+        manual_parameters=[
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description="Курсор следующей страницы (next_cursor из предыдущего ответа)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            LIMIT_PARAMETER,
+        ],
+        responses={
+            200: openapi.Response(
+                description="Успешный запрос",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'area': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'title': openapi.Schema(type=openapi.TYPE_STRING),
+                                'path': openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                       items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                                'subareas': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            }
+                        ),
+                        'data': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                        'next_cursor': openapi.Schema(type=openapi.TYPE_STRING, x_nullable=True),
+                    }
+                )
+            ),
+            404: openapi.Response(description="Регион не найден")
+        }
+    )
+    def get(self, request, id):
+        """GET метод - перевалы поддерева региона"""
+        try:
+            tree = reference_data.get().regions
+            if id not in tree:
+                return Response({
+                    "status": 404,
+                    "message": f"Регион с ID {id} не найден",
+                    "data": []
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            # Поддерево - срез nested set, в базу уходит один запрос area_id IN (...)
+            area_ids = tree.subtree(id)
+            try:
+                page_size = parse_page_size(request.query_params.get('limit'))
+                rows, next_cursor = paginate(
+                    pereval_rows(Pereval.objects.filter(area_id__in=area_ids)),
+                    request.query_params.get('cursor'), page_size, position=row_position
+                )
+            except ValueError as e:
+                return Response({
+                    "status": 400,
+                    "message": str(e),
+                    "data": []
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            result = serialize_rows(rows, request)
+            return Response({
+                "status": 200,
+                "message": f"Найдено {len(result)} перевалов",
+                "area": {
+                    "id": id,
+                    "title": tree.titles[id],
+                    "path": [{"id": pk, "title": tree.titles[pk]} for pk in tree.ancestors(id)],
+                    "subareas": len(area_ids) - 1
+                },
+                "data": result,
+                "next_cursor": next_cursor
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error getting perevals of area %s: %s", id, e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def reference_response_schema(item_properties):
+    """Схема ответа справочника"""
+    return openapi.Response(
+        description="Справочник (заголовки ETag и Cache-Control)",
+        schema=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'message': openapi.Schema(type=openapi.TYPE_STRING),
+                'version': openapi.Schema(type=openapi.TYPE_STRING),
+                'data': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_OBJECT, properties=item_properties)
+                ),
+            }
+        )
+    )
+
+
+class ReferenceDataView(APIView):
+    """
+    Базовый класс справочника из снимка процесса: ответ без обращения к базе,
+    ETag - хэш версии снимка, Cache-Control - долгое хранение у клиента.
+    """
+
+    attribute = None
+    label = None
+
+    def get(self, request):
+        try:
+            snapshot = reference_data.get()
+            max_age = getattr(settings, 'PEREVAL_REFERENCE_MAX_AGE', DEFAULT_MAX_AGE)
+            response = not_modified(request, snapshot.etag, None)
+            if response is None:
+                data = getattr(snapshot, self.attribute)
+                response = Response({
+                    "status": 200,
+                    "message": f"{self.label}: {len(data)}",
+                    "version": snapshot.version,
+                    "data": data
+                }, status=status.HTTP_200_OK)
+            response['Cache-Control'] = f"public, max-age={max_age}"
+            return set_validators(response, snapshot.etag, None)
+
+        except Exception as e:
+            logger.error("Error getting reference data %s: %s", self.attribute, e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AreasView(ReferenceDataView):
+    """
+    API endpoint для:
+    GET /areas/ - справочник регионов
+    """
+
+    attribute = 'areas'
+    label = "Регионов"
+
+    @swagger_auto_schema(
+        operation_description="Справочник регионов (id, id_parent, title) из снимка процесса",
+        responses={
+            200: reference_response_schema({
+                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'id_parent': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'title': openapi.Schema(type=openapi.TYPE_STRING),
+            }),
+            304: openapi.Response(description="Справочник не изменился (If-None-Match)")
+        }
+    )
+    def get(self, request):
+        """GET метод - справочник регионов"""
+        return super().get(request)
+
+
+class ActivitiesView(ReferenceDataView):
+    """
+    API endpoint для:
+    GET /activities/ - справочник видов активностей
+    """
+
+    attribute = 'activities'
+    label = "Видов активностей"
+
+    @swagger_auto_schema(
+        operation_description="Справочник видов активностей (id, title) из снимка процесса",
+        responses={
+            200: reference_response_schema({
+                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'title': openapi.Schema(type=openapi.TYPE_STRING),
+            }),
+            304: openapi.Response(description="Справочник не изменился (If-None-Match)")
+        }
+    )
+    def get(self, request):
+        """GET метод - справочник видов активностей"""
+        return super().get(request)
+
+
+class ModerationClaimView(APIView):
+    """
+    API endpoint для:
+    POST /moderation/claim/ - взять в работу пакет новых перевалов (только для staff)
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Берет в работу самые старые перевалы со статусом new (SELECT ... FOR UPDATE SKIP LOCKED) "
+            "и переводит их в pending. Параллельные модераторы получают разные записи"
+        ),
+        request_body=ModerationClaimSerializer,
+        responses={
+            200: list_response_schema(),
+            400: openapi.Response(description="Ошибка валидации"),
+            403: openapi.Response(description="Нет прав модератора")
+        }
+    )
+    def post(self, request):
+        """POST метод - взять пакет перевалов в работу"""
+        serializer = ModerationClaimSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "status": 400,
+                "message": "Bad Request",
+                "data": [],
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ids = claim_batch(request.user.get_username(), serializer.validated_data['limit'])
+            result = serialize_rows(pereval_rows(Pereval.objects.filter(id__in=ids)), request) if ids else []
+            return Response({
+                "status": 200,
+                "message": f"Взято в работу: {len(result)}",
+                "data": result
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error claiming perevals for moderation: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "data": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ModerationDecisionView(APIView):
+    """
+    API endpoint для:
+    POST /moderation/decide/ - принять, отклонить или вернуть в очередь взятые перевалы (только для staff)
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Назначает статус accepted, rejected или new (вернуть в очередь) перевалам из ids, "
+            "взятым в работу текущим модератором. Остальные id пропускаются"
+        ),
+        request_body=ModerationDecisionSerializer,
+        responses={
+            200: openapi.Response(
+                description="Решение применено",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'updated': openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                  items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                        'skipped': openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                  items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                    }
+                )
+            ),
+            400: openapi.Response(description="Ошибка валидации"),
+            403: openapi.Response(description="Нет прав модератора")
+        }
+    )
+    def post(self, request):
+        """POST метод - решение по взятым перевалам"""
+        serializer = ModerationDecisionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "status": 400,
+                "message": "Bad Request",
+                "updated": [],
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ids = serializer.validated_data['ids']
+            updated = decide(request.user.get_username(), ids, serializer.validated_data['status'])
+            updated_set = set(updated)
+            return Response({
+                "status": 200,
+                "message": f"Обновлено {len(updated)} из {len(ids)}",
+                "updated": updated,
+                "skipped": [pk for pk in ids if pk not in updated_set]
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("Error applying moderation decision: %s", e)
+            return Response({
+                "status": 500,
+                "message": "Internal server error",
+                "updated": []
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pereval_project.settings')
+# Настройки соединений с базой для ASGI (database.connection_settings)
+os.environ['FSTR_ASGI'] = '1'
 
 application = get_asgi_application()
+
+# Снимок справочников строится до первого запроса
+from pereval_app.reference import reference_data  # noqa: E402
+
+reference_data.preload()
@@ -0,0 +1,87 @@
+"""
+Настройки соединений с базой из переменных окружения FSTR_DB_*.
+
+По умолчанию соединения постоянные: CONN_MAX_AGE секунд соединение
+переиспользуется между запросами, а CONN_HEALTH_CHECKS проверяет его перед
+первым запросом в новом HTTP-запросе, чтобы разорванное соединение не
+приводило к ошибке.
+
+FSTR_DB_POOL=1 включает пул соединений psycopg 3 (psycopg[pool]). Пул
+нужен под ASGI: там каждый запрос выполняется в своем потоке, и постоянные
+соединения по одному на поток копятся. Поэтому под ASGI (asgi.py выставляет
+FSTR_ASGI=1) CONN_MAX_AGE по умолчанию 0, а ненулевое значение - ошибка
+конфигурации; с пулом CONN_MAX_AGE всегда 0 - соединение возвращается в пул
+после каждого запроса.
+
+FSTR_DB_REPLICA_HOST (несколько хостов - через запятую) добавляет реплики
+для чтения replica_1, replica_2, ...; остальные параметры реплик
+(FSTR_DB_REPLICA_PORT, _NAME, _LOGIN, _PASS) по умолчанию как у основной
+базы. Чтение с реплик выбирает pereval_app.routers.ReplicaRouter.
+"""
+import importlib.util
+
+from django.core.exceptions import ImproperlyConfigured
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def env_flag(env, name, default):
+    return env.get(name, default).strip().lower() in TRUE_VALUES
+
+
+def env_int(env, name, default):
+    value = env.get(name, default)
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f"{name} должно быть целым числом, получено {value!r}")
+
+
+def connection_settings(env):
+    """CONN_MAX_AGE, CONN_HEALTH_CHECKS и OPTIONS для DATABASES['default']"""
+    if env_flag(env, 'FSTR_DB_POOL', '0'):
+        if importlib.util.find_spec('psycopg_pool') is None:
+            raise ImproperlyConfigured('FSTR_DB_POOL=1 требует psycopg 3 с пулом: pip install "psycopg[pool]"')
+        return {
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': env_int(env, 'FSTR_DB_POOL_MIN_SIZE', '2'),
+                    'max_size': env_int(env, 'FSTR_DB_POOL_MAX_SIZE', '10'),
+                    # Сколько секунд ждать свободное соединение, прежде чем вернуть ошибку
+                    'timeout': env_int(env, 'FSTR_DB_POOL_TIMEOUT', '10'),
+                },
+            },
+        }
+    asgi = env_flag(env, 'FSTR_ASGI', '0')
+    # 0 - новое соединение на каждый запрос
+    max_age = env_int(env, 'FSTR_DB_CONN_MAX_AGE', '0' if asgi else '60')
+    if asgi and max_age:
+        raise ImproperlyConfigured(
+            'Под ASGI FSTR_DB_CONN_MAX_AGE должно быть 0: постоянные соединения копятся по одному на поток; '
+            'для переиспользования соединений включите FSTR_DB_POOL=1'
+        )
+    return {
+        'CONN_MAX_AGE': max_age,
+        'CONN_HEALTH_CHECKS': env_flag(env, 'FSTR_DB_CONN_HEALTH_CHECKS', '1'),
+        'OPTIONS': {},
+    }
+
+
+def replica_databases(primary, env):
+    """{алиас: настройки} реплик для DATABASES; пустой словарь без FSTR_DB_REPLICA_HOST"""
+    hosts = [host.strip() for host in env.get('FSTR_DB_REPLICA_HOST', '').split(',') if host.strip()]
+    return {
+        f'replica_{number}': {
+            **primary,
+            'HOST': host,
+            'PORT': env.get('FSTR_DB_REPLICA_PORT', primary.get('PORT', '')),
+            'NAME': env.get('FSTR_DB_REPLICA_NAME', primary.get('NAME', '')),
+            'USER': env.get('FSTR_DB_REPLICA_LOGIN', primary.get('USER', '')),
+            'PASSWORD': env.get('FSTR_DB_REPLICA_PASS', primary.get('PASSWORD', '')),
+            # В тестах реплика - та же тестовая база
+            'TEST': {'MIRROR': 'default'},
+        }
+        for number, host in enumerate(hosts, 1)
+    }
@@ -0,0 +1,147 @@
+"""
+Неблокирующее структурированное логирование (LOGGING в settings.py).
+
+Обработчик запроса только кладет запись в очередь (QueueHandler) и
+возвращается; форматирование и запись на диск выполняет поток
+QueueListener. Поэтому:
+
+- сообщения логируются лениво: logger.error("... %s", value), а не
+  f-строкой - строка собирается в потоке слушателя и только если запись
+  дошла до обработчика;
+- аргументы записи не копируются, передавать нужно значения, которые
+  после вызова не меняются (исключения, serializer.errors и т. п.);
+- при переполненной очереди запись отбрасывается, а не ждет места.
+
+Повторяющиеся ошибки (одинаковый шаблон сообщения) ограничивает
+RateLimitFilter, файл лога ротируется по размеру (RotatingFileHandler).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler as BaseQueueHandler, QueueListener
+
+# Атрибуты LogRecord, которые не считаются полями extra
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def handler_by_name(name):
+    """Обработчик из LOGGING['handlers'] по имени (logging.getHandlerByName появился в Python 3.12)"""
+    get = getattr(logging, 'getHandlerByName', None)
+    return get(name) if get else logging._handlers.get(name)
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON; поля extra и suppressed попадают в объект как есть"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Не больше rate записей уровня level и выше на шаблон сообщения за period
+    секунд. Первая запись следующего окна получает атрибут suppressed - сколько
+    записей с тем же шаблоном было отброшено.
+    """
+
+    def __init__(self, rate=10, period=60, level='ERROR'):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.level = logging._checkLevel(level)
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            started, count, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - started >= self.period:
+                started, count = now, 0
+            if count >= self.rate:
+                self.windows[key] = (started, count, suppressed + 1)
+                return False
+            self.windows[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class QueueHandler(BaseQueueHandler):
+    """
+    Запись в очередь без ожидания; поток QueueListener передает записи
+    обработчикам handlers (имена из LOGGING['handlers']).
+
+    Подключается через '()': при 'class' Python 3.12+ настраивает
+    QueueHandler по-своему. Обработчики должны быть объявлены раньше по
+    алфавиту (dictConfig создает их в порядке имен). Слушатель стартует
+    при первой записи в каждом процессе - в том числе после fork
+    воркеров gunicorn - и останавливается при выходе, дописывая очередь.
+    """
+
+    def __init__(self, handlers=(), maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.targets = []
+        for name in handlers:
+            handler = handler_by_name(name)
+            if handler is None:
+                raise ValueError(f"Handler {name!r} is not configured before the queue handler")
+            self.targets.append(handler)
+        self.listener = None
+        self.pid = None
+        self.dropped = 0
+
+    def start(self):
+        """Слушатель очереди для текущего процесса"""
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            if self.pid is not None:
+                # Потоки не переживают fork: очередь и слушатель родителя в дочернем процессе мертвы
+                self.queue = queue.Queue(self.queue.maxsize)
+            self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self.listener.start()
+            self.pid = os.getpid()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Дописать очередь и остановить слушатель"""
+        with self.lock:
+            listener, self.listener, self.pid = self.listener, None, None
+        if listener is not None:
+            listener.stop()
+
+    def prepare(self, record):
+        # Очередь в памяти процесса: запись не нужно сериализовать, форматирование - в потоке слушателя
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
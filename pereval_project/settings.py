@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 import os
 from pathlib import Path
 
+from .database import connection_settings, env_flag, env_int, replica_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы замер охватывал весь запрос; без FSTR_METRICS=1 исключается из цепочки
+    'pereval_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    'pereval_app.routers.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'pereval_project.urls'
@@ -85,18 +90,83 @@ DATABASES = {
         'PASSWORD': os.getenv('FSTR_DB_PASS', '123'),
         'HOST': os.getenv('FSTR_DB_HOST', 'localhost'),
         'PORT': os.getenv('FSTR_DB_PORT', '5432'),
+        # Постоянные соединения или пул psycopg 3 (FSTR_DB_CONN_MAX_AGE, FSTR_DB_POOL, ...) - см. database.py
+        **connection_settings(os.environ),
+    }
+}
+
+# Реплики для чтения в GET-запросах (FSTR_DB_REPLICA_HOST и др.) - см. database.py и pereval_app/routers.py
+DATABASES.update(replica_databases(DATABASES['default'], os.environ))
+PEREVAL_DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['pereval_app.routers.ReplicaRouter']
+# Сколько секунд после своей записи клиент читает из основной базы
+PEREVAL_DB_STICKY_SECONDS = env_int(os.environ, 'FSTR_DB_REPLICA_STICKY_SECONDS', '10')
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pereval',
     }
 }
 
+# Кэш GET /submitData/<id>/: алиас кэша и время жизни записи по статусу перевала (секунды)
+PEREVAL_DETAIL_CACHE_ALIAS = 'default'
+PEREVAL_DETAIL_CACHE_TIMEOUTS = {
+    'new': 60,
+    'pending': 60,
+    'accepted': 24 * 60 * 60,
+    'rejected': 24 * 60 * 60,
+}
+
+# Кластеры тайлов карты: сетка ячеек на тайл и время жизни кэша тайла (секунды)
+PEREVAL_CLUSTER_GRID = 8
+PEREVAL_CLUSTER_CACHE_TIMEOUT = 300
+
+# Время хранения справочников /areas/ и /activities/ у клиента (Cache-Control max-age, секунды)
+PEREVAL_REFERENCE_MAX_AGE = 7 * 24 * 60 * 60
+# Как часто процесс сверяет снимок справочников с версией в базе (секунды)
+PEREVAL_REFERENCE_CHECK_INTERVAL = 5
+
+# Модерация: через сколько секунд взятая без решения запись возвращается в очередь
+PEREVAL_MODERATION_CLAIM_TIMEOUT = 30 * 60
+
+# Админка: точный COUNT(*) в списке, только если оценка строк по статистике PostgreSQL меньше этого числа
+PEREVAL_ADMIN_EXACT_COUNT_LIMIT = 10_000
+
+# Метрики запросов (pereval_app/metrics.py): заголовок Server-Timing и GET /metrics в формате Prometheus.
+# Если задан токен, /metrics требует заголовок Authorization: Bearer <токен>
+PEREVAL_METRICS = env_flag(os.environ, 'FSTR_METRICS', '0')
+PEREVAL_METRICS_SERVER_TIMING = env_flag(os.environ, 'FSTR_METRICS_SERVER_TIMING', '1')
+PEREVAL_METRICS_TOKEN = os.getenv('FSTR_METRICS_TOKEN', '')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Обработка изображений после сохранения: thread (пул потоков) | sync | off
+PEREVAL_IMAGE_PROCESSING = os.getenv('FSTR_IMAGE_PROCESSING', 'thread')
+PEREVAL_IMAGE_WORKERS = int(os.getenv('FSTR_IMAGE_WORKERS', '2'))
+# Максимальные размеры миниатюры и веб-версии (ширина, высота)
+PEREVAL_THUMBNAIL_SIZE = (320, 320)
+PEREVAL_WEB_IMAGE_SIZE = (1600, 1600)
+# Файл изображения без ссылок удаляется, только если не использовался столько секунд;
+# остальные удаляет python manage.py purge_image_files
+PEREVAL_FILE_GRACE_SECONDS = 15 * 60
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Быстрые JSON-рендерер и парсер (orjson, если установлен, иначе стандартный json)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'pereval_app.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'pereval_app.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_CHARSET': 'utf-8',
 }
 
@@ -136,6 +206,8 @@ USE_L10N = True
 
 STATIC_URL = 'static/'
 
+# Логирование без блокировки запросов: записи pereval_app идут в очередь (pereval_project/logs.py),
+# в файл их пишет отдельный поток в формате JSON, повторяющиеся ошибки ограничены по частоте
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -148,23 +220,44 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'pereval_project.logs.JsonFormatter',
+        },
+    },
+    'filters': {
+        'error_rate_limit': {
+            '()': 'pereval_project.logs.RateLimitFilter',
+            'rate': env_int(os.environ, 'FSTR_LOG_ERROR_RATE', '10'),
+            'period': env_int(os.environ, 'FSTR_LOG_ERROR_PERIOD', '60'),
+        },
     },
     'handlers': {
         'file': {
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
+            'class': 'logging.handlers.RotatingFileHandler',
             'filename': BASE_DIR / 'pereval.log',
-            'formatter': 'verbose',
+            'maxBytes': env_int(os.environ, 'FSTR_LOG_MAX_BYTES', str(10 * 1024 * 1024)),
+            'backupCount': env_int(os.environ, 'FSTR_LOG_BACKUP_COUNT', '5'),
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        # Имя после 'console' и 'file': dictConfig создает обработчики по алфавиту
+        'queue': {
+            '()': 'pereval_project.logs.QueueHandler',
+            'handlers': ['console', 'file'],
+            'maxsize': env_int(os.environ, 'FSTR_LOG_QUEUE_SIZE', '10000'),
+            'filters': ['error_rate_limit'],
+        },
     },
     'loggers': {
         'pereval_app': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'DEBUG',
             'propagate': True,
         },
@@ -0,0 +1,18 @@
+"""
+Настройки для тестов: python manage.py test выбирает их по умолчанию.
+
+Отличия от settings.py:
+- лог пишется во временный каталог, а не в pereval.log проекта;
+- фоновая обработка изображений выключена: потоки пула пишут в базу
+  параллельно с тестом (в SQLite - "database table is locked"); тесты
+  обработки включают sync или вызывают process_image сами.
+"""
+import os
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import LOGGING
+
+LOGGING['handlers']['file']['filename'] = os.path.join(tempfile.gettempdir(), 'pereval_test.log')
+
+PEREVAL_IMAGE_PROCESSING = 'off'
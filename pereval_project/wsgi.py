@@ -16,3 +16,8 @@ load_dotenv()
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pereval_project.settings')
 
 application = get_wsgi_application()
+
+# Снимок справочников строится до первого запроса
+from pereval_app.reference import reference_data  # noqa: E402
+
+reference_data.preload()